@@ -1,5 +1,57 @@
 from django.contrib import admin
-from .models import Post 
+from .models import Post, SerpCacheEntry, PageCacheEntry, CacheCounter, GenerationJob, Draft, DraftRevision, WordPressPublication, AirtableScheduleEntry, AirtableSyncState
 
 admin.site.register(Post)
 
+
+@admin.register(CacheCounter)
+class CacheCounterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'hits', 'misses', 'revalidations', 'hit_ratio')
+
+
+@admin.register(SerpCacheEntry)
+class SerpCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('keyword', 'fetched_at', 'last_used')
+    search_fields = ('keyword',)
+
+
+@admin.register(PageCacheEntry)
+class PageCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('url', 'etag', 'last_modified', 'fetched_at', 'last_used')
+    search_fields = ('url',)
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'kind', 'action', 'status', 'applied', 'created_at', 'updated_at')
+    list_filter = ('status', 'kind')
+
+
+class DraftRevisionInline(admin.TabularInline):
+    model = DraftRevision
+    fields = ('number', 'prompt', 'delta', 'created_at')
+    readonly_fields = fields
+    extra = 0
+
+
+@admin.register(Draft)
+class DraftAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'kind', 'title', 'created_at', 'updated_at')
+    list_filter = ('kind',)
+    inlines = [DraftRevisionInline]
+
+
+@admin.register(WordPressPublication)
+class WordPressPublicationAdmin(admin.ModelAdmin):
+    list_display = ('record_id', 'slug', 'state', 'wp_post_id', 'attempts', 'claimed_at', 'updated_at')
+    list_filter = ('state',)
+    search_fields = ('record_id', 'slug')
+
+
+@admin.register(AirtableScheduleEntry)
+class AirtableScheduleEntryAdmin(admin.ModelAdmin):
+    list_display = ('record_id', 'status', 'publish_at', 'synced_at')
+    search_fields = ('record_id',)
+
+
+admin.site.register(AirtableSyncState)
@@ -0,0 +1,148 @@
+# blog/airtable_client.py
+import logging
+import threading
+from urllib.parse import quote
+
+import requests
+from decouple import config
+
+from blog.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+AIRTABLE_API_URL = config('AIRTABLE_API_URL', default='https://api.airtable.com/v0')
+AIRTABLE_RATE_LIMIT = config('AIRTABLE_RATE_LIMIT', default=5, cast=float)  # Requests per second per base
+AIRTABLE_TIMEOUT = config('AIRTABLE_TIMEOUT', default=30, cast=float)
+AIRTABLE_MAX_RETRIES = config('AIRTABLE_MAX_RETRIES', default=3, cast=int)
+AIRTABLE_BATCH_SIZE = 10  # Airtable rejects create/update/delete calls with more than 10 records
+AIRTABLE_RETRY_AFTER = 30  # Seconds Airtable asks clients to back off after a 429
+
+# Airtable's limit is per base, so every client on the same base shares one bucket
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(base_id):
+    with _buckets_lock:
+        bucket = _buckets.get(base_id)
+        if bucket is None:
+            # No burst: evenly spaced requests never trip Airtable's limiter, even with network jitter
+            bucket = _buckets[base_id] = TokenBucket(AIRTABLE_RATE_LIMIT, capacity=1)
+        return bucket
+
+
+def chunked(items, size=AIRTABLE_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class AirtableError(Exception):
+    """An Airtable request failed after retries; `response` is the last response, if any."""
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class AirtableClient:
+    """
+    Minimal Airtable REST client for one table: rate limited, batched writes, paginated reads.
+    Args:
+        api_key (str, optional): Personal access token (default: AIRTABLE_API_KEY).
+        base_id (str, optional): Base ID (default: AIRTABLE_BASE_ID).
+        table_name (str, optional): Table name (default: AIRTABLE_TABLE_NAME, or 'Blog Posts').
+        api_url (str, optional): API root, overridable to point at a fake server (default: AIRTABLE_API_URL).
+        session (requests.Session, optional): Session to reuse connections on.
+        bucket (TokenBucket, optional): Rate limiter (default: the shared bucket of the base).
+    """
+
+    def __init__(self, api_key=None, base_id=None, table_name=None, api_url=None, session=None, bucket=None):
+        self.api_key = api_key or config('AIRTABLE_API_KEY')
+        self.base_id = base_id or config('AIRTABLE_BASE_ID')
+        self.table_name = table_name or config('AIRTABLE_TABLE_NAME', default='Blog Posts')
+        self.url = f"{(api_url or AIRTABLE_API_URL).rstrip('/')}/{self.base_id}/{quote(self.table_name)}"
+        self.session = session or requests.Session()
+        self.bucket = bucket or get_bucket(self.base_id)
+        self.request_count = 0
+        self._count_lock = threading.Lock()  # The publisher's worker threads share one client
+
+    def _request(self, method, path='', **kwargs):
+        headers = {'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'}
+        response = None
+        for attempt in range(AIRTABLE_MAX_RETRIES + 1):
+            self.bucket.acquire()
+            with self._count_lock:
+                self.request_count += 1
+            try:
+                response = self.session.request(method, self.url + path, headers=headers, timeout=AIRTABLE_TIMEOUT, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if attempt == AIRTABLE_MAX_RETRIES:
+                    raise AirtableError(f"Airtable {method} failed: {str(e)}")
+                continue
+            if response.status_code == 429:
+                logger.warning(f"Airtable rate limit hit, backing off {AIRTABLE_RETRY_AFTER}s")
+                self.bucket.penalize(float(response.headers.get('Retry-After', AIRTABLE_RETRY_AFTER)))
+                continue
+            if response.status_code >= 500 and attempt < AIRTABLE_MAX_RETRIES:
+                continue
+            if not response.ok:
+                raise AirtableError(f"Airtable {method} returned {response.status_code}: {response.text}", response)
+            return response.json()
+        raise AirtableError(f"Airtable {method} still failing after {AIRTABLE_MAX_RETRIES} retries", response)
+
+    def get(self, record_id):
+        return self._request('GET', f"/{record_id}")
+
+    def iterate(self, formula=None, sort=None, fields=None, max_records=None, page_size=100):
+        """
+        Yield records page by page, following Airtable's `offset` until the result set ends.
+        Args:
+            formula (str, optional): filterByFormula expression.
+            sort (list, optional): (field, 'asc'|'desc') pairs.
+            fields (list, optional): Only return these fields.
+            max_records (int, optional): Stop after this many records.
+            page_size (int): Records per request (Airtable's maximum is 100).
+        """
+        params = {'pageSize': page_size}
+        if formula:
+            params['filterByFormula'] = formula
+        if max_records:
+            params['maxRecords'] = max_records
+        for index, (field, direction) in enumerate(sort or []):
+            params[f'sort[{index}][field]'] = field
+            params[f'sort[{index}][direction]'] = direction
+        if fields:
+            params['fields[]'] = list(fields)
+
+        while True:
+            page = self._request('GET', params=params)
+            yield from page.get('records', [])
+            offset = page.get('offset')
+            if not offset:
+                return
+            params['offset'] = offset
+
+    def all(self, **kwargs):
+        return list(self.iterate(**kwargs))
+
+    def create(self, fields_list, typecast=False):
+        """Create records, 10 per request. Returns the created records."""
+        created = []
+        for batch in chunked(list(fields_list)):
+            payload = {'records': [{'fields': fields} for fields in batch], 'typecast': typecast}
+            created.extend(self._request('POST', json=payload).get('records', []))
+        return created
+
+    def update(self, updates, typecast=False):
+        """
+        PATCH records 10 per request.
+        Args:
+            updates (list): Dicts with 'id' and 'fields'.
+        Returns:
+            list: The updated records.
+        """
+        updated = []
+        for batch in chunked(list(updates)):
+            payload = {'records': [{'id': u['id'], 'fields': u['fields']} for u in batch], 'typecast': typecast}
+            updated.extend(self._request('PATCH', json=payload).get('records', []))
+        return updated
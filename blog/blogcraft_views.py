@@ -1,22 +1,108 @@
 from django.shortcuts import render, redirect
 from django.views.generic import View
-from blog.models import Post
+from blog.models import Post, GenerationJob
+from blog import refine
+from blog.jobs import submit_job, take_finished_job, pending_job_id
+from blog.drafts import add_revision, clear_session_draft, get_session_draft, latest_content, start_session_draft
 from django.contrib.auth.mixins import LoginRequiredMixin
-import google.generativeai as genai
+from django.conf import settings
+from django.urls import reverse
+from blog.streaming import stream_draft, sse_error
 from decouple import config
 import requests
 import json
 from datetime import datetime
 
-genai.configure(api_key=config('GEMINI_API_KEY'))
 
 class BlogCraftView(LoginRequiredMixin, View):
     template_name = 'blog/blogcraft.html'
     login_url = '/login/'
+    job_session_key = 'blogcraft_job'
+    draft_session_key = 'blogcraft_draft'
+
+    @staticmethod
+    def generate_prompt(prompt_1, primary_keyword, additional_keywords):
+        return (
+            f"{prompt_1} Ensure the article uses the primary keyword '{primary_keyword}' "
+            f"1-2 times. Include additional keywords '{additional_keywords}' naturally. "
+            f"Start the article with a markdown heading (e.g., # Article Title) for the title."
+        )
+
+    @staticmethod
+    def keyword_instructions(primary_keyword, additional_keywords):
+        return (f"Maintain the primary keyword '{primary_keyword}' usage and include additional keywords "
+                f"'{additional_keywords}' naturally.")
+
+    @classmethod
+    def refine_prompt(cls, prev_draft, current_prompt, primary_keyword, additional_keywords, feedback=''):
+        prompt = (
+            f"Refine this article: '{prev_draft}' based on feedback: '{current_prompt}'. "
+            f"{cls.keyword_instructions(primary_keyword, additional_keywords)} "
+            f"Ensure the article starts with a markdown heading (e.g., # Article Title) for the title."
+        )
+        if feedback:
+            prompt += f" Additional user feedback: '{feedback}'. Incorporate this feedback as well."
+        return prompt
+
+    @classmethod
+    def refine_payload(cls, prev_draft, current_prompt, primary_keyword, additional_keywords, feedback=''):
+        # Everything the refine runner needs to rewrite the whole draft or, when the prompt targets some
+        # sections, just those (REFINE_MODE)
+        instructions = cls.keyword_instructions(primary_keyword, additional_keywords)
+        if feedback:
+            instructions += f" Additional user feedback: '{feedback}'. Incorporate this feedback as well."
+        return {
+            'prompt': cls.refine_prompt(prev_draft, current_prompt, primary_keyword, additional_keywords, feedback),
+            'instructions': instructions,
+            'draft': prev_draft,
+            'feedback': f"{current_prompt} {feedback}".strip(),
+        }
+
+    @classmethod
+    def current_drafts(cls, request):
+        # The page only shows the newest revision, so only that one is rebuilt
+        draft = get_session_draft(request, cls.draft_session_key)
+        return [{'content': latest_content(draft)}] if draft else []
+
+    def apply_finished_job(self, request):
+        # Recording the result of a finished background job as a new revision of the session draft
+        job = take_finished_job(request, self.job_session_key)
+        if job is None:
+            return
+        draft = get_session_draft(request, self.draft_session_key)
+        if job.status == GenerationJob.STATUS_FAILED:
+            if job.action == 'generate':
+                request.session['error'] = f"Error generating content: {job.error}"
+            elif job.action == 'refine':
+                request.session['error'] = f"Error refining content: {job.error}"
+            else:
+                request.session['error'] = f"Grammar check failed: {job.error}"
+                request.session['grammar_result'] = f"Grammar check failed: {job.error}"
+            print(f"Job {job.id} ({job.action}) failed: {job.error}")
+        elif job.action == 'generate':
+            draft = start_session_draft(request, self.draft_session_key, 'blogcraft')
+            add_revision(draft, 'Prompt 1', job.result['content'])
+            request.session['current_refine_step'] = 1
+            request.session['grammar_checked'] = False
+        elif job.action == 'refine':
+            if draft is None:
+                draft = start_session_draft(request, self.draft_session_key, 'blogcraft')
+            add_revision(draft, f"Prompt {job.payload['refine_step']}", job.result['content'])
+            request.session['current_refine_step'] = job.payload['refine_step'] + 1
+        elif job.action == 'check_grammar':
+            if draft is not None:
+                add_revision(draft, 'AI Grammar Zap', job.result['content'])
+            if job.result['fixes']:
+                request.session['grammar_result'] = f"Applied {job.result['fixes']} grammar fixes."
+            else:
+                request.session['grammar_result'] = "No grammar issues found."
+            request.session['grammar_checked'] = True
+        request.session.modified = True
 
     def get(self, request, *args, **kwargs):
         print("GET: Clearing session data")
-        drafts = request.session.get('prompt_tier_drafts', [])
+        self.apply_finished_job(request)
+        drafts = self.current_drafts(request)
         current_refine_step = request.session.get('current_refine_step', 1)
         return render(request, self.template_name, {
             'topic': request.session.get('topic', ''),
@@ -32,6 +118,8 @@ class BlogCraftView(LoginRequiredMixin, View):
             'current_refine_step': current_refine_step,
             'grammar_checked': request.session.get('grammar_checked', False),
             'grammar_result': request.session.get('grammar_result', ''),
+            'pending_job': pending_job_id(request, self.job_session_key),
+            'stream_url': reverse('blogcraft-stream') if settings.GENERATION_STREAMING else '',
         })
       
     def post(self, request, *args, **kwargs):
@@ -50,7 +138,7 @@ class BlogCraftView(LoginRequiredMixin, View):
         feedback = request.POST.get('feedback', '').strip()
         action = request.POST.get('action')
         publish_date = request.POST.get('publish_date', '').strip()  # New field is set up for scheduling
-        drafts = request.session.get('prompt_tier_drafts', [])
+        drafts = self.current_drafts(request)
         current_refine_step = request.session.get('current_refine_step', 1)
         grammar_checked = request.session.get('grammar_checked', False)
         print(f"Action: {action}, Drafts before: {drafts}, Current refine step: {current_refine_step}, Grammar checked: {grammar_checked}")
@@ -68,7 +156,10 @@ class BlogCraftView(LoginRequiredMixin, View):
         print(f"Saved to session - prompts: {[prompt_1, prompt_2, prompt_3, prompt_4, prompt_5]}")
 
         # Handling actions
-        if action == 'generate':
+        if action in ('generate', 'refine', 'check_grammar', 'publish') and pending_job_id(request, self.job_session_key):
+            request.session['error'] = "Still working on the previous step. Please wait for it to finish."
+
+        elif action == 'generate':
             print("POST: Generate button clicked")
             drafts = []
             current_refine_step = 1
@@ -77,21 +168,14 @@ class BlogCraftView(LoginRequiredMixin, View):
             if not topic or not primary_keyword or not prompt_1:
                 request.session['error'] = "Please provide a topic, primary keyword, and at least Prompt 1."
             else:
-                prompt = (
-                    f"{prompt_1} Ensure the article uses the primary keyword '{primary_keyword}' "
-                    f"1-2 times. Include additional keywords '{additional_keywords}' naturally. "
-                    f"Start the article with a markdown heading (e.g., # Article Title) for the title."
-                )
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                try:
-                    response = model.generate_content(prompt)
-                    draft_1 = response.text.strip()
-                    drafts.append({'content': draft_1})
-                    print(f"Generated draft 1: {draft_1}")
-                except Exception as e:
-                    request.session['error'] = f"Error generating content: {str(e)}"
-                    print(f"Error generating draft 1: {str(e)}")
-            request.session['prompt_tier_drafts'] = drafts
+                prompt = self.generate_prompt(prompt_1, primary_keyword, additional_keywords)
+                submit_job(request, self.job_session_key, 'llm', action, {
+                    'prompt': prompt, 'fresh': request.POST.get('fresh') == '1', 'site': 'blogcraft.generate',
+                    'task': 'draft',
+                })
+                request.session['grammar_checked'] = grammar_checked
+                return redirect('blogcraft')
+            clear_session_draft(request, self.draft_session_key)
             request.session['current_refine_step'] = current_refine_step
             request.session['grammar_checked'] = grammar_checked
 
@@ -109,24 +193,11 @@ class BlogCraftView(LoginRequiredMixin, View):
                         request.session['error'] = f"Please provide feedback in Prompt {current_refine_step}."
                     else:
                         prev_draft = drafts[-1]['content']
-                        prompt = (
-                            f"Refine this article: '{prev_draft}' based on feedback: '{current_prompt}'. "
-                            f"Maintain the primary keyword '{primary_keyword}' usage and include additional keywords '{additional_keywords}' naturally. "
-                            f"Ensure the article starts with a markdown heading (e.g., # Article Title) for the title."
-                        )
-                        if feedback:
-                            prompt += f" Additional user feedback: '{feedback}'. Incorporate this feedback as well."
-                        model = genai.GenerativeModel('gemini-1.5-flash')
-                        try:
-                            response = model.generate_content(prompt)
-                            new_draft = response.text.strip()
-                            drafts[-1] = {'content': new_draft}
-                            print(f"Refined draft with Prompt {current_refine_step}: {new_draft}")
-                            current_refine_step += 1
-                        except Exception as e:
-                            request.session['error'] = f"Error refining content: {str(e)}"
-                            print(f"Error refining with Prompt {current_refine_step}: {str(e)}")
-            request.session['prompt_tier_drafts'] = drafts
+                        payload = self.refine_payload(prev_draft, current_prompt, primary_keyword, additional_keywords, feedback)
+                        payload['refine_step'] = current_refine_step
+                        payload['site'] = 'blogcraft.refine'
+                        submit_job(request, self.job_session_key, 'refine', action, payload)
+                        return redirect('blogcraft')
             request.session['current_refine_step'] = current_refine_step
             
         elif action == 'check_grammar':
@@ -138,36 +209,8 @@ class BlogCraftView(LoginRequiredMixin, View):
                 if "Error" in final_draft:
                     request.session['error'] = "Cannot check grammar due to previous errors."
                 else:
-                    url = "https://api.languagetool.org/v2/check"
-                    data = {
-                        'text': final_draft,
-                        'language': 'en-US'
-                    }
-                    try:
-                        response = requests.post(url, data=data)
-                        result = response.json()
-                        matches = result.get('matches', [])
-                        if matches:
-                            fixed_text = final_draft
-                            offset_shift = 0
-                            for match in matches:
-                                start = match['offset'] + offset_shift
-                                length = match['length']
-                                replacement = match['replacements'][0]['value'] if match['replacements'] else fixed_text[start:start+length]
-                                fixed_text = fixed_text[:start] + replacement + fixed_text[start+length:]
-                                offset_shift += len(replacement) - length
-                            drafts[-1] = {'content': fixed_text}
-                            request.session['grammar_result'] = f"Applied {len(matches)} grammar fixes."
-                            print(f"Applied {len(matches)} grammar fixes.")
-                        else:
-                            request.session['grammar_result'] = "No grammar issues found."
-                            print("No grammar issues found.")
-                        grammar_checked = True
-                    except Exception as e:
-                        request.session['error'] = f"Grammar check failed: {str(e)}"
-                        request.session['grammar_result'] = f"Grammar check failed: {str(e)}"
-                        print(f"Error in grammar zap: {str(e)}")
-            request.session['prompt_tier_drafts'] = drafts 
+                    submit_job(request, self.job_session_key, 'grammar', action, {'text': final_draft})
+                    return redirect('blogcraft')
             request.session['grammar_checked'] = grammar_checked
 
         elif action == 'publish':
@@ -182,33 +225,7 @@ class BlogCraftView(LoginRequiredMixin, View):
                 if "Error" in final_draft:
                     request.session['error'] = "Cannot publish due to previous errors."
                 else:
-                    # Applying grammar zap if not already done
-                    if not grammar_checked:
-                        url = "https://api.languagetool.org/v2/check"
-                        data = {
-                            'text': final_draft,
-                            'language': 'en-US'
-                        }
-                        try:
-                            response = requests.post(url, data=data)
-                            result = response.json()
-                            matches = result.get('matches', [])
-                            if matches:
-                                fixed_text = final_draft
-                                offset_shift = 0
-                                for match in matches:
-                                    start = match['offset'] + offset_shift
-                                    length = match['length']
-                                    replacement = match['replacements'][0]['value'] if match['replacements'] else fixed_text[start:start+length]
-                                    fixed_text = fixed_text[:start] + replacement + fixed_text[start+length:]
-                                    offset_shift += len(replacement) - length
-                                final_draft = fixed_text
-                                print(f"Applied {len(matches)} grammar fixes during publish.")
-                            else:
-                                print("No grammar issues found during publish.")
-                        except Exception as e:
-                            request.session['error'] = f"Grammar check failed: {str(e)}"
-                            print(f"Error in grammar zap during publish: {str(e)}")
+                    # Grammar is only corrected through the Check Grammar job, so publishing never waits on LanguageTool
 
                     # Extracting AI-generated title 
                     lines = final_draft.split('\n')
@@ -286,7 +303,7 @@ class BlogCraftView(LoginRequiredMixin, View):
                         if response.status_code == 200:
                             print(f"Blog scheduled in Airtable: {generated_title}")
                             # Clearing session data after successful scheduling
-                            request.session['prompt_tier_drafts'] = []
+                            clear_session_draft(request, self.draft_session_key)
                             request.session['topic'] = ''
                             request.session['primary_keyword'] = ''
                             request.session['additional_keywords'] = ''
@@ -307,7 +324,6 @@ class BlogCraftView(LoginRequiredMixin, View):
                     except Exception as e:
                         request.session['error'] = f"Error sending to Airtable: {str(e)}"
                         print(f"Error sending to Airtable: {str(e)}")
-            request.session['prompt_tier_drafts'] = drafts
         
         request.session.modified = True
         print(f"Drafts after: {drafts}, Current refine step: {current_refine_step}, Grammar checked: {grammar_checked}")
@@ -326,5 +342,68 @@ class BlogCraftView(LoginRequiredMixin, View):
             'grammar_checked': grammar_checked,
             'grammar_result': request.session.get('grammar_result', ''),
         })
-        
-        
\ No newline at end of file
+
+
+class BlogCraftStreamView(LoginRequiredMixin, View):
+    """Streaming variant of the generate/refine actions of BlogCraftView (server-sent events)."""
+    login_url = '/login/'
+
+    def post(self, request, *args, **kwargs):
+        topic = request.POST.get('topic', '').strip()
+        primary_keyword = request.POST.get('primary_keyword', '').strip()
+        additional_keywords = request.POST.get('additional_keywords', '').strip()
+        prompts = [request.POST.get(f'prompt_{n}', '').strip() for n in range(1, 6)]
+        feedback = request.POST.get('feedback', '').strip()
+        action = request.POST.get('action')
+        drafts = BlogCraftView.current_drafts(request)
+        current_refine_step = request.session.get('current_refine_step', 1)
+
+        if pending_job_id(request, BlogCraftView.job_session_key):
+            return sse_error("Still working on the previous step. Please wait for it to finish.", status=409)
+
+        if action == 'generate':
+            if not topic or not primary_keyword or not prompts[0]:
+                return sse_error("Please provide a topic, primary keyword, and at least Prompt 1.")
+            prompt = BlogCraftView.generate_prompt(prompts[0], primary_keyword, additional_keywords)
+            task = 'draft'
+
+            def commit(content):
+                draft = start_session_draft(request, BlogCraftView.draft_session_key, 'blogcraft')
+                add_revision(draft, 'Prompt 1', content)
+                request.session['current_refine_step'] = 1
+                request.session['grammar_checked'] = False
+                request.session['grammar_result'] = ''
+                request.session['error'] = ''
+
+        elif action == 'refine':
+            if not drafts:
+                return sse_error("No draft to refine. Please generate a draft first.")
+            if current_refine_step > 5:
+                return sse_error("All prompts have been processed.")
+            current_prompt = prompts[current_refine_step - 1]
+            if not current_prompt:
+                return sse_error(f"Please provide feedback in Prompt {current_refine_step}.")
+            payload = BlogCraftView.refine_payload(drafts[-1]['content'], current_prompt, primary_keyword, additional_keywords, feedback)
+            refine_step = refine.plan_step(payload['draft'], payload['feedback'], payload['prompt'], payload['instructions'])
+            prompt = refine_step.prompt
+            task = refine_step.task
+            finish = refine.timed_apply(refine_step)
+
+            def commit(content):
+                content = finish(content)
+                draft = get_session_draft(request, BlogCraftView.draft_session_key)
+                add_revision(draft, f"Prompt {current_refine_step}", content)
+                request.session['current_refine_step'] = current_refine_step + 1
+                request.session['error'] = ''
+
+        else:
+            return sse_error("This action cannot be streamed.")
+
+        # Keeping the form in the session, as the regular POST does
+        request.session['topic'] = topic
+        request.session['primary_keyword'] = primary_keyword
+        request.session['additional_keywords'] = additional_keywords
+        for n, value in enumerate(prompts, start=1):
+            request.session[f'prompt_{n}'] = value
+        return stream_draft(request, prompt, commit, fresh=action == 'generate' and request.POST.get('fresh') == '1',
+                            site=f'blogcraft.{action}', task=task)
@@ -0,0 +1,160 @@
+# blog/context_packing.py
+"""
+Packs the cleaned competitor texts into a bounded prompt context.
+
+The scraped articles used to go into the SEO prompts whole, joined with spaces, so prompt
+size (and latency and cost) grew with the pages. Here they are split into passages of a few
+sentences. Passages that repeat one already seen in any source (syndicated copies,
+boilerplate the cleaner missed) are dropped. The rest are ranked by BM25 against the primary
+keyword and taken best first until the token budget is full, then put back in source order
+so the context still reads like the articles it came from.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from blog.llm import CHARS_PER_TOKEN, estimate_tokens
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s*(?=[A-Z0-9"“])')
+TERM = re.compile(r'[a-z0-9]+')
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is', 'it', 'its',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'will', 'with', 'you', 'your',
+}
+
+PASSAGE_WORDS = 60       # Sentences are grouped into passages of about this many words
+SHINGLE_WORDS = 5        # Near-duplicate detection compares 5-word shingles
+DUPLICATE_OVERLAP = 0.6  # Share of a passage's shingles already seen for it to count as a repeat
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+@dataclass
+class Passage:
+    source: int
+    position: int
+    text: str
+    terms: Counter = field(default_factory=Counter)
+    score: float = 0.0
+
+
+@dataclass
+class PackedContext:
+    text: str
+    raw_tokens: int
+    tokens: int
+    passages: int
+    kept: int
+    duplicates: int
+
+
+def terms(text):
+    # Lowercased words without stopwords, with a plural "s" dropped so "schools" matches "school"
+    return [word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+            for word in TERM.findall(text.lower()) if word not in STOPWORDS]
+
+
+def split_passages(text, source=0, passage_words=PASSAGE_WORDS):
+    """
+    Split a cleaned text into passages of whole sentences, at most passage_words long each.
+    Extracted text often has no space between paragraphs ("...end.Next"), so a sentence may
+    end right before a capital letter. A sentence longer than a passage (a list or a page
+    without punctuation) is cut at word boundaries, so no passage is too big to pack.
+    """
+    passages = []
+    current = []
+    length = 0
+    for sentence in SENTENCE_END.split(text.strip()):
+        words = sentence.split()
+        for start in range(0, len(words), passage_words):
+            piece = words[start:start + passage_words]
+            if length + len(piece) > passage_words:
+                passages.append(' '.join(current))
+                current, length = [], 0
+            current += piece
+            length += len(piece)
+    if current:
+        passages.append(' '.join(current))
+    return [Passage(source, i, passage, Counter(terms(passage))) for i, passage in enumerate(passages)]
+
+
+def _shingles(passage):
+    words = TERM.findall(passage.text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def drop_duplicates(passages):
+    """Keep the first of each group of near-identical passages, in any source. Returns (kept, dropped count)."""
+    seen = set()
+    kept = []
+    for passage in passages:
+        shingles = _shingles(passage)
+        if shingles and len(shingles & seen) >= DUPLICATE_OVERLAP * len(shingles):
+            continue
+        seen |= shingles
+        kept.append(passage)
+    return kept, len(passages) - len(kept)
+
+
+def score_bm25(passages, query):
+    """Set each passage's BM25 score for the query terms (passages are the documents)."""
+    query_terms = set(terms(query))
+    if not passages or not query_terms:
+        return
+    document_frequency = defaultdict(int)
+    for passage in passages:
+        for term in query_terms & passage.terms.keys():
+            document_frequency[term] += 1
+    average_length = sum(sum(passage.terms.values()) for passage in passages) / len(passages) or 1
+    count = len(passages)
+    for passage in passages:
+        length = sum(passage.terms.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = passage.terms.get(term)
+            if not frequency:
+                continue
+            idf = math.log(1 + (count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+        passage.score = score
+
+
+def pack_context(texts, primary_keyword, budget_tokens):
+    """
+    Build the prompt context from the cleaned competitor texts.
+    Args:
+        texts (list): Cleaned texts, one per source.
+        primary_keyword (str): The query passages are ranked against.
+        budget_tokens (int): Token budget for the packed context; 0 or less disables packing.
+    Returns:
+        PackedContext: The context text plus sizes before and after packing.
+    """
+    raw = ' '.join(texts)
+    raw_tokens = estimate_tokens(raw) if raw else 0
+    if budget_tokens <= 0:
+        return PackedContext(raw, raw_tokens, raw_tokens, 0, 0, 0)
+
+    passages = [passage for source, text in enumerate(texts) for passage in split_passages(text, source)]
+    unique, duplicates = drop_duplicates(passages)
+    score_bm25(unique, primary_keyword)
+
+    # Best first; ties (including passages that never mention the keyword) go by position, so intros come first
+    chosen = []
+    used = 0
+    for passage in sorted(unique, key=lambda p: (-p.score, p.position, p.source)):
+        # Rounded up, separator included, so the joined context never estimates over the budget
+        tokens = math.ceil((len(passage.text) + 2) / CHARS_PER_TOKEN)
+        if used + tokens > budget_tokens:
+            continue  # A shorter passage further down may still fit
+        chosen.append(passage)
+        used += tokens
+
+    chosen.sort(key=lambda p: (p.source, p.position))
+    by_source = defaultdict(list)
+    for passage in chosen:
+        by_source[passage.source].append(passage.text)
+    text = '\n\n'.join(' '.join(parts) for _, parts in sorted(by_source.items()))
+    return PackedContext(text, raw_tokens, estimate_tokens(text) if text else 0, len(passages), len(chosen), duplicates)
@@ -1,12 +1,28 @@
 # cron.py
-import requests
-from decouple import config
-from datetime import datetime
-import pytz
-import base64
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import time
+from blog.airtable_client import AirtableClient, AirtableError, AIRTABLE_BATCH_SIZE
+from blog.wp_publisher import WordPressPublisher
+
+
+def flush_airtable_updates(airtable, updates):
+    """
+    Write the pending Status / WP Post ID updates to Airtable, 10 records per PATCH.
+    Args:
+        airtable (AirtableClient): Client for the Blog Posts table.
+        updates (list): Dicts with 'id' and 'fields'; emptied once written.
+    """
+    if not updates:
+        return
+    try:
+        airtable.update(updates)
+        for update in updates:
+            print(f"Updated Airtable record {update['id']}: Status set to {update['fields']['Status']}, WP Post ID set to {update['fields']['WP Post ID']}")
+    except AirtableError as e:
+        print(f"Error updating Airtable for records {[update['id'] for update in updates]}: {str(e)}")
+        # If the error is due to an invalid then selecting option, log a suggestion
+        if e.response is not None and e.response.status_code == 422 and "INVALID_MULTIPLE_CHOICE_OPTIONS" in e.response.text:
+            print("Suggestion: Check the 'Status' field options in Airtable. Ensure 'Published' is an allowed option (case-sensitive).")
+    updates.clear()
+
 
 def publish_scheduled_blogs(record_id=None, immediate=False):
     """
@@ -19,33 +35,13 @@ def publish_scheduled_blogs(record_id=None, immediate=False):
     """
     print(f"Cron job running: Checking for blogs to publish (record_id: {record_id}, immediate: {immediate})...")
 
-    # Airtable configuration
-    airtable_api_key = config('AIRTABLE_API_KEY')
-    airtable_base_id = config('AIRTABLE_BASE_ID')
-    airtable_table_name = 'Blog Posts'
-    airtable_url = f"https://api.airtable.com/v0/{airtable_base_id}/{airtable_table_name}"
-
-    # WordPress configuration
-    wordpress_url = config('WORDPRESS_API_URL') + "/posts"
-    wordpress_username = config('WORDPRESS_USERNAME')
-    wordpress_password = config('WORDPRESS_APP_PASSWORD')
-
-    # Encoding the credentials for Basic Auth
-    credentials = f"{wordpress_username}:{wordpress_password}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode('utf-8')
-
-    # Headers for the Airtable API
-    headers = {
-        'Authorization': f'Bearer {airtable_api_key}',
-        'Content-Type': 'application/json'
-    }
+    # Airtable client (rate limited to Airtable's 5 requests/second per base)
+    airtable = AirtableClient(table_name='Blog Posts')
 
     # Fetching the specific record if record_id is provided, otherwise fetching all scheduled records
     if record_id:
         try:
-            response = requests.get(f"{airtable_url}/{record_id}", headers=headers)
-            response.raise_for_status()
-            record = response.json()
+            record = airtable.get(record_id)
             records = [record] if record else []
             print(f"Fetched specific record {record_id} from Airtable.")
         except Exception as e:
@@ -54,23 +50,19 @@ def publish_scheduled_blogs(record_id=None, immediate=False):
     else:
         if immediate:
             # Fetching  most recent "Published" record for immediate publishing
-            params = {
-                'filterByFormula': '{Status} = "Published"',
-                'sort[0][field]': 'Created At',
-                'sort[0][direction]': 'desc',
-                'maxRecords': 1
+            query = {
+                'formula': '{Status} = "Published"',
+                'sort': [('Created At', 'desc')],
+                'max_records': 1
             }
         else:
-            # Fetching all scheduled records whose Publish Date has passed
-            params = {
-                'filterByFormula': 'AND({Status} = "Scheduled", {Publish Date} <= NOW())',
-                'sort[0][field]': 'Publish Date',
-                'sort[0][direction]': 'asc'
+            # Fetching all scheduled records whose Publish Date has passed (every page, not just the first 100)
+            query = {
+                'formula': 'AND({Status} = "Scheduled", {Publish Date} <= NOW())',
+                'sort': [('Publish Date', 'asc')]
             }
         try:
-            response = requests.get(airtable_url, headers=headers, params=params)
-            response.raise_for_status()
-            records = response.json().get('records', [])
+            records = airtable.all(**query)
             print(f"Found {len(records)} blogs to publish (immediate={immediate}).")
             # Debug: Print the status of each fetched record
             for record in records:
@@ -85,26 +77,27 @@ def publish_scheduled_blogs(record_id=None, immediate=False):
         print("No blog posts to publish.")
         return
 
-    # Setting up a session with retries for WordPress requests
-    session = requests.Session()
-    retries = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504, 406],
-        allowed_methods=["POST", "PUT"]
-    )
-    session.mount('https://', HTTPAdapter(max_retries=retries))
-
-    # WordPress headers
-    wp_headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/json',
-        'Authorization': f"Basic {encoded_credentials}",
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
-        'Referer': config('WORDPRESS_API_URL').rstrip('/wp-json/wp/v2')
-    }
-
-    # Processing each record
+    publish_records(records, immediate=immediate, airtable=airtable)
+
+
+def publish_records(records, immediate=False, airtable=None):
+    """
+    Post already-fetched Airtable records to WordPress and mark them Published in Airtable.
+    Args:
+        records (list): Airtable records (dicts with 'id' and 'fields').
+        immediate (bool): If True, records must be "Published" and go out with status "publish";
+                          otherwise they must be "Scheduled" and are saved as drafts.
+        airtable (AirtableClient, optional): Client for the Blog Posts table.
+    Returns:
+        dict: Airtable record ID -> WP Post ID for every record that is now in WordPress.
+    """
+    airtable = airtable or AirtableClient(table_name='Blog Posts')
+
+    # WordPress publisher (bounded worker pool with a per-record idempotency ledger)
+    publisher = WordPressPublisher()
+
+    # Collecting the records to publish
+    jobs = []
     for record in records:
         record_id = record['id']
         fields = record['fields']
@@ -131,54 +124,52 @@ def publish_scheduled_blogs(record_id=None, immediate=False):
         if additional_keywords:
             focus_keywords = f"{primary_keyword}, {additional_keywords}"
 
-        # Determining the WordPress post status
-        wp_status = "publish" if immediate else "draft"
-        print(f"Posting to WordPress with status: {wp_status}")
-
-        # Posting to WordPress with the appropriate status and custom meta field
-        wp_data = {
+        jobs.append({
+            'record_id': record_id,
             'title': title,
             'content': content,
-            'status': wp_status,
+            # Determining the WordPress post status
+            'status': "publish" if immediate else "draft",
             'meta': {
-                'custom_focus_keywords': focus_keywords
+                'custom_focus_keywords': focus_keywords,
+                'airtable_record_id': record_id
             }
-        }
-        try:
-            wp_response = session.post(wordpress_url, headers=wp_headers, json=wp_data, timeout=60)
-            wp_response.raise_for_status()
-            wp_post_id = wp_response.json().get('id')
-            action = "published" if immediate else "saved as draft"
-            print(f"Successfully {action} in WordPress: {title}, Post ID: {wp_post_id}")
-            print(f"Set custom meta field 'custom_focus_keywords' to: {focus_keywords}")
-        except Exception as e:
-            print(f"Error posting to WordPress for record {record_id}: {str(e)}")
-            print(f"WordPress response: {e.response.text if e.response else 'No response'}")
+        })
+
+    # Posting to WordPress concurrently; a slow record no longer stalls the rest
+    print(f"Posting {len(jobs)} records to WordPress with {publisher.max_workers} workers...")
+    results, report = publisher.publish_many(jobs)
+
+    # Queueing the Airtable updates with Status and WP Post ID, written 10 at a time
+    action = "published" if immediate else "saved as draft"
+    pending_updates = []
+    published = {}
+    for job, result in zip(jobs, results):
+        if result['outcome'] == 'failed':
+            print(f"Error posting to WordPress for record {result['record_id']}: {result['error']}")
             continue
-
-        # Updatin Airtable with Status and WP Post ID
-        new_status = "Published"  # Using "Published" for both immediate and scheduled posts
-        update_data = {
+        if result['outcome'] == 'in_flight':
+            print(f"Skipping record {result['record_id']}: {result['error']}")
+            continue
+        if result['outcome'] == 'created':
+            print(f"Successfully {action} in WordPress: {job['title']}, Post ID: {result['wp_post_id']}")
+        else:
+            # The post already exists (an earlier run timed out after WordPress created it); only Airtable is behind
+            print(f"Record {result['record_id']} already in WordPress with Post ID {result['wp_post_id']}; updating Airtable")
+        published[result['record_id']] = str(result['wp_post_id'])
+        pending_updates.append({
+            'id': result['record_id'],
             'fields': {
-                'Status': new_status,  # Ensuring this matches the exact case in Airtable
-                'WP Post ID': str(wp_post_id)
+                'Status': "Published",  # Using "Published" for both immediate and scheduled posts
+                'WP Post ID': str(result['wp_post_id'])
             }
-        }
-        try:
-            update_response = requests.patch(f"{airtable_url}/{record_id}", headers=headers, json=update_data)
-            update_response.raise_for_status()
-            print(f"Updated Airtable record {record_id}: Status set to {new_status}, WP Post ID set to {wp_post_id}")
-            time.sleep(2)
-        except requests.exceptions.HTTPError as http_err:
-            print(f"HTTP error updating Airtable for record {record_id}: {str(http_err)}")
-            print(f"Airtable status code: {update_response.status_code}")
-            print(f"Airtable response: {update_response.text}")
-            print(f"Request payload: {update_data}")
-            # If the error is due to an invalid then selecting option, log a suggestion
-            if update_response.status_code == 422 and "INVALID_MULTIPLE_CHOICE_OPTIONS" in update_response.text:
-                print(f"Suggestion: Check the 'Status' field options in Airtable. Ensure '{new_status}' is an allowed option (case-sensitive).")
-            continue
-        except Exception as e:
-            print(f"Unexpected error updating Airtable for record {record_id}: {str(e)}")
-            continue
+        })
+        if len(pending_updates) >= AIRTABLE_BATCH_SIZE:
+            flush_airtable_updates(airtable, pending_updates)
+
+    print(f"WordPress: {report['published']} published, {report['failed']} failed, {report['skipped']} skipped "
+          f"in {report['elapsed']:.1f}s ({report['posts_per_minute']:.1f} posts/min)")
+    flush_airtable_updates(airtable, pending_updates)
+    print(f"Airtable requests made: {airtable.request_count}")
+    return published
 # must create a different cron job onto vercel for scheduler to work (Celery and AP wont in a production environment )
\ No newline at end of file
@@ -0,0 +1,148 @@
+# blog/drafts.py
+import difflib
+import json
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from blog.models import Draft, DraftRevision
+
+# Splitting on whitespace but keeping it, so joining the tokens gives back the exact text
+_TOKEN_RE = re.compile(r'(\s+)')
+
+
+def _tokens(text):
+    return [token for token in _TOKEN_RE.split(text or '') if token]
+
+
+def make_delta(old, new):
+    """
+    Describe `new` as word-level edits of `old`.
+    Returns:
+        list: Ops ['=', n] (keep n tokens), ['-', n] (drop n tokens) and ['+', text] (insert text).
+    """
+    a, b = _tokens(old), _tokens(new)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(['=', i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(['-', i2 - i1])
+        if j2 > j1:
+            ops.append(['+', ''.join(b[j1:j2])])
+    return ops
+
+
+def apply_delta(old, ops):
+    """Rebuild the text a delta from make_delta() was computed for."""
+    tokens = _tokens(old)
+    position = 0
+    parts = []
+    for op, value in ops:
+        if op == '=':
+            parts.extend(tokens[position:position + value])
+            position += value
+        elif op == '-':
+            position += value
+        else:
+            parts.append(value)
+    return ''.join(parts)
+
+
+def _rebuild(revisions):
+    # Walking revisions in order; a delta always applies to the revision right before it
+    contents = []
+    content = ''
+    for revision in revisions:
+        content = revision.content if revision.delta is None else apply_delta(content, revision.delta)
+        contents.append((revision, content))
+    return contents
+
+
+def draft_history(draft):
+    """
+    Return every revision of a draft with its full text, oldest first.
+    Returns:
+        list: Dicts with 'number', 'prompt' and 'content', the shape the generator templates loop over.
+    """
+    return [
+        {'number': revision.number, 'prompt': revision.prompt, 'content': content}
+        for revision, content in _rebuild(draft.revisions.all())
+    ]
+
+
+def latest_content(draft):
+    """Return the text of the newest revision, replaying deltas only from the last full snapshot."""
+    snapshot = draft.revisions.filter(delta__isnull=True).aggregate(number=Max('number'))['number']
+    if snapshot is None:
+        return ''
+    contents = _rebuild(draft.revisions.filter(number__gte=snapshot))
+    return contents[-1][1] if contents else ''
+
+
+def add_revision(draft, prompt, content):
+    """
+    Append a revision to a draft, storing it as a delta against the previous revision when that is smaller.
+    The draft row is locked while the number is allocated, so concurrent appends queue instead of colliding.
+    Args:
+        draft (Draft): The draft to extend.
+        prompt (str): The user prompt or step that produced this revision.
+        content (str): The full text of the new revision.
+    Returns:
+        DraftRevision: The created revision.
+    """
+    with transaction.atomic():
+        draft = Draft.objects.select_for_update().get(pk=draft.pk)
+        last_number = draft.revisions.aggregate(number=Max('number'))['number'] or 0
+        number = last_number + 1
+        delta = None
+        # Every DRAFT_SNAPSHOT_INTERVAL revisions the full text is kept, so latest_content() replays a short chain
+        if settings.DRAFT_STORE_DELTAS and last_number and (number - 1) % settings.DRAFT_SNAPSHOT_INTERVAL:
+            ops = make_delta(latest_content(draft), content)
+            if len(json.dumps(ops)) < len(content):
+                delta = ops
+
+        revision = DraftRevision.objects.create(
+            draft=draft,
+            number=number,
+            prompt=prompt or '',
+            content='' if delta is not None else content,
+            delta=delta,
+        )
+        Draft.objects.filter(pk=draft.pk).update(updated_at=timezone.now())
+    return revision
+
+
+def get_session_draft(request, session_key):
+    """Return the Draft whose id the view keeps in the session, if any."""
+    draft_id = request.session.get(session_key)
+    if not draft_id:
+        return None
+    draft = Draft.objects.filter(pk=draft_id, user=request.user).first()
+    if draft is None:
+        request.session.pop(session_key, None)
+    return draft
+
+
+def session_draft_history(request, session_key):
+    """Draft history of the session draft, or an empty list when there is none."""
+    draft = get_session_draft(request, session_key)
+    return draft_history(draft) if draft else []
+
+
+def start_session_draft(request, session_key, kind, **fields):
+    """Create a new Draft for request.user and keep only its id in the session."""
+    draft = Draft.objects.create(user=request.user, kind=kind, **fields)
+    request.session[session_key] = draft.pk
+    request.session.modified = True
+    return draft
+
+
+def clear_session_draft(request, session_key):
+    """Forget the session draft; the Draft rows stay as the history of what was published."""
+    request.session.pop(session_key, None)
+    request.session.modified = True
@@ -0,0 +1,331 @@
+# blog/extraction.py
+"""
+Main-content extraction for scraped competitor pages.
+
+Three interchangeable backends, picked by EXTRACTION_BACKEND:
+- "soup": the original path, a full BeautifulSoup html.parser tree queried with CSS selectors.
+- "stream": a standard-library HTMLParser pass that keeps no tree, only the text runs and the
+  few elements the selectors care about.
+- "lxml": lxml's incremental HTML parser (optional; install lxml to use it).
+"auto" uses lxml when it is installed and the stream parser otherwise.
+
+Every backend takes the same selectors in the same priority order and returns the same text
+as the original (the element's get_text(strip=True)). The stream and lxml backends stop
+parsing as soon as the first <article> is complete, since nothing later can outrank it. When
+no selector matches, they score block elements by the paragraph text they hold, not counting
+link text, and return the best one without its nav/header/footer/aside/form parts. The
+original returned the whole body, menus and all. Raw response bytes are decoded once, using
+the charset from the Content-Type header or the page's <meta> tag.
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the stream backend needs only the standard library
+    etree = None
+
+# Tried in this order; the first selector with a match decides, as in the original extractor
+CONTENT_SELECTORS = ['article', '.article-content', '.post-content', '.entry-content', 'main', '.content']
+
+SKIPPED_TAGS = {'script', 'style', 'template'}  # get_text leaves their strings out
+BOILERPLATE_TAGS = {'nav', 'header', 'footer', 'aside', 'form'}
+BLOCK_TAGS = {'div', 'section', 'article', 'main', 'td', 'body'}
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+MIN_CONTENT_CHARS = 200  # Below this the best-scoring block is not trusted over the whole body
+
+CHARSET_HEADER = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+CHARSET_META = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def charset_from_headers(content_type):
+    """The charset named in a Content-Type header, or None (requests would assume ISO-8859-1)."""
+    match = CHARSET_HEADER.search(content_type or '')
+    return match.group(1) if match else None
+
+
+def decode_html(content, encoding=None):
+    """Decode page bytes once: the given charset, else the <meta> one, else UTF-8. str passes through."""
+    if isinstance(content, str):
+        return content
+    if content.startswith(codecs.BOM_UTF8):
+        return content[len(codecs.BOM_UTF8):].decode('utf-8', errors='replace')
+    meta = CHARSET_META.search(content[:4096])
+    for candidate in (encoding, meta.group(1).decode('ascii') if meta else None):
+        if candidate:
+            try:
+                return content.decode(candidate)
+            except (LookupError, UnicodeDecodeError):
+                continue
+    return content.decode('utf-8', errors='replace')
+
+
+def _selector_matches(tag, classes):
+    return [
+        i for i, selector in enumerate(CONTENT_SELECTORS)
+        if (selector[1:] in classes if selector.startswith('.') else tag == selector)
+    ]
+
+
+def _best_block(credits):
+    """The element with the highest paragraph score, if it holds enough text to be the article."""
+    if not credits:
+        return None
+    best = max(credits, key=credits.get)
+    return best if credits[best] >= MIN_CONTENT_CHARS else None
+
+
+def _credit_paragraph(credits, blocks, chars):
+    # A paragraph counts fully for its enclosing block and half for the block around that
+    if chars and blocks:
+        credits[blocks[0]] = credits.get(blocks[0], 0) + chars
+        if len(blocks) > 1:
+            credits[blocks[1]] = credits.get(blocks[1], 0) + chars / 2
+
+
+def extract_with_soup(html):
+    soup = BeautifulSoup(html, 'html.parser')
+
+    for selector in CONTENT_SELECTORS:
+        element = soup.select_one(selector)
+        if element:
+            article = element.get_text(strip=True)
+            if article:
+                return article
+            break
+
+    return soup.body.get_text(strip=True) if soup.body else ""
+
+
+class _ArticleFound(Exception):
+    pass
+
+
+class _Element:
+    __slots__ = ('tag', 'start', 'end', 'chars', 'link_chars')
+
+    def __init__(self, tag, start, chars, link_chars):
+        self.tag = tag
+        self.start = start
+        self.end = None
+        self.chars = chars
+        self.link_chars = link_chars
+
+
+class StreamExtractor(HTMLParser):
+    """
+    Collects the stripped text runs of a page in document order, with each element of interest
+    remembered as a slice of them, and the first element per selector. Mirrors how
+    BeautifulSoup's html.parser builder nests tags, so slices match get_text(strip=True).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces = []
+        self.in_boilerplate = []  # Parallel to pieces
+        self.pending = []
+        self.stack = []
+        self.chars = 0
+        self.link_chars = 0
+        self.skip_depth = 0
+        self.boilerplate_depth = 0
+        self.link_depth = 0
+        self.first = [None] * len(CONTENT_SELECTORS)
+        self.body = None
+        self.credits = {}
+
+    def flush(self):
+        if not self.pending:
+            return
+        text = ''.join(self.pending).strip()
+        self.pending = []
+        if text and not self.skip_depth:
+            self.add_piece(text)
+
+    def add_piece(self, text):
+        self.pieces.append(text)
+        self.in_boilerplate.append(self.boilerplate_depth > 0)
+        self.chars += len(text)
+        if self.link_depth:
+            self.link_chars += len(text)
+
+    def handle_data(self, data):
+        self.pending.append(data)
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        if tag in VOID_TAGS:
+            return
+        element = _Element(tag, len(self.pieces), self.chars, self.link_chars)
+        classes = (dict(attrs).get('class') or '').split()
+        for i in _selector_matches(tag, classes):
+            if self.first[i] is None:
+                self.first[i] = element
+        if tag == 'body' and self.body is None:
+            self.body = element
+        self.stack.append(element)
+        self.adjust_depths(tag, 1)
+
+    def handle_endtag(self, tag):
+        self.flush()
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i].tag == tag:
+                break
+        else:
+            return  # A stray end tag; html.parser's builder ignores it too
+        while len(self.stack) > i:
+            self.close_element(self.stack.pop())
+
+    def close_element(self, element):
+        element.end = len(self.pieces)
+        self.adjust_depths(element.tag, -1)
+        if element.tag == 'p' and not self.boilerplate_depth:
+            chars = (self.chars - element.chars) - (self.link_chars - element.link_chars)
+            blocks = [ancestor for ancestor in reversed(self.stack) if ancestor.tag in BLOCK_TAGS][:2]
+            _credit_paragraph(self.credits, blocks, chars)
+        if element is self.first[0] and element.end > element.start:
+            raise _ArticleFound()
+
+    def adjust_depths(self, tag, step):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += step
+        elif tag in BOILERPLATE_TAGS:
+            self.boilerplate_depth += step
+        elif tag == 'a':
+            self.link_depth += step
+
+    def handle_comment(self, data):
+        self.flush()
+
+    def handle_decl(self, decl):
+        self.flush()
+
+    def handle_pi(self, data):
+        self.flush()
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> is its own string in BeautifulSoup, and get_text keeps it
+        self.flush()
+        if data.startswith('CDATA[') and data[6:].strip():
+            self.add_piece(data[6:].strip())
+
+    def text(self, element, skip_boilerplate=False):
+        end = element.end if element.end is not None else len(self.pieces)
+        if not skip_boilerplate:
+            return ''.join(self.pieces[element.start:end])
+        return ''.join(
+            piece for piece, boilerplate in zip(self.pieces[element.start:end], self.in_boilerplate[element.start:end])
+            if not boilerplate
+        )
+
+    def result(self):
+        for element in self.first:
+            if element is not None:
+                article = self.text(element)
+                if article:
+                    return article
+                break
+        else:
+            best = _best_block(self.credits)
+            if best is not None:
+                return self.text(best, skip_boilerplate=True)
+        return self.text(self.body) if self.body else ""
+
+
+def extract_with_stream(html):
+    parser = StreamExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+        parser.flush()
+    except _ArticleFound:
+        pass
+    return parser.result()
+
+
+def _lxml_text(element, skip_boilerplate=False):
+    pieces = []
+    for node in element.iter():
+        if isinstance(node.tag, str) and node.tag not in SKIPPED_TAGS and node.text:
+            if not (skip_boilerplate and _in_boilerplate(node, element)):
+                pieces.append(node.text.strip())
+        if node is not element and node.tail:
+            parent = node.getparent()
+            if not (skip_boilerplate and _in_boilerplate(parent, element)):
+                pieces.append(node.tail.strip())
+    return ''.join(pieces)
+
+
+def _in_boilerplate(node, root):
+    while node is not None and node is not root:
+        if node.tag in BOILERPLATE_TAGS:
+            return True
+        node = node.getparent()
+    return False
+
+
+def extract_with_lxml(html, chunk_size=64 * 1024):
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    first = [None] * len(CONTENT_SELECTORS)
+    for offset in range(0, len(html), chunk_size):
+        parser.feed(html[offset:offset + chunk_size])
+        for event, element in parser.read_events():
+            if event == 'start':
+                for i in _selector_matches(element.tag, (element.get('class') or '').split()):
+                    if first[i] is None:
+                        first[i] = element
+            elif element is first[0]:
+                article = _lxml_text(element)
+                if article:
+                    return article
+    root = parser.close()
+
+    for element in first:
+        if element is not None:
+            article = _lxml_text(element)
+            if article:
+                return article
+            break
+    else:
+        credits = {}
+        for paragraph in root.iter('p'):
+            if _in_boilerplate(paragraph, None):
+                continue
+            chars = len(_lxml_text(paragraph)) - sum(len(_lxml_text(link)) for link in paragraph.iter('a'))
+            _credit_paragraph(credits, [a for a in paragraph.iterancestors() if a.tag in BLOCK_TAGS][:2], chars)
+        best = _best_block(credits)
+        if best is not None:
+            return _lxml_text(best, skip_boilerplate=True)
+    body = root.find('body')
+    return _lxml_text(body) if body is not None else ""
+
+
+BACKENDS = {
+    'soup': extract_with_soup,
+    'stream': extract_with_stream,
+    'lxml': extract_with_lxml,
+}
+
+
+def available_backends():
+    return [name for name in BACKENDS if name != 'lxml' or etree is not None]
+
+
+def extract_main_text(content, encoding=None, backend=None):
+    """
+    Extract the main article text from a page.
+    Args:
+        content (bytes or str): The page, raw bytes as received or already-decoded text.
+        encoding (str, optional): Charset from the Content-Type header, if it named one.
+        backend (str, optional): soup, stream, lxml or auto (default: EXTRACTION_BACKEND).
+    Returns:
+        str: The extracted text, or "" if there is none.
+    """
+    backend = backend or settings.EXTRACTION_BACKEND
+    if backend == 'auto' or (backend == 'lxml' and etree is None):
+        backend = 'lxml' if etree is not None else 'stream'
+    return BACKENDS[backend](decode_html(content, encoding))
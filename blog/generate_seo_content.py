@@ -1,10 +1,27 @@
 import requests
 from decouple import config
-from bs4 import BeautifulSoup
+import contextvars
+import json
 import re
-import google.generativeai as genai
+import time
+from concurrent.futures import ThreadPoolExecutor
+from blog import context_packing, extraction, llm, metrics, outline_generation, text_cleaning
+from django.conf import settings
+from django.db import connection
 from pyairtable import Table
 from datetime import datetime
+from blog.page_fetcher import fetch_pages
+
+BLOG_POST_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'title': {'type': 'STRING'},
+        'meta_description': {'type': 'STRING'},
+        'body': {'type': 'STRING'},
+    },
+    'required': ['title', 'meta_description', 'body'],
+}
+BLOG_POST_GENERATION_CONFIG = {'response_mime_type': 'application/json', 'response_schema': BLOG_POST_SCHEMA}
 
 def fetch_google_articles(primary_keyword, num_results=4, fetch_limit=10):
     """
@@ -49,101 +66,312 @@ def fetch_google_articles(primary_keyword, num_results=4, fetch_limit=10):
         print(f"Error fetching Google articles: {str(e)}")
         return []
 
-def extract_article_text(article_urls):
+def extract_main_text(html, encoding=None):
     """
-    Extract text from a list of article URLs using requests and BeautifulSoup.
+    Extract the main article text from an HTML document.
+    Args:
+        html (bytes or str): The page, preferably the raw response bytes so it is decoded only once.
+        encoding (str, optional): Charset from the Content-Type header, if it named one.
+    Returns:
+        str: The text of the first matching content container, else of the best-scoring block or the whole body.
+    """
+    return extraction.extract_main_text(html, encoding)
+
+def fetch_article_pages(article_urls, validators=None, deadline=None):
+    """
+    Fetch and extract a list of article URLs concurrently, optionally as conditional requests.
+    Args:
+        article_urls (list): List of article URLs to scrape.
+        validators (dict, optional): Maps a URL to the {'etag': ..., 'last_modified': ...} of an earlier
+                                     fetch; these are sent as If-None-Match / If-Modified-Since.
+        deadline (float, optional): Overall time budget in seconds for all URLs (default: SCRAPE_DEADLINE).
+    Returns:
+        list: One dict per non-empty URL, in order, with 'url', 'text', 'etag', 'last_modified',
+              'not_modified' (True on a 304 response) and 'error'.
+    """
+    urls = [url for url in article_urls if url]
+    if len(urls) != len(article_urls):
+        print("Skipping empty URL.")
+
+    extra_headers = {}
+    for url, validator in (validators or {}).items():
+        conditional = {}
+        if validator.get('etag'):
+            conditional['If-None-Match'] = validator['etag']
+        if validator.get('last_modified'):
+            conditional['If-Modified-Since'] = validator['last_modified']
+        if conditional:
+            extra_headers[url] = conditional
+
+    def handle(response):
+        if response.status_code == 304:
+            return None
+        return extract_main_text(response.content, extraction.charset_from_headers(response.headers.get('Content-Type')))
+
+    print(f"Scraping {len(urls)} URLs concurrently")
+    results = fetch_pages(urls, handler=handle, extra_headers=extra_headers, deadline=deadline)
+
+    pages = []
+    for result in results:
+        response = result['response']
+        pages.append({
+            'url': result['url'],
+            'text': result['result'] or "",
+            'etag': response.headers.get('ETag', '') if response is not None else '',
+            'last_modified': response.headers.get('Last-Modified', '') if response is not None else '',
+            'not_modified': result['status'] == 304,
+            'error': result['error'],
+        })
+        if result['error']:
+            print(f"Error scraping URL {result['url']}: {result['error']}")
+    return pages
+
+def extract_article_text(article_urls, deadline=None):
+    """
+    Extract text from a list of article URLs, fetching and parsing the pages concurrently.
     Args:
         article_urls (list): List of article URLs to scrape.
+        deadline (float, optional): Overall time budget in seconds for all URLs (default: SCRAPE_DEADLINE).
     Returns:
-        list: List of extracted text content (one per URL).
+        list: List of extracted text content, in the same order as the URLs (failed URLs are left out).
     """
     if not article_urls:
         print("No URLs provided for extraction.")
         return []
 
     extracted_texts = []
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    for url in article_urls:
-        if not url:
-            print("Skipping empty URL.")
+    for page in fetch_article_pages(article_urls, deadline=deadline):
+        if page['error']:
             continue
-        
-        try:
-            print(f"Scraping URL with BeautifulSoup: {url}")
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            article = None
-            selectors = [
-                'article',
-                '.article-content',
-                '.post-content',
-                '.entry-content',
-                'main',
-                '.content'
-            ]
-            for selector in selectors:
-                element = soup.select_one(selector)
-                if element:
-                    article = element.get_text(strip=True)
-                    break
-            
-            if not article:
-                article = soup.body.get_text(strip=True) if soup.body else ""
-            
-            if article:
-                extracted_texts.append(article)
-                print(f"Successfully extracted text for URL: {url} (Length: {len(article)} characters)")
-            else:
-                print(f"No text extracted for URL: {url}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error scraping URL {url}: {str(e)}")
-            continue
-    
+        if page['text']:
+            extracted_texts.append(page['text'])
+            print(f"Successfully extracted text for URL: {page['url']} (Length: {len(page['text'])} characters)")
+        else:
+            print(f"No text extracted for URL: {page['url']}")
+
     return extracted_texts
 
-def clean_text(text):
+def clean_text(text, source_url=None):
     """
     Clean the extracted text by removing personal info, contact info, emojis, and irrelevant content.
+    The patterns are the rule sets in TEXT_CLEANING_RULES (see blog/text_cleaning.py).
     Args:
         text (str): The raw extracted text.
+        source_url (str, optional): URL the text was scraped from, to apply that domain's rule sets.
     Returns:
         str: The cleaned text.
     """
-    if not text:
-        return ""
+    return text_cleaning.clean_text(text, source_url)
+
+def description_prompt(combined_text, primary_keyword):
+    return f"""
+    Summarize the following text into a concise meta description (150-160 characters) focusing on the main content related to '{primary_keyword}'. 
+    Ensure the description is SEO-optimized by including the keyword '{primary_keyword}' at least once, ideally near the beginning.
+    Exclude any personal information, contact details, or irrelevant metadata. Focus on the core information about the topic.
+
+    Text: {combined_text}
+
+    Provide a professional meta description suitable for a blog post.
+    """
+
+def body_length(target_words):
+    return f"about {target_words} words" if target_words else "800-1200 words, minimum 500 words"
+
+def body_prompt(combined_text, primary_keyword, target_words=None):
+    return f"""
+    Create a blog post about '{primary_keyword}' using the text below. The post should be in HTML format, optimized for WordPress, with:
+    - A catchy and engaging title (up to 60 characters) including '{primary_keyword}'.
+    - A body ({body_length(target_words)}) with an introduction, sections with <h2> subheadings, paragraphs in <p> tags, and emphasis with <strong> or <em>.
+    - SEO-optimized, using '{primary_keyword}' 5-7 times, including in one <h2> and the intro/conclusion.
+    - Focus only on the provided text, avoiding extra details.
+
+    Text: {combined_text}
 
-    text = re.sub(r'Post author:\s*[A-Za-z\s]+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Comment by\s*[A-Za-z\s]+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Author\s*-\s*[A-Za-z\s]+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Post published:\s*[A-Za-z0-9\s,]+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Post last modified:\s*[A-Za-z0-9\s,]+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'LAST UPDATED:\s*[0-9/]+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'updated on\s*[0-9T:.-Z]+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r':school/Blog', '', text, flags=re.IGNORECASE)
-    text = re.sub(r':Mar 26, 2025The Top 10 Boarding Schools in Dehradun for 2025-26', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'The Top 10 Boarding Schools in Dehradun for 2025-26', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
-    text = re.sub(r'\+?\d{1,3}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', '', text)
-    text = re.sub(r'\d+\s+[A-Za-z\s]+,\s*[A-Za-z\s]+,\s*[A-Za-z\s]+,\s*India\s*\d{6}', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'[A-Za-z\s]+,\s*[A-Za-z\s]+,\s*Uttarakhand,\s*India\s*\d{5,6}', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', '', text)
-    text = re.sub(r'Enquire now|Table of Contents|Toggle|Read More|Leave a Reply|Cancel reply|Enter your name or username to comment|Enter your email address to comment|Enter your website URL \(optional\)|Save my name, email, and website in this browser for the next time I comment|Also Read:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
-    text = re.split(r'This Post Has \d+ Comments', text, flags=re.IGNORECASE)[0]
-    text = re.sub(r'\d\.\d\s*⭐+\s*\(\d+\s*Reviews\)', '', text)
-    text = re.sub(r'Fee Structure \(Annual\)Rs \d+(?:\s*–\s*\d+)?', '', text)
-    text = re.sub(r'Grades(KG|[0-9]+)-[0-9]+', '', text)
-    text = re.sub(r'Indoor (Sports|Games)\w+[^:\n]*(?=\n|$)', '', text)
-    text = re.sub(r'Outdoor sports\w+[^:\n]*(?=\n|$)', '', text)
-    text = re.sub(r'Important School Information:-|Location\s*–|Address', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\s+', ' ', text).strip()
-
-    return text
+    Return the result as:
+    Title: [Your title here]
+    Body: [Your full HTML content here, e.g., <h2>Introduction</h2><p>Text...</p><h2>{primary_keyword} Section</h2><p>More text...</p>]
+    """
+
+def combined_prompt(combined_text, primary_keyword, target_words=None):
+    return f"""
+    Create a blog post about '{primary_keyword}' using the text below, optimized for WordPress, and return it as JSON with:
+    - "title": A catchy and engaging title (up to 60 characters) including '{primary_keyword}'.
+    - "meta_description": A concise meta description (150-160 characters) that includes '{primary_keyword}' at least once, ideally near the beginning, with no personal information, contact details, or irrelevant metadata.
+    - "body": The post in HTML ({body_length(target_words)}) with an introduction, sections with <h2> subheadings, paragraphs in <p> tags, and emphasis with <strong> or <em>. SEO-optimized, using '{primary_keyword}' 5-7 times, including in one <h2> and the intro/conclusion.
+    Focus only on the provided text, avoiding extra details.
+
+    Text: {combined_text}
+    """
+
+def fallback_description(primary_keyword):
+    return f"Discover insights on {primary_keyword} in this detailed guide."
+
+def trim_description(description):
+    description = description.strip()
+    if len(description) > 160:
+        description = description[:157] + "..."
+    return description
+
+def parse_blog_response(blog_content, primary_keyword):
+    """
+    Split a "Title: ... Body: ..." response into title and body.
+    Returns:
+        tuple: (title, body), with fallbacks where the response is missing a part.
+    """
+    title_match = re.search(r'Title:\s*(.+?)(?=\nBody:|\n|$)', blog_content, re.DOTALL)
+    body_match = re.search(r'Body:\s*(.+)', blog_content, re.DOTALL)
+
+    title = title_match.group(1).strip() if title_match else f"{primary_keyword}: A Comprehensive Guide"
+    body = body_match.group(1).strip() if body_match else "No content generated."
+
+    if len(body) < 800 and "No content generated" in body:
+        body = f"<h2>Introduction to {primary_keyword}</h2><p>This is a fallback to ensure content. Please check input data or Gemini response.</p>"
+    return title, body
+
+def parse_combined_response(blog_content):
+    """
+    Read the JSON answer of a combined generation call.
+    Raises:
+        ValueError: The answer is not JSON or lacks a non-empty title, meta_description or body.
+    """
+    data = json.loads(blog_content)
+    if not isinstance(data, dict):
+        raise ValueError("Combined response is not a JSON object")
+    missing = [field for field in BLOG_POST_SCHEMA['required'] if not isinstance(data.get(field), str) or not data[field].strip()]
+    if missing:
+        raise ValueError(f"Combined response is missing {', '.join(missing)}")
+    return {
+        "title": data["title"].strip(),
+        "meta_description": trim_description(data["meta_description"]),
+        "body": data["body"].strip(),
+    }
+
+def _describe(combined_text, primary_keyword):
+    # Returns (description, LLMResponse or None); a failed call falls back to a generic description
+    try:
+        print("Generating description with Gemini...")
+        response = llm.generate(description_prompt(combined_text, primary_keyword), task='seo_meta')
+    except Exception as e:
+        print(f"Error generating description with Gemini: {str(e)}")
+        return fallback_description(primary_keyword), None
+    description = trim_description(response.text)
+    print(f"Generated meta description (Length: {len(description)} characters): {description}")
+    return description, response
+
+def _write_body(combined_text, primary_keyword, target_words=None):
+    # Returns (title, body, LLMResponse); raises if the call fails
+    print("Generating blog content with Gemini...")
+    response = llm.generate(body_prompt(combined_text, primary_keyword, target_words), task='seo_post')
+    blog_content = response.text.strip()
+    print(f"Raw Gemini response: {blog_content}")  # Debug: Log raw response
+    title, body = parse_blog_response(blog_content, primary_keyword)
+    print(f"Generated blog title: {title}")
+    print(f"Generated blog body (Length: {len(body)} characters): {body[:500]}...")
+    return title, body, response
+
+def _in_context(function, *args):
+    # Worker threads inherit the caller's LLM deadline and "regenerate fresh" setting
+    try:
+        return contextvars.copy_context().run(function, *args)
+    finally:
+        connection.close()  # The LLM response cache opened this thread's own DB connection; don't leak it
+
+def _generate_sequential(texts, combined_text, primary_keyword, target_words=None):
+    meta_description, description_response = _describe(combined_text, primary_keyword)
+    title, body, body_response = _write_body(combined_text, primary_keyword, target_words)
+    return {"title": title, "meta_description": meta_description or fallback_description(primary_keyword), "body": body}, \
+        [description_response, body_response]
+
+def _generate_concurrent(texts, combined_text, primary_keyword, target_words=None):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        description = pool.submit(_in_context, _describe, combined_text, primary_keyword)
+        blog = pool.submit(_in_context, _write_body, combined_text, primary_keyword, target_words)
+        meta_description, description_response = description.result()
+        title, body, body_response = blog.result()
+    return {"title": title, "meta_description": meta_description or fallback_description(primary_keyword), "body": body}, \
+        [description_response, body_response]
+
+def _generate_combined(texts, combined_text, primary_keyword, target_words=None):
+    print("Generating title, description and body with one Gemini call...")
+    response = llm.generate(combined_prompt(combined_text, primary_keyword, target_words),
+                            generation_config=BLOG_POST_GENERATION_CONFIG, task='seo_post')
+    content = parse_combined_response(response.text)
+    print(f"Generated blog title: {content['title']}")
+    print(f"Generated meta description (Length: {len(content['meta_description'])} characters): {content['meta_description']}")
+    print(f"Generated blog body (Length: {len(content['body'])} characters): {content['body'][:500]}...")
+    return content, [response]
+
+def _generate_outline(texts, combined_text, primary_keyword, target_words=None):
+    print("Generating an outline, then its sections in parallel...")
+    content, responses = outline_generation.generate_outlined_post(
+        texts, combined_text, primary_keyword, target_words or settings.SEO_TARGET_WORDS,
+    )
+    content['meta_description'] = trim_description(content['meta_description'])
+    print(f"Generated blog title: {content['title']}")
+    print(f"Generated blog body (Length: {len(content['body'])} characters): {content['body'][:500]}...")
+    return content, responses
+
+GENERATION_MODES = {
+    'sequential': _generate_sequential,
+    'concurrent': _generate_concurrent,
+    'combined': _generate_combined,
+    'outline': _generate_outline,
+}
+# Modes whose JSON answers may be unusable; they fall back to the two plain calls
+FALLBACK_MODES = {'combined', 'outline'}
+
+def record_generation(mode, responses, latency):
+    """Count one SEO generation in the per-mode stats (calls, tokens, wall-clock latency)."""
+    prefix = f"seo_generation.{mode}."
+    metrics.incr(prefix + 'runs')
+    metrics.incr(prefix + 'latency_ms', round(latency * 1000))
+    for response in responses:
+        if response is None:
+            continue
+        metrics.incr(prefix + 'calls')
+        if response.cached:
+            metrics.incr(prefix + 'cached_calls')
+        else:
+            metrics.incr(prefix + 'prompt_tokens', response.prompt_tokens)
+            metrics.incr(prefix + 'output_tokens', response.output_tokens)
+
+def seo_generation_stats():
+    """Per-mode SEO generation counters with per-run averages, and how much context packing cut the prompts."""
+    fields = ('runs', 'fallbacks', 'calls', 'cached_calls', 'prompt_tokens', 'output_tokens', 'latency_ms')
+    counters = metrics.get_counters([f"seo_generation.{mode}.{field}" for mode in GENERATION_MODES for field in fields])
+    report = {}
+    for mode in GENERATION_MODES:
+        stats = {field: counters[f"seo_generation.{mode}.{field}"] for field in fields}
+        runs = stats['runs']
+        stats['tokens_per_run'] = round((stats['prompt_tokens'] + stats['output_tokens']) / runs) if runs else None
+        stats['mean_latency_ms'] = round(stats['latency_ms'] / runs) if runs else None
+        report[mode] = stats
+    context = metrics.get_counters(['seo_context.raw_tokens', 'seo_context.packed_tokens'])
+    report['context'] = {
+        'raw_tokens': context['seo_context.raw_tokens'],
+        'packed_tokens': context['seo_context.packed_tokens'],
+        'ratio': round(context['seo_context.packed_tokens'] / context['seo_context.raw_tokens'], 3)
+        if context['seo_context.raw_tokens'] else None,
+    }
+    return report
+
+def build_context(texts, primary_keyword):
+    """
+    Pack the cleaned texts into the SEO_CONTEXT_TOKENS budget: near-duplicate passages dropped,
+    the most relevant to the keyword kept.
+    Args:
+        texts (list): List of cleaned extracted texts.
+        primary_keyword (str): The keyword passages are ranked against.
+    Returns:
+        str: The context to put in the prompt.
+    """
+    packed = context_packing.pack_context(texts, primary_keyword, settings.SEO_CONTEXT_TOKENS)
+    metrics.incr('seo_context.raw_tokens', packed.raw_tokens)
+    metrics.incr('seo_context.packed_tokens', packed.tokens)
+    if settings.SEO_CONTEXT_TOKENS > 0:
+        print(f"Packed context: {packed.raw_tokens} -> {packed.tokens} tokens, kept {packed.kept} of "
+              f"{packed.passages} passages ({packed.duplicates} near-duplicates dropped)")
+    return packed.text
 
 def generate_description(texts, primary_keyword):
     """
@@ -158,43 +386,26 @@ def generate_description(texts, primary_keyword):
         print("No texts provided for description generation.")
         return ""
 
-    combined_text = " ".join(texts)
+    combined_text = build_context(texts, primary_keyword)
     if not combined_text:
         print("Combined text is empty after cleaning.")
         return ""
 
-    gemini_api_key = config('GEMINI_API_KEY')
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-
-    prompt = f"""
-    Summarize the following text into a concise meta description (150-160 characters) focusing on the main content related to '{primary_keyword}'. 
-    Ensure the description is SEO-optimized by including the keyword '{primary_keyword}' at least once, ideally near the beginning.
-    Exclude any personal information, contact details, or irrelevant metadata. Focus on the core information about the topic.
+    description, _ = _describe(combined_text, primary_keyword)
+    return description
 
-    Text: {combined_text}
-
-    Provide a professional meta description suitable for a blog post.
-    """
-
-    try:
-        print("Generating description with Gemini...")
-        response = model.generate_content(prompt)
-        description = response.text.strip()
-        if len(description) > 160:
-            description = description[:157] + "..."
-        print(f"Generated meta description (Length: {len(description)} characters): {description}")
-        return description
-    except Exception as e:
-        print(f"Error generating description with Gemini: {str(e)}")
-        return f"Discover insights on {primary_keyword} in this detailed guide."
-
-def generate_blog_content(texts, primary_keyword):
+def generate_blog_content(texts, primary_keyword, mode=None, target_words=None):
     """
     Generate a blog post (title, meta description, body) using the cleaned texts with Gemini Flash 1.5.
     Args:
         texts (list): List of cleaned extracted texts.
         primary_keyword (str): The primary keyword to focus the blog on.
+        mode (str, optional): 'combined' (one JSON-schema call for all three parts, falling back to
+                              'concurrent' if its answer is unusable), 'concurrent' (description and
+                              body calls at once), 'sequential' (description, then body) or 'outline'
+                              (outline, then sections in parallel; also falls back to 'concurrent').
+                              Default: SEO_GENERATION_MODE.
+        target_words (int, optional): Body length to ask for instead of the default 800-1200 words.
     Returns:
         dict: A dictionary containing the title, meta_description, and body of the blog.
     """
@@ -202,58 +413,25 @@ def generate_blog_content(texts, primary_keyword):
         print("No texts provided for blog generation.")
         return {"title": "", "meta_description": "", "body": ""}
 
-    combined_text = " ".join(texts)
+    combined_text = build_context(texts, primary_keyword)
     if not combined_text:
         print("Combined text is empty after cleaning.")
         return {"title": "", "meta_description": "", "body": ""}
 
-    meta_description = generate_description(texts, primary_keyword)
-    if not meta_description:
-        meta_description = f"Discover insights on {primary_keyword} in this detailed guide."
-
-    gemini_api_key = config('GEMINI_API_KEY')
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-
-    prompt = f"""
-    Create a blog post about '{primary_keyword}' using the text below. The post should be in HTML format, optimized for WordPress, with:
-    - A catchy and engaging title (up to 60 characters) including '{primary_keyword}'.
-    - A body (800-1200 words, minimum 500 words) with an introduction, sections with <h2> subheadings, paragraphs in <p> tags, and emphasis with <strong> or <em>.
-    - SEO-optimized, using '{primary_keyword}' 5-7 times, including in one <h2> and the intro/conclusion.
-    - Focus only on the provided text, avoiding extra details.
-
-    Text: {combined_text}
-
-    Return the result as:
-    Title: [Your title here]
-    Body: [Your full HTML content here, e.g., <h2>Introduction</h2><p>Text...</p><h2>{primary_keyword} Section</h2><p>More text...</p>]
-    """
-
+    mode = mode or settings.SEO_GENERATION_MODE
+    started = time.monotonic()
     try:
-        print("Generating blog content with Gemini...")
-        response = model.generate_content(prompt)
-        blog_content = response.text.strip()
-        print(f"Raw Gemini response: {blog_content}")  # Debug: Log raw response
-
-        title_match = re.search(r'Title:\s*(.+?)(?=\nBody:|\n|$)', blog_content, re.DOTALL)
-        body_match = re.search(r'Body:\s*(.+)', blog_content, re.DOTALL)
-
-        title = title_match.group(1).strip() if title_match else f"{primary_keyword}: A Comprehensive Guide"
-        body = body_match.group(1).strip() if body_match else "No content generated."
-
-        print(f"Extracted body (raw): {body}")
-
-        if len(body) < 800 and "No content generated" in body:
-            body = f"<h2>Introduction to {primary_keyword}</h2><p>This is a fallback to ensure content. Please check input data or Gemini response.</p>"
-
-        print(f"Generated blog title: {title}")
-        print(f"Generated blog body (Length: {len(body)} characters): {body[:500]}...")
-
-        return {
-            "title": title,
-            "meta_description": meta_description,
-            "body": body
-        }
+        try:
+            content, responses = GENERATION_MODES[mode](texts, combined_text, primary_keyword, target_words)
+        except (ValueError, llm.LLMError) as e:
+            if mode not in FALLBACK_MODES:
+                raise
+            # A malformed JSON answer or a failed call: the two-call path still gets the post out
+            print(f"{mode.capitalize()} generation failed ({str(e)}), falling back to concurrent calls")
+            metrics.incr(f'seo_generation.{mode}.fallbacks')
+            content, responses = _generate_concurrent(texts, combined_text, primary_keyword, target_words)
+        record_generation(mode, responses, time.monotonic() - started)
+        return content
     except Exception as e:
         print(f"Error generating blog content with Gemini: {str(e)}")
         return {"title": "", "meta_description": "", "body": ""}
@@ -0,0 +1,311 @@
+# blog/grammar.py
+"""
+Grammar checking behind one interface, with two backends picked by GRAMMAR_BACKEND:
+- "languagetool": a LanguageTool server, the public API or a self-hosted one (LANGUAGETOOL_URL).
+  HTML drafts are sent as annotated text so LanguageTool checks the words, not the tags.
+- "local": an in-process rule engine for the most common slips (repeated words, typos,
+  spacing, a lowercase "i"). No network round trip, so it suits drafts checked on every save.
+
+Long drafts are split into paragraph chunks that are checked concurrently, each cached by
+its content hash, so a revision only re-checks the paragraphs that changed. Match offsets are
+mapped back onto the whole document and corrections applied in one pass over it.
+"""
+import hashlib
+import json
+import logging
+import re
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from blog.page_fetcher import get_session
+from blog.ratelimit import TokenBucket
+from blog.research_cache import count_cache_use
+
+logger = logging.getLogger(__name__)
+
+GRAMMAR_CACHE_PREFIX = 'blog:grammar:'
+
+# replacement is None when the checker flags something without suggesting a fix
+GrammarMatch = namedtuple('GrammarMatch', ['offset', 'length', 'replacement', 'rule', 'message'])
+
+# Tags and character references in HTML drafts; corrections never touch them
+MARKUP = re.compile(r'<[^>]*>|&#?\w+;')
+BLOCK_TAG = re.compile(r'</?(p|h[1-6]|li|ul|ol|div|br|blockquote)\b', re.IGNORECASE)
+# Where a chunk may end: after a closing block tag in HTML, after a blank line in Markdown
+HTML_PARAGRAPH_END = re.compile(r'</(p|h[1-6]|li|ul|ol|blockquote|div|table)>\s*', re.IGNORECASE)
+MARKDOWN_PARAGRAPH_END = re.compile(r'\n[ \t]*\n\s*')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+class GrammarError(Exception):
+    pass
+
+
+def html_segments(text):
+    """Split HTML into ('text', ...) and ('markup', ...) segments, in order, covering the whole string."""
+    segments = []
+    position = 0
+    for match in MARKUP.finditer(text):
+        if match.start() > position:
+            segments.append(('text', text[position:match.start()]))
+        segments.append(('markup', match.group()))
+        position = match.end()
+    if position < len(text):
+        segments.append(('text', text[position:]))
+    return segments
+
+
+class LanguageToolBackend:
+    name = 'languagetool'
+
+    def __init__(self, url, language, timeout, rpm=None):
+        self.url = url.rstrip('/')
+        self.language = language
+        self.timeout = timeout
+        # Chunks are checked concurrently; the public API allows 20 requests a minute per IP
+        self.bucket = TokenBucket(rpm / 60.0, capacity=max(1.0, rpm)) if rpm else None
+
+    @property
+    def cache_id(self):
+        return f"{self.name}:{self.url}:{self.language}"
+
+    def check(self, text, html=False):
+        data = {'language': self.language}
+        if html:
+            annotation = []
+            for kind, value in html_segments(text):
+                if kind == 'text':
+                    annotation.append({'text': value})
+                elif value.startswith('&'):
+                    annotation.append({'markup': value, 'interpretAs': unescape(value)})
+                else:
+                    # Block tags read as a paragraph break, so sentences do not run across headings
+                    annotation.append({'markup': value, 'interpretAs': '\n\n' if BLOCK_TAG.match(value) else ''})
+            data['data'] = json.dumps({'annotation': annotation})
+        else:
+            data['text'] = text
+        try:
+            if self.bucket:
+                self.bucket.acquire(timeout=self.timeout)
+            # Offsets in the answer refer to the original text, markup included
+            response = get_session(self.url).post(f"{self.url}/v2/check", data=data, timeout=self.timeout)
+            response.raise_for_status()
+            matches = response.json().get('matches', [])
+        except TimeoutError as e:
+            raise GrammarError(f"LanguageTool rate limit: {str(e)}") from e
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise GrammarError(f"LanguageTool request failed: {str(e)}") from e
+        return [
+            GrammarMatch(
+                offset=match['offset'],
+                length=match['length'],
+                replacement=match['replacements'][0]['value'] if match.get('replacements') else None,
+                rule=match.get('rule', {}).get('id', ''),
+                message=match.get('message', ''),
+            )
+            for match in matches
+        ]
+
+
+COMMON_TYPOS = {
+    'teh': 'the', 'recieve': 'receive', 'recieved': 'received', 'seperate': 'separate', 'occured': 'occurred',
+    'definately': 'definitely', 'alot': 'a lot', 'untill': 'until', 'wich': 'which', 'accomodate': 'accommodate',
+    'acheive': 'achieve', 'beleive': 'believe', 'goverment': 'government', 'neccessary': 'necessary',
+    'occassion': 'occasion', 'publically': 'publicly', 'tommorow': 'tomorrow', 'wierd': 'weird', 'thier': 'their',
+    'enviroment': 'environment', 'existance': 'existence', 'independant': 'independent', 'succesful': 'successful',
+}
+
+
+def _match_case(original, replacement):
+    return replacement[0].upper() + replacement[1:] if original[:1].isupper() else replacement
+
+
+# (rule id, pattern, function from the regex match to its replacement, message)
+LOCAL_RULES = [
+    ('REPEATED_WORD', re.compile(r'\b(\w+)(\s+)\1\b', re.IGNORECASE),
+     lambda m: m.group(1), "Word repeated"),
+    ('TYPO', re.compile(r'\b(' + '|'.join(COMMON_TYPOS) + r')\b', re.IGNORECASE),
+     lambda m: _match_case(m.group(1), COMMON_TYPOS[m.group(1).lower()]), "Possible spelling mistake"),
+    ('LOWERCASE_I', re.compile(r'(?<![\w.])i(?=\s)'),
+     lambda m: 'I', "The pronoun \"I\" is capitalized"),
+    ('WHITESPACE_BEFORE_PUNCTUATION', re.compile(r'(?<=\w)[ \t]+([,.;:!?])(?=\s|$)'),
+     lambda m: m.group(1), "Unexpected space before punctuation"),
+    ('WHITESPACE_BEFORE_COMMA', re.compile(r'(?<=\w)[ \t]+([,;])(?=[A-Za-z])'),
+     lambda m: m.group(1) + ' ', "Space before the comma instead of after it"),
+    ('MISSING_SPACE_AFTER_COMMA', re.compile(r'(?<=[a-z])([,;])(?=[A-Za-z])'),
+     lambda m: m.group(1) + ' ', "Missing space after punctuation"),
+    ('MULTIPLE_SPACES', re.compile(r'(?<=\S)[ ]{2,}(?=\S)'),
+     lambda m: ' ', "Repeated spaces"),
+]
+
+
+class LocalRuleBackend:
+    name = 'local'
+    cache_id = 'local:1'  # Bump when LOCAL_RULES change so cached results are not reused
+
+    def check(self, text, html=False):
+        matches = []
+        position = 0
+        for kind, value in html_segments(text) if html else [('text', text)]:
+            if kind == 'text':
+                for rule, pattern, replace, message in LOCAL_RULES:
+                    for found in pattern.finditer(value):
+                        matches.append(GrammarMatch(position + found.start(), found.end() - found.start(),
+                                                    replace(found), rule, message))
+            position += len(value)
+        return sorted(matches, key=lambda match: match.offset)
+
+
+def build_backend():
+    if settings.GRAMMAR_BACKEND == 'local':
+        return LocalRuleBackend()
+    return LanguageToolBackend(settings.LANGUAGETOOL_URL, settings.GRAMMAR_LANGUAGE, settings.GRAMMAR_TIMEOUT,
+                               rpm=settings.GRAMMAR_RPM)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = build_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Swap the process-wide backend (the tests use this for a fake one). Returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+def cache_key(backend, text, html):
+    material = f"{backend.cache_id}\0{int(html)}\0{text}"
+    return GRAMMAR_CACHE_PREFIX + hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def split_chunks(text, html=False, max_chars=None, min_chars=None):
+    """
+    Split a draft into consecutive chunks at paragraph boundaries. Paragraphs shorter than
+    min_chars (headings, one-liners) join the next one; longer than max_chars are split between
+    sentences. Boundaries depend only on the text around them, so editing one paragraph leaves
+    the other chunks, and their cache entries, as they were.
+    Returns:
+        list: (offset in the draft, chunk text) pairs that together cover the whole draft.
+    """
+    max_chars = max_chars or settings.GRAMMAR_CHUNK_CHARS
+    min_chars = min_chars if min_chars is not None else settings.GRAMMAR_MIN_CHUNK_CHARS
+    ends = [found.end() for found in (HTML_PARAGRAPH_END if html else MARKDOWN_PARAGRAPH_END).finditer(text)]
+    if not ends or ends[-1] != len(text):
+        ends.append(len(text))
+
+    chunks = []
+    start = 0
+    for end in ends:
+        if end - start < min_chars and end != len(text):
+            continue  # Too short on its own; carry on into the next paragraph
+        while end - start > max_chars:
+            cut = None
+            for found in SENTENCE_END.finditer(text, start + 1, start + max_chars):
+                cut = found.end()
+            cut = cut or start + max_chars  # One sentence longer than max_chars; cut it anyway
+            chunks.append((start, text[start:cut]))
+            start = cut
+        if end > start:
+            chunks.append((start, text[start:end]))
+            start = end
+    return chunks
+
+
+def check(text, html=False):
+    """
+    Return the grammar matches for a draft, with offsets into the whole draft. Chunks checked
+    before (same content, backend and mode) come from the cache; the rest are checked
+    concurrently on up to GRAMMAR_MAX_WORKERS threads.
+    Raises:
+        GrammarError: The backend could not be reached or gave an unusable answer. Chunks that
+                      were checked are cached anyway, so a retry only repeats the failed ones.
+    """
+    backend = get_backend()
+    chunks = [(offset, chunk) for offset, chunk in split_chunks(text, html) if chunk.strip()]
+    keys = [cache_key(backend, chunk, html) for _, chunk in chunks]
+    cached = cache.get_many(keys)
+    pending = [i for i, key in enumerate(keys) if key not in cached]
+
+    def check_chunk(i):
+        try:
+            return backend.check(chunks[i][1], html), None
+        except GrammarError as e:
+            return None, e
+
+    results = {}
+    errors = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(settings.GRAMMAR_MAX_WORKERS, len(pending))) as pool:
+            for i, (matches, error) in zip(pending, pool.map(check_chunk, pending)):
+                if error:
+                    errors.append(error)
+                else:
+                    results[keys[i]] = [tuple(match) for match in matches]
+        cache.set_many(results, settings.GRAMMAR_CACHE_TTL)
+    count_cache_use('grammar', hits=len(chunks) - len(pending), misses=len(results))
+    logger.info(f"Grammar: {len(chunks)} chunks, {len(chunks) - len(pending)} unchanged, {len(pending)} checked")
+    if errors:
+        raise GrammarError(f"{len(errors)} of {len(chunks)} chunks failed: {errors[0]}")
+
+    matches = []
+    for (offset, _), key in zip(chunks, keys):
+        for match in cached[key] if key in cached else results[key]:
+            match = GrammarMatch(*match)
+            matches.append(match._replace(offset=offset + match.offset))
+    return matches
+
+
+def apply_matches(text, matches, html=False):
+    """
+    Apply the suggested replacements in one left-to-right pass. Matches without a suggestion,
+    overlapping an earlier applied one, or (for HTML) touching a tag or entity are skipped.
+    Returns:
+        tuple: (corrected text, number of corrections applied).
+    """
+    protected = [found.span() for found in MARKUP.finditer(text)] if html else []
+    protected_starts = [start for start, _ in protected]
+    pieces = []
+    position = 0
+    applied = 0
+    for match in sorted(matches, key=lambda match: match.offset):
+        start, end = match.offset, match.offset + match.length
+        if match.replacement is None or start < position or end > len(text):
+            continue
+        i = bisect_left(protected_starts, end) - 1  # The last tag starting before the match ends
+        if i >= 0 and protected[i][1] > start:
+            continue
+        pieces.append(text[position:start])
+        pieces.append(match.replacement)
+        position = end
+        applied += 1
+    pieces.append(text[position:])
+    return ''.join(pieces), applied
+
+
+def correct(text, html=False):
+    """
+    Check a draft and apply the first suggestion of every match.
+    Args:
+        text (str): The draft, Markdown or (with html=True) WordPress HTML.
+        html (bool): Leave tags and entities alone and let the checker see only the words.
+    Returns:
+        tuple: (corrected text, number of corrections applied).
+    """
+    if not text or not text.strip():
+        return text, 0
+    corrected, applied = apply_matches(text, check(text, html), html)
+    logger.info(f"Grammar ({get_backend().name}): applied {applied} corrections")
+    return corrected, applied
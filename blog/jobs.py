@@ -0,0 +1,183 @@
+# blog/jobs.py
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from blog import grammar, llm, refine
+from blog.models import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+
+def correct_grammar(text, preserve_html=False):
+    """
+    Run the text through the grammar service and apply the first suggestion of every match.
+    Args:
+        text (str): The draft to correct.
+        preserve_html (bool): Leave the WordPress HTML tags alone and check only the words.
+    Returns:
+        tuple: (corrected text, number of corrections applied).
+    """
+    return grammar.correct(text, html=preserve_html)
+
+
+def run_llm_job(payload):
+    response = llm.generate(payload['prompt'], task=payload.get('task'))
+    return {'content': response.text.strip()}
+
+
+def run_refine_job(payload):
+    return refine.refine(payload['draft'], payload['feedback'], payload['prompt'], payload['instructions'])
+
+
+def run_grammar_job(payload):
+    content, fixes = correct_grammar(payload['text'], preserve_html=payload.get('preserve_html', False))
+    return {'content': content, 'fixes': fixes}
+
+
+def run_seo_generate_job(payload):
+    from blog.generate_seo_content import clean_text, generate_blog_content
+    from blog.research_cache import cached_articles, cached_google_articles
+
+    keyword = payload['keyword']
+    urls = cached_google_articles(keyword, num_results=4)
+    cleaned_texts = [clean_text(text, url) for url, text in cached_articles(urls)]
+    return generate_blog_content(cleaned_texts, keyword)
+
+
+JOB_RUNNERS = {
+    'llm': run_llm_job,
+    'refine': run_refine_job,
+    'grammar': run_grammar_job,
+    'seo_generate': run_seo_generate_job,
+}
+
+
+def execute_job(job_id):
+    """
+    Run a queued GenerationJob and store its result or error on the row. Called by the Celery task.
+    Args:
+        job_id (str): Primary key of the GenerationJob.
+    """
+    # Claiming the job in one UPDATE, so a task delivered twice cannot run it twice
+    claimed = GenerationJob.objects.filter(pk=job_id, status=GenerationJob.STATUS_PENDING).update(
+        status=GenerationJob.STATUS_RUNNING, updated_at=timezone.now())
+    if not claimed:
+        logger.info(f"Job {job_id} is no longer pending, skipping.")
+        return
+    job = GenerationJob.objects.get(pk=job_id)
+    try:
+        # One deadline for the whole job, set by the view's call site (LLM_CALL_SITES), so a runner
+        # making several calls cannot run forever; "regenerate fresh" submissions bypass the LLM
+        # response cache for every call they make
+        with llm.call_site(job.payload.get('site', 'default')), llm.fresh_responses(job.payload.get('fresh', False)):
+            job.result = JOB_RUNNERS[job.kind](job.payload)
+        job.status = GenerationJob.STATUS_DONE
+    except llm.DeadlineExceeded as e:
+        logger.warning(f"Job {job_id} ({job.kind}/{job.action}) ran out of time: {e}")
+        seconds = llm.site_config(job.payload.get('site', 'default')).get('deadline')
+        job.error = (f"This took longer than {seconds:.0f} seconds and was stopped. "
+                     f"Gemini is slow right now; please try again in a moment.")
+        job.status = GenerationJob.STATUS_FAILED
+    except Exception as e:
+        logger.exception(f"Job {job_id} ({job.kind}/{job.action}) failed")
+        job.error = str(e)
+        job.status = GenerationJob.STATUS_FAILED
+    job.save(update_fields=['result', 'error', 'status', 'updated_at'])
+
+
+def submit_job(request, session_key, kind, action, payload):
+    """
+    Create a GenerationJob, remember it in the session and hand it to Celery
+    (or run it inline when GENERATION_ASYNC is off).
+    Args:
+        request (HttpRequest): The current request; the job belongs to request.user.
+        session_key (str): Session key under which the submitting view tracks its job.
+        kind (str): Runner name, one of JOB_RUNNERS.
+        action (str): The view action, used later by the view to apply the result.
+        payload (dict): Runner input plus whatever the view needs for the handoff.
+    Returns:
+        GenerationJob: The created job.
+    """
+    from blog.tasks import run_generation_job
+
+    job = GenerationJob.objects.create(user=request.user, kind=kind, action=action, payload=payload)
+    request.session[session_key] = str(job.id)
+    request.session.modified = True
+    if settings.GENERATION_ASYNC:
+        run_generation_job.delay(str(job.id))
+    else:
+        execute_job(str(job.id))
+    return job
+
+
+def expire_stale_job(job, now=None):
+    """
+    Mark a job failed if it has been queued or running for longer than its call site's deadline
+    plus GENERATION_JOB_GRACE, which only happens when its worker died or its message was lost.
+    Returns:
+        bool: Whether the job was expired.
+    """
+    if job.is_finished:
+        return False
+    now = now or timezone.now()
+    deadline = llm.site_config(job.payload.get('site', 'default')).get('deadline') or settings.LLM_JOB_DEADLINE
+    # A running job's updated_at is when it started; a queued one has only been waiting since it was created
+    started = job.updated_at if job.status == GenerationJob.STATUS_RUNNING else job.created_at
+    if now - started < timedelta(seconds=deadline + settings.GENERATION_JOB_GRACE):
+        return False
+    error = "This step did not finish in time and was stopped. Please try again."
+    # Conditional, so a worker that finishes at the same moment wins
+    expired = GenerationJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+        status=GenerationJob.STATUS_FAILED, error=error, updated_at=now,
+    )
+    if expired:
+        logger.warning(f"Job {job.pk} ({job.kind}/{job.action}) was {job.status} since {started}, marked failed")
+        job.status, job.error, job.updated_at = GenerationJob.STATUS_FAILED, error, now
+    else:
+        job.refresh_from_db()
+    return bool(expired)
+
+
+def get_session_job(request, session_key):
+    """
+    Return the job the view is currently tracking in the session, if any. A job that has been
+    stuck past its deadline is marked failed here, so its error is handed off like any other
+    result and the view stops waiting for it.
+    """
+    job_id = request.session.get(session_key)
+    if not job_id:
+        return None
+    job = GenerationJob.objects.filter(pk=job_id, user=request.user).first()
+    if job is None:
+        request.session.pop(session_key, None)
+        return None
+    expire_stale_job(job)
+    return job
+
+
+def take_finished_job(request, session_key):
+    """
+    Return the tracked job once it has finished and stop tracking it, so its result is applied only once.
+    Returns:
+        GenerationJob or None: The finished job, or None if there is nothing to hand off yet.
+    """
+    job = get_session_job(request, session_key)
+    if job is None or not job.is_finished:
+        return None
+    request.session.pop(session_key, None)
+    request.session.modified = True
+    # Conditional update so two concurrent page loads cannot both apply the same result
+    if not GenerationJob.objects.filter(pk=job.pk, applied=False).update(applied=True):
+        return None
+    return job
+
+
+def pending_job_id(request, session_key):
+    """Return the id of the tracked job while it is still queued or running, for the template to poll."""
+    job = get_session_job(request, session_key)
+    if job is not None and not job.is_finished:
+        return str(job.id)
+    return None
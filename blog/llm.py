@@ -0,0 +1,773 @@
+# blog/llm.py
+"""
+The one place the app talks to Gemini.
+
+Every call goes through a shared LLMClient: one configured model per process, client-side
+RPM/TPM token buckets, a cap on concurrent calls, deadlines that propagate to nested calls,
+retries on transient errors within the deadline, and a circuit breaker that fails fast while
+Gemini is down. LLM_BACKEND='fake' swaps Gemini for a deterministic offline backend.
+
+Calls are attributed to the call site they run under (call_site(), LLM_CALL_SITES). A site
+sets a hard deadline and has its own latency histogram. At sites with hedging enabled, a call
+still running after the site's recent p90 latency gets a second, identical request, and the
+first answer wins.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from blog import metrics
+from blog.ratelimit import FairSemaphore, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Rough estimate used to charge the TPM bucket before the real count is known
+
+
+class LLMError(Exception):
+    """A Gemini call failed (transient errors are retried before this is raised)."""
+
+
+class CircuitOpenError(LLMError):
+    """Gemini failed repeatedly and calls are being refused until the breaker's reset timeout passes."""
+
+
+class DeadlineExceeded(LLMError):
+    """The caller's deadline passed before the call could finish."""
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    prompt_tokens: int
+    output_tokens: int
+    latency: float  # seconds, including queueing for the rate limiter and concurrency slots
+    model: str
+    cached: bool = False
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+# Deadlines: an absolute time.monotonic() value, inherited by nested calls and worker threads started with copy_context()
+_deadline = contextvars.ContextVar('llm_deadline', default=None)
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """
+    Bound every LLM call made inside the block to finish within `seconds` from now.
+    Nested deadlines can only shorten the outer one.
+    """
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(at, outer))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+# Set for "regenerate fresh" actions: skip cached responses (the new response still replaces the cached one)
+_fresh = contextvars.ContextVar('llm_fresh', default=False)
+
+
+@contextlib.contextmanager
+def fresh_responses(enabled=True):
+    """Make every LLM call inside the block bypass the response cache when `enabled`."""
+    token = _fresh.set(bool(enabled))
+    try:
+        yield
+    finally:
+        _fresh.reset(token)
+
+
+# Call site the current calls are made for: picks their deadline, hedging and latency histogram
+_site = contextvars.ContextVar('llm_call_site', default='default')
+
+HISTOGRAM_BOUNDS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)  # seconds; a last bucket takes the rest
+
+
+def site_config(site):
+    """The LLM_CALL_SITES entry for a site, or the 'default' one."""
+    return settings.LLM_CALL_SITES.get(site) or settings.LLM_CALL_SITES['default']
+
+
+@contextlib.contextmanager
+def call_site(name, seconds=None):
+    """
+    Attribute every LLM call made inside the block to a call site: its latency goes to that
+    site's histogram, it is hedged if the site enables hedging, and the whole block gets the
+    site's hard deadline. Sites missing from LLM_CALL_SITES count as 'default'.
+    Args:
+        name (str): The call site, e.g. 'blogcraft.refine'.
+        seconds (float, optional): Deadline for this block instead of the site's.
+    """
+    seconds = seconds if seconds is not None else site_config(name).get('deadline')
+    token = _site.set(name if name in settings.LLM_CALL_SITES else 'default')
+    try:
+        with deadline(seconds) if seconds else contextlib.nullcontext():
+            yield
+    finally:
+        _site.reset(token)
+
+
+def current_site():
+    return _site.get()
+
+
+def remaining_time():
+    """Seconds left before the current deadline, or None if there is none."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `threshold` consecutive failures the breaker opens and
+    refuses calls for `reset_timeout` seconds, then lets a single trial call through (half-open);
+    its success closes the breaker again, its failure re-opens it.
+    """
+
+    def __init__(self, threshold, reset_timeout, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half-open' if self._clock() - self._opened_at >= self.reset_timeout else 'open'
+
+    def before_call(self):
+        """Raises CircuitOpenError while open. Returns True if this call is the half-open trial."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._clock() - self._opened_at < self.reset_timeout or self._trial_running:
+                raise CircuitOpenError("Gemini is unavailable right now; please try again shortly.")
+            self._trial_running = True
+            return True
+
+    def abort_trial(self):
+        """The half-open trial call ended without telling anything about Gemini; let another one try."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                if self._opened_at is None or self._trial_running:
+                    logger.warning(f"LLM circuit breaker opened after {self._failures} consecutive failures")
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+class LatencyHistogram:
+    """
+    Per call site latencies. The bucket counts go to the shared metrics counters, so they can be
+    exported from any process. Recent samples are kept in this process for the hedging percentile.
+    """
+
+    def __init__(self, window=500):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def observe(self, site, seconds):
+        with self._lock:
+            self._samples[site].append(seconds)
+        bound = next((bound for bound in HISTOGRAM_BOUNDS if seconds <= bound), 'inf')
+        metrics.incr(f'llm.latency.{site}.le_{bound}')
+
+    def percentile(self, site, p):
+        """(latency at percentile p of the recent samples or None, number of samples)."""
+        with self._lock:
+            samples = sorted(self._samples[site])
+        if not samples:
+            return None, 0
+        return samples[min(len(samples) - 1, int(len(samples) * p))], len(samples)
+
+
+def histogram_report():
+    """Bucket counts per configured call site from the shared counters: {site: {'le_<seconds>': count, ...}}."""
+    buckets = [f'le_{bound}' for bound in HISTOGRAM_BOUNDS] + ['le_inf']
+    names = [f'llm.latency.{site}.{bucket}' for site in settings.LLM_CALL_SITES for bucket in buckets]
+    counters = metrics.get_counters(names)
+    report = {}
+    for site in settings.LLM_CALL_SITES:
+        counts = {bucket: counters[f'llm.latency.{site}.{bucket}'] for bucket in buckets}
+        counts['count'] = sum(counts.values())
+        report[site] = counts
+    return report
+
+
+class GeminiBackend:
+    name = 'gemini'
+
+    def __init__(self, model_name, api_key):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, timeout, generation_config=None):
+        response = self.model.generate_content(
+            prompt, generation_config=generation_config, request_options={'timeout': timeout}
+        )
+        usage = getattr(response, 'usage_metadata', None)
+        return response.text, getattr(usage, 'prompt_token_count', 0), getattr(usage, 'candidates_token_count', 0)
+
+    def stream(self, prompt, timeout, generation_config=None):
+        """Yield (text, prompt_tokens, output_tokens); the token counts arrive with the last chunk."""
+        for chunk in self.model.generate_content(
+            prompt, stream=True, generation_config=generation_config, request_options={'timeout': timeout}
+        ):
+            usage = getattr(chunk, 'usage_metadata', None)
+            yield chunk.text, getattr(usage, 'prompt_token_count', 0), getattr(usage, 'candidates_token_count', 0)
+
+    @staticmethod
+    def is_transient(error):
+        from google.api_core import exceptions
+
+        return isinstance(error, (
+            exceptions.ResourceExhausted, exceptions.ServiceUnavailable, exceptions.DeadlineExceeded,
+            exceptions.InternalServerError, TimeoutError, ConnectionError,
+        ))
+
+
+class FakeBackend:
+    """
+    Offline stand-in for Gemini: answers every prompt with a deterministic markdown post built from
+    the prompt's words after LLM_FAKE_LATENCY seconds (as JSON when a response schema asks for it).
+    Used by the tests, benchmarks and local development.
+    """
+    name = 'fake'
+    model_name = 'fake'
+
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def respond(self, prompt):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("Fake backend configured to fail")
+        words = [word.strip(".,:;'\"") for word in prompt.split()][:12]
+        topic = " ".join(word for word in words if word) or "Untitled"
+        paragraph = f"This is a generated post about {topic}. " * 3
+        return f"# {topic[:60]}\n\n{paragraph.strip()}\n\n## Details\n\nMore about {topic}."
+
+    @classmethod
+    def as_json(cls, text, generation_config):
+        # JSON mode: the canned text in every string of the response schema, three items per array
+        return json.dumps(cls.fill_schema(generation_config.get('response_schema') or {'type': 'STRING'}, text))
+
+    @classmethod
+    def fill_schema(cls, schema, text):
+        kind = schema.get('type', 'STRING').upper()
+        if kind == 'OBJECT':
+            return {name: cls.fill_schema(field, text) for name, field in schema.get('properties', {}).items()}
+        if kind == 'ARRAY':
+            return [cls.fill_schema(schema.get('items', {}), text) for _ in range(3)]
+        return text
+
+    def generate(self, prompt, timeout, generation_config=None):
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake backend timed out after {timeout:.1f}s")
+        time.sleep(self.latency)
+        text = self.respond(prompt)
+        if generation_config and generation_config.get('response_mime_type') == 'application/json':
+            text = self.as_json(text, generation_config)
+        return text, estimate_tokens(prompt), estimate_tokens(text)
+
+    def stream(self, prompt, timeout, generation_config=None):
+        text, prompt_tokens, output_tokens = self.generate(prompt, timeout)
+        words = text.split(' ')
+        for start in range(0, len(words), 8):
+            last = start + 8 >= len(words)
+            yield " ".join(words[start:start + 8]) + ("" if last else " "), \
+                prompt_tokens if last else 0, output_tokens if last else 0
+
+    @staticmethod
+    def is_transient(error):
+        return isinstance(error, (TimeoutError, ConnectionError))
+
+
+class LLMClient:
+    """
+    Rate-limited, concurrency-bounded, circuit-broken access to one model.
+    Args:
+        backend: GeminiBackend or FakeBackend.
+        rpm (float): Requests per minute allowed by the quota.
+        tpm (float): Tokens per minute allowed by the quota (prompt + output).
+        max_concurrency (int): Calls in flight at once in this process.
+        timeout (float): Per-attempt timeout when no tighter deadline is set.
+        retries (int): Extra attempts on transient errors.
+        breaker (CircuitBreaker): Shared breaker.
+        output_token_estimate (int): Output tokens charged up front and settled after the call.
+        hedge_percentile (float): Latency percentile of the call site after which a call is hedged.
+        hedge_min_delay (float): Never hedge a call sooner than this many seconds.
+        hedge_min_samples (int): Latencies a site needs before its calls are hedged.
+        hedge_budget (float): Hedges allowed as a share of all calls, so a slow spell cannot double the load.
+    """
+
+    def __init__(self, backend, rpm, tpm, max_concurrency, timeout, retries, breaker, output_token_estimate=1000,
+                 hedge_percentile=0.9, hedge_min_delay=1.0, hedge_min_samples=20, hedge_budget=0.1):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.requests_bucket = TokenBucket(rpm / 60.0, capacity=max(1.0, rpm))
+        self.tokens_bucket = TokenBucket(tpm / 60.0, capacity=tpm)
+        self.slots = FairSemaphore(max_concurrency)  # FIFO, so queued callers are served in order
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker = breaker
+        self.output_token_estimate = output_token_estimate
+        self.latencies = deque(maxlen=1000)  # Recent successful call latencies, for llm_stats()
+        self.histogram = LatencyHistogram()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_budget = hedge_budget
+        self._hedge_lock = threading.Lock()
+        self._generate_calls = 0
+        self._hedges = 0
+
+    def _call_deadline(self, timeout):
+        """Absolute deadline of one call: the caller's deadline, tightened by `timeout` if given."""
+        at = _deadline.get()
+        if timeout:
+            at = min(at, time.monotonic() + timeout) if at is not None else time.monotonic() + timeout
+        return at
+
+    def _time_left(self, at):
+        """Seconds the next wait or attempt may take: the per-attempt timeout, cut short by the deadline."""
+        if at is None:
+            return self.timeout
+        left = min(self.timeout, at - time.monotonic())
+        if left <= 0:
+            metrics.incr('llm.deadline_exceeded')
+            raise DeadlineExceeded("The request ran out of time before Gemini could answer.")
+        return left
+
+    def _admit(self, prompt, at):
+        """Wait for quota and a concurrency slot within the deadline. Returns the tokens charged."""
+        charged = min(estimate_tokens(prompt) + self.output_token_estimate, self.tokens_bucket.capacity)
+        try:
+            self.requests_bucket.acquire(timeout=self._time_left(at))
+            self.tokens_bucket.acquire(charged, timeout=self._time_left(at))
+            if not self.slots.acquire(timeout=self._time_left(at)):
+                raise TimeoutError
+        except (TimeoutError, DeadlineExceeded):
+            metrics.incr('llm.deadline_exceeded')
+            raise DeadlineExceeded("Gemini quota or a free slot did not become available before the deadline.")
+        return charged
+
+    def _settle(self, charged, prompt_tokens, output_tokens, started, attempts):
+        latency = time.monotonic() - started
+        used = prompt_tokens + output_tokens
+        if used > charged:
+            self.tokens_bucket.debit(used - charged)
+        self.latencies.append(latency)
+        self.histogram.observe(_site.get(), latency)
+        metrics.incr('llm.calls')
+        metrics.incr('llm.prompt_tokens', prompt_tokens)
+        metrics.incr('llm.output_tokens', output_tokens)
+        metrics.incr('llm.latency_ms', int(latency * 1000))
+        if attempts > 1:
+            metrics.incr('llm.retries', attempts - 1)
+        logger.info(f"LLM call: {latency:.2f}s, {prompt_tokens} prompt + {output_tokens} output tokens, {attempts} attempt(s)")
+        return latency
+
+    def _transient(self, error):
+        return self.backend.is_transient(error) and not isinstance(error, LLMError)
+
+    def _call_failed(self, transient_error, trial):
+        """
+        End a call that got no answer. It counts against the breaker once, however many attempts
+        it made, and only if Gemini itself failed (a transient error); a rejected request, a
+        cancelled hedge, a deadline spent queueing or an abandoned stream only frees the
+        half-open trial if this call was it.
+        """
+        if transient_error is not None:
+            self.breaker.record_failure()
+        elif trial:
+            self.breaker.abort_trial()
+
+    def _fail(self, error, started):
+        metrics.incr('llm.errors')
+        logger.warning(f"LLM call failed after {time.monotonic() - started:.2f}s: {error}")
+
+    def hedge_delay(self, site):
+        """Seconds after which a call at this site gets a second request, or None if it is not hedged."""
+        if not site_config(site).get('hedge'):
+            return None
+        threshold, samples = self.histogram.percentile(site, self.hedge_percentile)
+        if samples < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, threshold)
+
+    def _take_hedge(self):
+        with self._hedge_lock:
+            if self._hedges >= self.hedge_budget * self._generate_calls:
+                return False
+            self._hedges += 1
+            return True
+
+    def generate(self, prompt, timeout=None, generation_config=None):
+        """
+        Generate a complete response, hedged if the current call site asks for it.
+        Args:
+            prompt (str): The prompt.
+            timeout (float, optional): Tighter bound for this call than the current deadline.
+            generation_config (dict, optional): Passed to Gemini (temperature, response schema, ...).
+        Returns:
+            LLMResponse: Text plus token counts and latency.
+        Raises:
+            CircuitOpenError, DeadlineExceeded, LLMError
+        """
+        with self._hedge_lock:
+            self._generate_calls += 1
+        delay = self.hedge_delay(_site.get())
+        if delay is None:
+            return self._generate(prompt, timeout, generation_config)
+        return self._hedged(prompt, timeout, generation_config, delay)
+
+    def _hedged(self, prompt, timeout, generation_config, delay):
+        """
+        Start the call; if it has not answered after `delay` seconds, start an identical one and
+        return whichever answers first. A request already sent cannot be aborted, so the other
+        one is cancelled where possible (no retries, no waiting for quota) and its answer dropped.
+        """
+        started = time.monotonic()
+        answers = queue.Queue()
+        cancelled = threading.Event()
+
+        def attempt(hedge):
+            try:
+                answers.put((hedge, self._generate(prompt, timeout, generation_config, cancelled), None))
+            except Exception as e:
+                answers.put((hedge, None, e))
+
+        def start(hedge):
+            context = contextvars.copy_context()  # Same deadline and call site as the caller
+            threading.Thread(target=context.run, args=(attempt, hedge), daemon=True, name='llm-hedge').start()
+
+        start(False)
+        pending = 1
+        try:
+            answer = answers.get(timeout=delay)
+        except queue.Empty:
+            answer = None
+            if self._take_hedge():
+                metrics.incr('llm.hedges')
+                logger.info(f"LLM call at {_site.get()} still running after {delay:.2f}s, sending a hedged request")
+                start(True)
+                pending += 1
+        while True:
+            if answer is None:
+                answer = answers.get()
+            hedge, response, error = answer
+            pending -= 1
+            if error is None:
+                cancelled.set()
+                if hedge:
+                    metrics.incr('llm.hedge_wins')
+                response.latency = time.monotonic() - started
+                return response
+            if not pending:
+                cancelled.set()
+                raise error
+            answer = None
+
+    def _generate(self, prompt, timeout=None, generation_config=None, cancelled=None):
+        at = self._call_deadline(timeout)
+        started = time.monotonic()
+        attempts = 0
+        failure = None  # Last transient error, if any attempt hit one
+        trial = self.breaker.before_call()
+        try:
+            while True:
+                attempts += 1
+                if cancelled is not None and cancelled.is_set():
+                    raise LLMError("Cancelled: the hedged request answered first")
+                charged = self._admit(prompt, at)
+                backoff = None
+                try:
+                    text, prompt_tokens, output_tokens = self.backend.generate(prompt, self._time_left(at), generation_config)
+                except Exception as e:
+                    failure = e if self._transient(e) else failure
+                    retry = cancelled is None or not cancelled.is_set()
+                    if retry and self._transient(e) and attempts <= self.retries:
+                        backoff = min(2 ** (attempts - 1), 8)
+                        if at is None or at - time.monotonic() > backoff:
+                            logger.info(f"Transient LLM error, retrying in {backoff}s: {e}")
+                            continue  # Sleeps below, once the slot is released
+                        backoff = None
+                    self._fail(e, started)
+                    if isinstance(e, LLMError):
+                        raise
+                    if at is not None and time.monotonic() >= at:
+                        # The attempt was cut short by the caller's deadline, not by Gemini failing
+                        metrics.incr('llm.deadline_exceeded')
+                        raise DeadlineExceeded("The request ran out of time before Gemini could answer.") from e
+                    raise LLMError(f"Gemini request failed: {e}") from e
+                finally:
+                    self.slots.release()
+                    if backoff is not None:
+                        # Waiting out the backoff without a slot; the retry queues for quota and a slot again
+                        time.sleep(backoff)
+                self.breaker.record_success()
+                latency = self._settle(charged, prompt_tokens, output_tokens, started, attempts)
+                return LLMResponse(text, prompt_tokens, output_tokens, latency, self.model_name)
+        except BaseException:
+            self._call_failed(failure, trial)
+            raise
+
+    def stream(self, prompt, timeout=None, generation_config=None):
+        """
+        Yield the response text chunk by chunk. The concurrency slot is held until the stream ends
+        or the consumer stops iterating. Streams are not retried once the first chunk has been sent.
+        """
+        at = self._call_deadline(timeout)
+        started = time.monotonic()
+        trial = self.breaker.before_call()
+        try:
+            charged = self._admit(prompt, at)
+        except BaseException:
+            self._call_failed(None, trial)
+            raise
+        prompt_tokens = output_tokens = 0
+        try:
+            for text, chunk_prompt_tokens, chunk_output_tokens in self.backend.stream(prompt, self._time_left(at), generation_config):
+                prompt_tokens = chunk_prompt_tokens or prompt_tokens
+                output_tokens = chunk_output_tokens or output_tokens
+                if text:
+                    yield text
+        except GeneratorExit:
+            # The consumer stopped reading: nothing is known about Gemini, but a half-open trial must end
+            self._call_failed(None, trial)
+            raise
+        except Exception as e:
+            self._call_failed(e if self._transient(e) else None, trial)
+            self._fail(e, started)
+            if isinstance(e, LLMError):
+                raise
+            raise LLMError(f"Gemini request failed: {e}") from e
+        finally:
+            self.slots.release()
+        self.breaker.record_success()
+        self._settle(charged, prompt_tokens, output_tokens, started, 1)
+
+
+_client = None   # Set by set_client(): serves every model, routing aside
+_clients = {}     # Model name -> client, built on first use
+_client_lock = threading.Lock()
+
+
+def build_backend(model=None):
+    model = model or settings.LLM_MODEL
+    if settings.LLM_BACKEND == 'fake':
+        backend = FakeBackend(latency=settings.LLM_FAKE_LATENCY)
+        backend.model_name = model
+        return backend
+    from decouple import config
+
+    return GeminiBackend(model, config('GEMINI_API_KEY'))
+
+
+def get_client(model=None):
+    """
+    The process-wide client for a model (default: LLM_MODEL), built on first use from the LLM_*
+    settings. Each model gets its own rate limits, concurrency slots and circuit breaker, as
+    Gemini quotas are per model.
+    """
+    model = model or settings.LLM_MODEL
+    with _client_lock:
+        if _client is not None:
+            return _client
+        if model not in _clients:
+            _clients[model] = LLMClient(
+                build_backend(model),
+                rpm=settings.LLM_RPM,
+                tpm=settings.LLM_TPM,
+                max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                timeout=settings.LLM_TIMEOUT,
+                retries=settings.LLM_RETRIES,
+                breaker=CircuitBreaker(settings.LLM_BREAKER_THRESHOLD, settings.LLM_BREAKER_RESET),
+                hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+                hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+                hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+                hedge_budget=settings.LLM_HEDGE_BUDGET,
+            )
+        return _clients[model]
+
+
+def breaker_open(model):
+    """Whether the model's client is failing fast right now (False if it has not been built yet)."""
+    client = _client or _clients.get(model)
+    return client is not None and client.breaker.state == 'open'
+
+
+def set_client(client):
+    """
+    Swap in one client for every model (e.g. for a benchmark with a fake backend), which also
+    turns off model routing. Returns the previous one.
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+        return previous
+
+
+def _cache_key(client, prompt, generation_config, cache):
+    if not (cache and settings.LLM_CACHE_ENABLED):
+        return None
+    from blog import llm_cache
+
+    return llm_cache.cache_key(client.model_name, prompt, generation_config)
+
+
+def _route(task, prompt):
+    """The model for a task type, or None to use LLM_MODEL (no task, routing off, or one client set for all)."""
+    if not task or not settings.LLM_ROUTING or _client is not None:
+        return None
+    from blog import model_router
+
+    return model_router.choose(task, prompt)
+
+
+def generate(prompt, timeout=None, generation_config=None, cache=True, fresh=None, task=None):
+    """
+    Generate through the shared client, serving repeated prompts from the response cache.
+    Args:
+        cache (bool): Use the response cache at all (default: True).
+        fresh (bool, optional): Skip cached responses but store the new one; defaults to the
+                                fresh_responses() block the call runs in, if any.
+        task (str, optional): Task type from LLM_ROUTES; the router picks the model for it.
+    """
+    model = _route(task, prompt)
+    client = get_client(model)
+    if model is None:
+        return _generate_cached(client, prompt, timeout, generation_config, cache, fresh)
+    from blog import model_router
+
+    try:
+        response = _generate_cached(client, prompt, timeout, generation_config, cache, fresh)
+    except LLMError:
+        model_router.record_error(task, model)
+        raise
+    model_router.record(task, model, response)
+    return response
+
+
+def _generate_cached(client, prompt, timeout, generation_config, cache, fresh):
+    key = _cache_key(client, prompt, generation_config, cache)
+    if key is None:
+        return client.generate(prompt, timeout=timeout, generation_config=generation_config)
+    from blog import llm_cache
+
+    if not (fresh if fresh is not None else _fresh.get()):
+        entry = llm_cache.lookup(key)
+        if entry is not None:
+            return LLMResponse(entry.response, entry.prompt_tokens, entry.output_tokens, 0.0, entry.model, cached=True)
+    response = client.generate(prompt, timeout=timeout, generation_config=generation_config)
+    llm_cache.store(key, response.model, response.text, response.prompt_tokens, response.output_tokens, response.latency)
+    return response
+
+
+def stream(prompt, timeout=None, generation_config=None, cache=True, fresh=False, task=None):
+    """
+    Stream through the shared client. A cached response is sent as a single chunk; a streamed
+    one is stored once it has completed. `fresh` must be passed explicitly here: the stream runs
+    after the view has returned, outside any fresh_responses() block. `task` routes as in generate().
+    """
+    from blog import llm_cache, model_router
+
+    model = _route(task, prompt)
+    client = get_client(model)
+    key = _cache_key(client, prompt, generation_config, cache)
+    if key is not None and not fresh:
+        entry = llm_cache.lookup(key)
+        if entry is not None:
+            if model:
+                model_router.record(task, model, LLMResponse(
+                    entry.response, entry.prompt_tokens, entry.output_tokens, 0.0, entry.model, cached=True))
+            yield entry.response
+            return
+    started = time.monotonic()
+    parts = []
+    try:
+        # Closed explicitly, so a consumer that stops early releases the client's slot and breaker trial at once
+        with contextlib.closing(client.stream(prompt, timeout=timeout, generation_config=generation_config)) as chunks:
+            for text in chunks:
+                parts.append(text)
+                yield text
+    except LLMError:
+        if model:
+            model_router.record_error(task, model)
+        raise
+    # Exact token counts are not surfaced by the stream; the estimates are close enough for the reports
+    text = "".join(parts)
+    response = LLMResponse(text, estimate_tokens(prompt), estimate_tokens(text), time.monotonic() - started, client.model_name)
+    if key is not None:
+        llm_cache.store(key, client.model_name, text, response.prompt_tokens, response.output_tokens, response.latency)
+    if model:
+        model_router.record(task, model, response)
+
+
+def llm_stats():
+    """Counters shared by all processes, plus latency percentiles and breaker state of this process."""
+    counters = metrics.get_counters([
+        'llm.calls', 'llm.errors', 'llm.retries', 'llm.deadline_exceeded',
+        'llm.prompt_tokens', 'llm.output_tokens', 'llm.latency_ms', 'llm.hedges', 'llm.hedge_wins',
+    ])
+    client = _client or _clients.get(settings.LLM_MODEL)
+    latencies = sorted(client.latencies) if client else []
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3) if latencies else None
+
+    counters['llm.mean_latency_ms'] = round(counters['llm.latency_ms'] / counters['llm.calls']) if counters['llm.calls'] else None
+    counters['llm.p50_latency_s'] = percentile(0.5)
+    counters['llm.p99_latency_s'] = percentile(0.99)
+    counters['llm.breaker'] = client.breaker.state if client else 'closed'
+    sites = histogram_report()
+    for site, counts in sites.items():
+        if client:
+            p50, samples = client.histogram.percentile(site, 0.5)
+            p90, _ = client.histogram.percentile(site, client.hedge_percentile)
+            delay = client.hedge_delay(site)
+            counts.update(p50_s=p50 and round(p50, 3), p90_s=p90 and round(p90, 3), samples=samples,
+                          hedge_after_s=delay and round(delay, 3))
+        counts['deadline_s'] = site_config(site).get('deadline')
+    counters['llm.sites'] = sites
+    if settings.LLM_CACHE_ENABLED:
+        from blog import llm_cache
+
+        counters['llm.cache'] = llm_cache.saved_report()
+    return counters
@@ -0,0 +1,80 @@
+# blog/llm_cache.py
+import hashlib
+import json
+import logging
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from blog import metrics
+from blog.models import LLMCacheEntry
+from blog.research_cache import count_cache_use, evict_least_recently_used
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt):
+    """
+    Collapse whitespace so prompts that differ only in indentation or line breaks (the
+    triple-quoted f-string prompts) share an entry. Only the key uses this; Gemini still
+    receives the prompt as written.
+    """
+    return re.sub(r'\s+', ' ', prompt or '').strip()
+
+
+def cache_key(model, prompt, generation_config=None):
+    material = json.dumps(
+        {'model': model, 'prompt': normalize_prompt(prompt), 'config': generation_config or {}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def lookup(key):
+    """
+    Return the fresh cache entry for a key, or None. A hit is counted together with the tokens
+    and time it saved.
+    """
+    now = timezone.now()
+    entry = LLMCacheEntry.objects.filter(
+        key=key, created_at__gte=now - timedelta(seconds=settings.LLM_CACHE_TTL)
+    ).first()
+    if entry is None:
+        count_cache_use('llm', misses=1)
+        return None
+    LLMCacheEntry.objects.filter(pk=entry.pk).update(last_used=now, hits=F('hits') + 1)
+    count_cache_use('llm', hits=1)
+    metrics.incr('llm_cache.saved_tokens', entry.prompt_tokens + entry.output_tokens)
+    metrics.incr('llm_cache.saved_ms', entry.latency_ms)
+    logger.info(f"LLM cache hit {key[:12]} (saved {entry.latency_ms}ms, {entry.prompt_tokens + entry.output_tokens} tokens)")
+    return entry
+
+
+def store(key, model, text, prompt_tokens, output_tokens, latency):
+    now = timezone.now()
+    LLMCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={
+            'model': model,
+            'response': text,
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'latency_ms': int(latency * 1000),
+            'created_at': now,
+            'last_used': now,
+        },
+    )
+    evict_least_recently_used(LLMCacheEntry, settings.LLM_CACHE_MAX_ENTRIES)
+
+
+def saved_report():
+    """Tokens and time the cache has saved, for the staff metrics endpoint."""
+    counters = metrics.get_counters(['llm_cache.saved_tokens', 'llm_cache.saved_ms'])
+    return {
+        'saved_tokens': counters['llm_cache.saved_tokens'],
+        'saved_seconds': round(counters['llm_cache.saved_ms'] / 1000, 1),
+        'entries': LLMCacheEntry.objects.count(),
+    }
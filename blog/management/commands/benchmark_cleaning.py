@@ -0,0 +1,104 @@
+import re
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from blog.generate_seo_content import extract_main_text
+from blog.models import PageCacheEntry
+from blog.sample_pages import sample_pages
+from blog.text_cleaning import clean_text
+
+
+def legacy_clean_text(text):
+    """The pre-rules clean_text: one uncompiled re.sub per pattern, kept as the reference output."""
+    if not text:
+        return ""
+
+    text = re.sub(r'Post author:\s*[A-Za-z\s]+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Comment by\s*[A-Za-z\s]+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Author\s*-\s*[A-Za-z\s]+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Post published:\s*[A-Za-z0-9\s,]+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Post last modified:\s*[A-Za-z0-9\s,]+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'LAST UPDATED:\s*[0-9/]+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'updated on\s*[0-9T:.-Z]+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r':school/Blog', '', text, flags=re.IGNORECASE)
+    text = re.sub(r':Mar 26, 2025The Top 10 Boarding Schools in Dehradun for 2025-26', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'The Top 10 Boarding Schools in Dehradun for 2025-26', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
+    text = re.sub(r'\+?\d{1,3}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', '', text)
+    text = re.sub(r'\d+\s+[A-Za-z\s]+,\s*[A-Za-z\s]+,\s*[A-Za-z\s]+,\s*India\s*\d{6}', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'[A-Za-z\s]+,\s*[A-Za-z\s]+,\s*Uttarakhand,\s*India\s*\d{5,6}', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', '', text)
+    text = re.sub(r'Enquire now|Table of Contents|Toggle|Read More|Leave a Reply|Cancel reply|Enter your name or username to comment|Enter your email address to comment|Enter your website URL \(optional\)|Save my name, email, and website in this browser for the next time I comment|Also Read:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)
+    text = re.split(r'This Post Has \d+ Comments', text, flags=re.IGNORECASE)[0]
+    text = re.sub(r'\d\.\d\s*⭐+\s*\(\d+\s*Reviews\)', '', text)
+    text = re.sub(r'Fee Structure \(Annual\)Rs \d+(?:\s*–\s*\d+)?', '', text)
+    text = re.sub(r'Grades(KG|[0-9]+)-[0-9]+', '', text)
+    text = re.sub(r'Indoor (Sports|Games)\w+[^:\n]*(?=\n|$)', '', text)
+    text = re.sub(r'Outdoor sports\w+[^:\n]*(?=\n|$)', '', text)
+    text = re.sub(r'Important School Information:-|Location\s*–|Address', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\s+', ' ', text).strip()
+
+    return text
+
+
+class Command(BaseCommand):
+    help = ('Compares the rule-driven clean_text with the legacy one-re.sub-per-pattern version on a corpus '
+            'of pages: throughput and whether the output matches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=40, help='Sample pages to generate when no corpus is given')
+        parser.add_argument('--corpus', help='Directory of saved .html pages to use instead of the sample pages')
+        parser.add_argument('--page-cache', action='store_true', help='Also include the texts in the page cache')
+        parser.add_argument('--rounds', type=int, default=5, help='Passes over the corpus per implementation')
+
+    def load_corpus(self, options):
+        """List of (source URL, extracted text)."""
+        if options['corpus']:
+            pages = [(path.name, path.read_text(encoding='utf-8', errors='replace'))
+                     for path in sorted(Path(options['corpus']).glob('*.html'))]
+        else:
+            pages = sample_pages(options['pages'])
+        corpus = [(url, extract_main_text(html)) for url, html in pages]
+        if options['page_cache']:
+            corpus += list(PageCacheEntry.objects.exclude(text='').values_list('url', 'text'))
+        return corpus
+
+    def handle(self, *args, **options):
+        corpus = self.load_corpus(options)
+        megabytes = sum(len(text.encode('utf-8')) for _, text in corpus) / 1e6
+        self.stdout.write(f"Corpus: {len(corpus)} pages, {megabytes:.2f} MB of extracted text")
+
+        implementations = [
+            ('legacy', lambda url, text: legacy_clean_text(text)),
+            ('rules', lambda url, text: clean_text(text, url)),
+        ]
+        outputs = {}
+        timings = {}
+        for name, func in implementations:
+            func(*corpus[0])  # Compile outside the timed runs, as a long-lived worker would have
+            runs = []
+            for _ in range(options['rounds']):
+                started = time.perf_counter()
+                outputs[name] = [func(url, text) for url, text in corpus]
+                runs.append(time.perf_counter() - started)
+            timings[name] = min(runs)
+            self.stdout.write(f"{name:>8}: best {min(runs) * 1000:.1f}ms, {megabytes / min(runs):.1f} MB/s, "
+                              f"{len(corpus) / min(runs):.0f} pages/s")
+
+        mismatches = [
+            (url, legacy, rules) for (url, _), legacy, rules in zip(corpus, outputs['legacy'], outputs['rules'])
+            if legacy != rules
+        ]
+        speedup = timings['legacy'] / timings['rules'] if timings['rules'] else 0
+        self.stdout.write(f"Rules engine is {speedup:.1f}x the legacy throughput.")
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS(f"Output matches the legacy clean_text on all {len(corpus)} pages."))
+            return
+        self.stdout.write(self.style.WARNING(f"Output differs on {len(mismatches)} of {len(corpus)} pages:"))
+        for url, legacy, rules in mismatches[:5]:
+            at = next((i for i, (a, b) in enumerate(zip(legacy, rules)) if a != b), min(len(legacy), len(rules)))
+            self.stdout.write(f"  {url} at char {at}:")
+            self.stdout.write(f"    legacy: ...{legacy[max(0, at - 40):at + 80]!r}")
+            self.stdout.write(f"    rules:  ...{rules[max(0, at - 40):at + 80]!r}")
@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog import context_packing
+from blog.extraction import extract_main_text
+from blog.generate_seo_content import clean_text
+from blog.sample_pages import sample_pages
+
+KEYWORDS = ['boarding school', 'curriculum', 'sports facilities', 'admission', 'hostel discipline']
+
+
+class Command(BaseCommand):
+    help = ('Packs a scraped-style competitor corpus into the SEO prompt token budget for several keywords: '
+            'prompt size before and after, near-duplicates dropped, and how many keyword passages survive')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=4, help='Competitor pages per keyword (the job uses 4)')
+        parser.add_argument('--paragraphs', type=int, default=60, help='Article paragraphs per sample page')
+        parser.add_argument('--budget', type=int, default=settings.SEO_CONTEXT_TOKENS, help='Token budget (default: SEO_CONTEXT_TOKENS)')
+        parser.add_argument('--clean', action='store_true', help='Run the texts through clean_text first, as the job does')
+        parser.add_argument('--keyword', action='append', help='Keyword to pack for (repeatable; default: a sample set)')
+
+    def corpus(self, options):
+        pages = sample_pages(options['pages'], options['paragraphs'])
+        if options['clean']:
+            texts = [clean_text(extract_main_text(html), url) for url, html in pages]
+        else:
+            # The cleaner's "Also Read:" rule removes up to a newline, and extracted text has none, so on
+            # these pages it cuts each article at its first related link
+            texts = [extract_main_text(html) for _, html in pages]
+        # A syndicated copy of the first article, lightly edited, as search results often include
+        sentences = context_packing.SENTENCE_END.split(texts[0])
+        texts.append(' '.join(sentences[1:]) + ' Republished with permission.')
+        return texts
+
+    def handle(self, *args, **options):
+        texts = self.corpus(options)
+        self.stdout.write(f"Corpus: {len(texts)} texts (the last a syndicated copy of the first), "
+                          f"{sum(len(text.split()) for text in texts)} words; budget {options['budget']} tokens")
+        self.stdout.write(f"{'Keyword':<20}{'Raw tok':>9}{'Packed':>8}{'Reduction':>11}{'Passages':>12}"
+                          f"{'Dupes':>7}{'Keyword passages kept':>23}{'ms':>7}")
+        for keyword in options['keyword'] or KEYWORDS:
+            started = time.perf_counter()
+            packed = context_packing.pack_context(texts, keyword, options['budget'])
+            elapsed = time.perf_counter() - started
+
+            # Of the distinct passages that mention the keyword at all, how many made it into the context
+            passages = [p for source, text in enumerate(texts) for p in context_packing.split_passages(text, source)]
+            unique, _ = context_packing.drop_duplicates(passages)
+            context_packing.score_bm25(unique, keyword)
+            relevant = [p for p in unique if p.score > 0]
+            kept = sum(p.text in packed.text for p in relevant)
+            recall = f"{kept}/{len(relevant)}" + (f" ({kept / len(relevant):.0%})" if relevant else "")
+
+            reduction = 1 - packed.tokens / packed.raw_tokens if packed.raw_tokens else 0
+            self.stdout.write(f"{keyword:<20}{packed.raw_tokens:>9}{packed.tokens:>8}{reduction:>10.0%} "
+                              f"{packed.kept:>5}/{packed.passages:<5}{packed.duplicates:>7}{recall:>23}"
+                              f"{elapsed * 1000:>7.1f}")
+        self.stdout.write("Raw is the old ' '.join(texts) prompt context; tokens are the client's 4-characters-per-token estimate.")
@@ -0,0 +1,89 @@
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+
+from blog.extraction import CONTENT_SELECTORS, available_backends, extract_main_text
+from blog.sample_pages import sample_pages
+
+# Where the sample pages keep the article, whichever layout they use
+SAMPLE_ARTICLE_SELECTOR = 'article.post, div.entry'
+
+
+def words(text):
+    return Counter(re.findall(r'\w+', text.lower()))
+
+
+def precision_recall(extracted, expected):
+    found, wanted = words(extracted), words(expected)
+    overlap = sum((found & wanted).values())
+    return overlap / max(1, sum(found.values())), overlap / max(1, sum(wanted.values()))
+
+
+class Command(BaseCommand):
+    help = ('Compares the main-content extraction backends (the original BeautifulSoup path, the stream '
+            'parser and lxml) on a corpus of pages: speed and extracted text quality')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=60, help='Sample pages to generate when no corpus is given')
+        parser.add_argument('--paragraphs', type=int, default=20, help='Article paragraphs per sample page')
+        parser.add_argument('--corpus', help='Directory of saved .html pages to use instead of the sample pages')
+        parser.add_argument('--rounds', type=int, default=3, help='Passes over the corpus per backend')
+
+    def load_corpus(self, options):
+        """List of (name, raw bytes, expected article text or None when unknown, whether a content selector matches)."""
+        if options['corpus']:
+            pages = [(path.name, path.read_bytes()) for path in sorted(Path(options['corpus']).glob('*.html'))]
+        else:
+            pages = [(url, html.encode('utf-8')) for url, html in sample_pages(options['pages'], options['paragraphs'])]
+        corpus = []
+        for name, content in pages:
+            soup = BeautifulSoup(content, 'html.parser')
+            article = soup.select_one(SAMPLE_ARTICLE_SELECTOR) if not options['corpus'] else None
+            has_selector = any(soup.select_one(selector) for selector in CONTENT_SELECTORS)
+            corpus.append((name, content, article.get_text(strip=True) if article else None, has_selector))
+        return corpus
+
+    def handle(self, *args, **options):
+        corpus = self.load_corpus(options)
+        megabytes = sum(len(content) for _, content, _, _ in corpus) / 1e6
+        self.stdout.write(f"Corpus: {len(corpus)} pages, {megabytes:.2f} MB of HTML")
+
+        outputs = {}
+        timings = {}
+        for backend in available_backends():
+            runs = []
+            for _ in range(options['rounds']):
+                started = time.perf_counter()
+                outputs[backend] = [extract_main_text(content, backend=backend) for _, content, _, _ in corpus]
+                runs.append(time.perf_counter() - started)
+            timings[backend] = min(runs)
+        if 'lxml' not in timings:
+            self.stdout.write(self.style.WARNING("lxml is not installed; comparing the soup and stream backends only."))
+
+        reference = outputs['soup']
+        self.stdout.write(f"{'Backend':>8}{'ms/page':>10}{'MB/s':>8}{'Speedup':>9}{'Same as soup':>14}"
+                          f"{'Precision':>11}{'Recall':>8}")
+        for backend, elapsed in timings.items():
+            same = sum(a == b for a, b in zip(outputs[backend], reference))
+            scored = [precision_recall(text, expected) for text, (_, _, expected, _) in zip(outputs[backend], corpus)
+                      if expected is not None]
+            precision = sum(p for p, _ in scored) / len(scored) if scored else float('nan')
+            recall = sum(r for _, r in scored) / len(scored) if scored else float('nan')
+            self.stdout.write(
+                f"{backend:>8}{elapsed / len(corpus) * 1000:>10.2f}{megabytes / elapsed:>8.1f}"
+                f"{timings['soup'] / elapsed:>8.1f}x{same:>9}/{len(corpus):<4}{precision:>11.3f}{recall:>8.3f}"
+            )
+
+        # Where a content selector matches, the new backends give the old text; elsewhere the scorer takes over
+        selector_pages = [i for i, page in enumerate(corpus) if page[3]]
+        self.stdout.write(f"{len(selector_pages)} pages have a content selector, {len(corpus) - len(selector_pages)} "
+                          f"go to the scorer (the soup path returns their whole body).")
+        for backend in timings:
+            if backend != 'soup':
+                same = sum(outputs[backend][i] == reference[i] for i in selector_pages)
+                self.stdout.write(f"{backend}: same text as soup on {same}/{len(selector_pages)} selector pages")
+        self.stdout.write("Precision and recall are word overlap with the article element of each sample page.")
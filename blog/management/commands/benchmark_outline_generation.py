@@ -0,0 +1,133 @@
+import contextlib
+import io
+import json
+import random
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from blog import llm
+from blog.extraction import extract_main_text
+from blog.generate_seo_content import generate_blog_content
+from blog.sample_pages import WORDS, sample_pages
+
+LENGTH = re.compile(r'about (\d+) words')
+SECTIONS = re.compile(r'Exactly (\d+) body sections')
+
+
+class WritingBackend(llm.FakeBackend):
+    """
+    Fake Gemini that writes as many words as each SEO prompt asks for (the outline, a section,
+    the introduction and conclusion, or a whole post). It takes a fixed time to the first token
+    plus a time per prompt token read and per output token written.
+    """
+
+    def __init__(self, first_token, prompt_per_token, output_per_token):
+        super().__init__()
+        self.first_token = first_token
+        self.prompt_per_token = prompt_per_token
+        self.output_per_token = output_per_token
+        self.rng = random.Random(0)
+
+    def html(self, words, heading=None, section_words=None):
+        paragraphs = [f"<h2>{heading}</h2>"] if heading else []
+        for start in range(0, words, 60):
+            if section_words and start % section_words == 0:
+                paragraphs.append(f"<h2>{self.rng.choice(WORDS).title()} {start // section_words + 1}</h2>")
+            text = " ".join(self.rng.choice(WORDS) for _ in range(min(60, words - start)))
+            paragraphs.append(f"<p>{text[0].upper()}{text[1:]}.</p>")
+        return "".join(paragraphs)
+
+    def respond(self, prompt, generation_config=None):
+        title = "Boarding Schools in Dehradun: A Parent's Guide"
+        description = ("Boarding schools in Dehradun compared: curriculum, fees, facilities and admissions, "
+                       "so you can pick the right residential school for your child.")
+        words = int(LENGTH.search(prompt).group(1)) if LENGTH.search(prompt) else 1000
+        if generation_config and 'sections' in generation_config['response_schema']['properties']:
+            count = int(SECTIONS.search(prompt).group(1))
+            sections = [{'heading': f"{self.rng.choice(WORDS).title()} and {self.rng.choice(WORDS)} {n + 1}",
+                         'points': " ".join(self.rng.choice(WORDS) for _ in range(25))} for n in range(count)]
+            return json.dumps({'title': title, 'meta_description': description, 'sections': sections})
+        if generation_config and 'introduction' in generation_config['response_schema']['properties']:
+            return json.dumps({'introduction': self.html(100), 'conclusion': self.html(80, 'Conclusion')})
+        if generation_config:
+            return json.dumps({'title': title, 'meta_description': description, 'body': self.html(words, section_words=300)})
+        if "meta description" in prompt:
+            return description
+        if "<h2>" in prompt and "Write section" in prompt:
+            heading = re.search(r'starting with <h2>(.*?)</h2>', prompt).group(1)
+            return self.html(words, heading)
+        return f"Title: {title}\nBody: {self.html(words, section_words=300)}"
+
+    def generate(self, prompt, timeout, generation_config=None):
+        self.calls += 1
+        text = self.respond(prompt, generation_config)
+        prompt_tokens, output_tokens = llm.estimate_tokens(prompt), llm.estimate_tokens(text)
+        time.sleep(self.first_token + self.prompt_per_token * prompt_tokens + self.output_per_token * output_tokens)
+        return text, prompt_tokens, output_tokens
+
+
+class Command(BaseCommand):
+    help = ('Wall-clock comparison of outline-first parallel section generation with the one-call and '
+            'sequential SEO generation paths, for long articles, against a fake LLM with per-token latency')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--targets', default='1500,2000,3000', help='Comma-separated body lengths in words')
+        parser.add_argument('--modes', default='sequential,combined,outline', help='Generation modes to compare')
+        parser.add_argument('--workers', type=int, default=settings.SEO_SECTION_WORKERS,
+                            help='Sections written at once (default: SEO_SECTION_WORKERS)')
+        parser.add_argument('--first-token', type=float, default=0.4, help='Seconds before the fake model writes anything')
+        parser.add_argument('--prompt-ms-per-token', type=float, default=0.05, help='Milliseconds per prompt token read')
+        parser.add_argument('--ms-per-token', type=float, default=2.0, help='Milliseconds per output token written')
+
+    def handle(self, *args, **options):
+        texts = [extract_main_text(html) for _, html in sample_pages(4, 40)]
+        targets = [int(target) for target in options['targets'].split(',')]
+        modes = options['modes'].split(',')
+        self.stdout.write(f"Fake LLM: {options['first_token']}s to first token, {options['ms_per_token']} ms per output "
+                          f"token; outline mode writes {options['workers']} sections at once")
+        self.stdout.write(f"{'Target':>7}  {'Mode':<11}{'Wall':>8}{'Calls':>7}{'Prompt tok':>12}{'Output tok':>12}"
+                          f"{'Words':>7}{'Speedup':>9}")
+        for target in targets:
+            baseline = None
+            for mode in modes:
+                row = self.run(mode, texts, target, options)
+                baseline = baseline or row['wall']
+                self.stdout.write(f"{target:>7}  {mode:<11}{row['wall']:>7.2f}s{row['calls']:>7}{row['prompt_tokens']:>12}"
+                                  f"{row['output_tokens']:>12}{row['words']:>7}{baseline / row['wall']:>8.1f}x")
+        self.stdout.write(f"Speedup is against {modes[0]}. Words counts the generated body text.")
+
+    def run(self, mode, texts, target, options):
+        backend = WritingBackend(options['first_token'], options['prompt_ms_per_token'] / 1000, options['ms_per_token'] / 1000)
+        previous = llm.set_client(llm.LLMClient(
+            backend, rpm=10 ** 6, tpm=10 ** 9, max_concurrency=max(4, options['workers']), timeout=120, retries=0,
+            breaker=llm.CircuitBreaker(5, 30),
+        ))
+        usage = {'prompt_tokens': 0, 'output_tokens': 0}
+        original_generate = backend.generate
+
+        def counted_generate(prompt, timeout, generation_config=None):
+            text, prompt_tokens, output_tokens = original_generate(prompt, timeout, generation_config)
+            usage['prompt_tokens'] += prompt_tokens
+            usage['output_tokens'] += output_tokens
+            return text, prompt_tokens, output_tokens
+
+        backend.generate = counted_generate
+        try:
+            with override_settings(LLM_CACHE_ENABLED=False, SEO_SECTION_WORKERS=options['workers']), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                post = generate_blog_content(texts, 'boarding schools in dehradun', mode=mode, target_words=target)
+                wall = time.perf_counter() - started
+        finally:
+            llm.set_client(previous)
+        body_words = len(re.sub(r'<[^>]+>', ' ', post['body']).split())
+        return {
+            'wall': wall,
+            'calls': backend.calls,
+            'words': body_words,
+            **usage,
+        }
@@ -0,0 +1,109 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.utils import timezone
+
+from blog.models import Post
+from blog.pagination import encode_cursor, keyset_page
+from blog.sidebar import invalidate_sidebar
+
+BENCHMARK_USERNAME = 'pagination-benchmark'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Seeds benchmark posts and compares OFFSET vs keyset feed pages (p50/p99 per page depth)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000, help='Number of benchmark posts to seed')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per bulk insert')
+        parser.add_argument('--page-size', type=int, default=5, help='Posts per page (the views use 5)')
+        parser.add_argument('--depths', default='1,10,100,1000,10000,100000', help='Comma-separated page numbers to time')
+        parser.add_argument('--rounds', type=int, default=50, help='Timed requests per page depth and mode')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded posts afterwards')
+
+    def seed(self, user, target, batch_size):
+        existing = Post.objects.filter(author=user).count()
+        if existing >= target:
+            self.stdout.write(f"Reusing {existing} seeded posts")
+            return
+        self.stdout.write(f"Seeding {target - existing} posts...")
+        started = time.perf_counter()
+        newest = timezone.now() - timedelta(days=1)
+        for start in range(existing, target, batch_size):
+            stop = min(start + batch_size, target)
+            # Two posts per timestamp, so the id tie-break of the cursor is exercised too
+            posts = [
+                Post(
+                    title=f"Benchmark post {n}",
+                    content="Benchmark content. " * 20,
+                    date_posted=newest - timedelta(minutes=n // 2),
+                    author=user,
+                    is_draft=False,
+                )
+                for n in range(start, stop)
+            ]
+            with transaction.atomic():
+                Post.objects.bulk_create(posts, batch_size=batch_size)
+        invalidate_sidebar()  # bulk_create sends no post_save signals
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Post._meta.db_table}")
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    def time_rounds(self, rounds, func):
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return percentile(samples, 50), percentile(samples, 99)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        self.seed(user, options['posts'], options['batch_size'])
+
+        page_size = options['page_size']
+        queryset = Post.objects.select_related('author__profile')
+        feed = queryset.order_by('-date_posted', '-id')
+        total = feed.count()
+        depths = [int(depth) for depth in options['depths'].split(',') if depth.strip()]
+        depths = [depth for depth in depths if (depth - 1) * page_size < total]
+
+        def offset_page(number):
+            # What the ListView did before: COUNT(*) for page_range plus LIMIT/OFFSET
+            page = Paginator(feed, page_size).page(number)
+            list(page.object_list)
+            page.paginator.num_pages
+
+        self.stdout.write(f"{total} posts, page size {page_size}, {options['rounds']} rounds per cell")
+        self.stdout.write(f"{'page':>8} {'mode':>20} {'p50 ms':>10} {'p99 ms':>10}")
+        try:
+            for depth in depths:
+                # Cursor of the last post on the page before, found once outside the timed loop
+                cursor = encode_cursor(feed[(depth - 1) * page_size - 1]) if depth > 1 else None
+                modes = [
+                    ('offset', lambda: offset_page(depth)),
+                    ('keyset', lambda: len(keyset_page(queryset, page_size, after=cursor))),
+                    ('keyset+approximate', lambda: len(keyset_page(queryset, page_size, after=cursor, count_mode='approximate'))),
+                ]
+                for name, func in modes:
+                    p50, p99 = self.time_rounds(options['rounds'], func)
+                    self.stdout.write(f"{depth:>8} {name:>20} {p50:>10.2f} {p99:>10.2f}")
+        finally:
+            if not options['keep']:
+                # Raw delete: a queryset delete would load every row to send post_delete signals
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DELETE FROM {Post._meta.db_table} WHERE author_id = %s", [user.pk])
+                user.delete()
+                invalidate_sidebar()
+                self.stdout.write("Removed the seeded posts")
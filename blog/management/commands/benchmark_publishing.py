@@ -0,0 +1,95 @@
+import contextlib
+import io
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from blog import airtable_client, wp_publisher
+from blog.cron import publish_scheduled_blogs
+from blog.models import WordPressPublication
+from blog.tests.fakes import FakeAirtable, FakeWordPress, start_server, stop_server
+
+LEGACY_SLEEP_PER_RECORD = 2  # The fixed time.sleep(2) after every Airtable PATCH in the old loop
+
+
+class Command(BaseCommand):
+    help = 'Runs publish_scheduled_blogs against local fake Airtable and WordPress servers and reports the cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=100, help='Number of due scheduled records to seed')
+        parser.add_argument('--wp-delay', type=float, default=0.0, help='Seconds the fake WordPress takes per post')
+        parser.add_argument('--workers', type=int, default=wp_publisher.WP_PUBLISH_WORKERS, help='Concurrent WordPress publishers')
+        parser.add_argument('--hang-every', type=int, default=0,
+                            help='Make every n-th WordPress POST create the post and then outlast the client timeout')
+        parser.add_argument('--wp-timeout', type=float, default=2.0, help='Client timeout for WordPress requests in the benchmark')
+        parser.add_argument('--verbose-publish', action='store_true', help='Show the output of publish_scheduled_blogs')
+
+    def handle(self, *args, **options):
+        airtable = FakeAirtable()
+        wordpress = FakeWordPress(delay=options['wp_delay'], hang_every=options['hang_every'],
+                                  hang_seconds=options['wp_timeout'] + 1)
+        airtable_server, airtable_url = start_server(airtable.handler())
+        wordpress_server, wordpress_url = start_server(wordpress.handler())
+
+        due = (datetime.now(timezone.utc) - timedelta(minutes=5)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        for n in range(options['records']):
+            airtable.add({
+                'Title': f"Benchmark post {n}",
+                'Content': f"<p>Benchmark content {n}</p>",
+                'Primary Keyword': 'benchmark',
+                'Status': 'Scheduled',
+                'Publish Date': due,
+            })
+
+        # Pointing the pipeline at the fakes for this process only
+        previous_url = airtable_client.AIRTABLE_API_URL
+        airtable_client.AIRTABLE_API_URL = f"{airtable_url}/v0"
+        previous_publisher = (wp_publisher.WP_PUBLISH_WORKERS, wp_publisher.WP_PUBLISH_TIMEOUT)
+        wp_publisher.WP_PUBLISH_WORKERS = options['workers']
+        wp_publisher.WP_PUBLISH_TIMEOUT = options['wp_timeout']
+        previous_env = {key: os.environ.get(key) for key in ('WORDPRESS_API_URL', 'AIRTABLE_API_KEY', 'AIRTABLE_BASE_ID')}
+        os.environ['WORDPRESS_API_URL'] = f"{wordpress_url}/wp-json/wp/v2"
+        os.environ.setdefault('AIRTABLE_API_KEY', 'fake-key')
+        os.environ.setdefault('AIRTABLE_BASE_ID', 'appFakeBase')
+        try:
+            output = io.StringIO()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(self.stdout if options['verbose_publish'] else output):
+                publish_scheduled_blogs()
+            elapsed = time.perf_counter() - started
+        finally:
+            airtable_client.AIRTABLE_API_URL = previous_url
+            wp_publisher.WP_PUBLISH_WORKERS, wp_publisher.WP_PUBLISH_TIMEOUT = previous_publisher
+            for key, value in previous_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            stop_server(airtable_server)
+            stop_server(wordpress_server)
+
+        published = sum(1 for record in airtable.records.values() if record['fields'].get('WP Post ID'))
+        records = options['records']
+        duplicates = wordpress.duplicates()
+        # Fake record IDs repeat between runs; the ledger rows are only meaningful for this one
+        WordPressPublication.objects.filter(record_id__in=list(airtable.records)).delete()
+        self.stdout.write(f"Records due:              {records}")
+        self.stdout.write(f"Published + updated:      {published}")
+        self.stdout.write(f"WordPress posts created:  {len(wordpress.posts)}")
+        self.stdout.write(f"Duplicate WordPress posts: {duplicates}")
+        self.stdout.write(f"POSTs that hung:          {wordpress.hung}")
+        self.stdout.write(f"Workers:                  {options['workers']}")
+        self.stdout.write(f"Throughput:               {published / elapsed * 60:.1f} posts/min")
+        self.stdout.write(f"Airtable GET requests:    {airtable.count('GET')}")
+        self.stdout.write(f"Airtable PATCH requests:  {airtable.count('PATCH')}")
+        self.stdout.write(f"Airtable 429 responses:   {airtable.rate_limited}")
+        self.stdout.write(f"Elapsed:                  {elapsed:.2f}s")
+        # The old loop read one page (100 records at most) and did one PATCH plus a 2s sleep per record
+        legacy_records = min(records, 100)
+        self.stdout.write(
+            f"Old loop (estimate):      1 GET, {legacy_records} PATCH, "
+            f"{legacy_records * LEGACY_SLEEP_PER_RECORD}s of sleep alone"
+            + (f", and {records - legacy_records} records never read" if records > legacy_records else "")
+        )
@@ -0,0 +1,117 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from blog import llm, refine
+from blog.sample_pages import WORDS
+from blog.views import GenerateBlogView
+
+SECTIONS = ["Academic Curriculum", "Boarding Facilities", "Sports and Activities", "Admission Process", "Fees and Scholarships"]
+
+# A realistic refine session: three targeted steps, then one about the whole article
+FEEDBACK = [
+    "Expand the section on boarding facilities with details about the hostels",
+    "Make the conclusion more persuasive",
+    "Add a statistic to the introduction",
+    "Make the tone friendlier throughout",
+]
+
+
+class RevisingBackend(llm.FakeBackend):
+    """
+    Fake Gemini that "revises" whatever it was asked to: it returns the article or sections from
+    the prompt with each heading marked as revised, and, like a real model, takes longer the more
+    it writes (a fixed time to first token plus a time per output token).
+    """
+
+    def __init__(self, first_token, per_token):
+        super().__init__()
+        self.first_token = first_token
+        self.per_token = per_token
+
+    def respond(self, prompt):
+        self.calls += 1
+        if "Sections to revise:\n\n" in prompt:
+            text = prompt.split("Sections to revise:\n\n", 1)[1]
+        else:
+            text = re.search(r"article: '(.*)' based on feedback", prompt, re.DOTALL).group(1)
+        return re.sub(r'^(#{1,6} .*)$', r'\1 (revised)', text, flags=re.MULTILINE)
+
+    def generate(self, prompt, timeout, generation_config=None):
+        text = self.respond(prompt)
+        time.sleep(self.first_token + self.per_token * llm.estimate_tokens(text))
+        return text, llm.estimate_tokens(prompt), llm.estimate_tokens(text)
+
+
+def sample_draft(words_per_section, seed=0):
+    rng = random.Random(seed)
+
+    def paragraph(words):
+        text = " ".join(rng.choice(WORDS) for _ in range(words))
+        return text[0].upper() + text[1:] + "."
+
+    parts = ["# Choosing a Boarding School in Dehradun", paragraph(words_per_section)]
+    for heading in SECTIONS:
+        parts += [f"## {heading}", paragraph(words_per_section // 2), paragraph(words_per_section // 2)]
+    parts += ["## Conclusion", paragraph(words_per_section)]
+    return "\n\n".join(parts)
+
+
+class Command(BaseCommand):
+    help = ('Compares full-rewrite and incremental (section-level) refine steps on the same refine session, '
+            'against a fake model whose latency grows with its output: tokens and latency per step')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--section-words', type=int, default=70, help='Words per section of the sample draft')
+        parser.add_argument('--first-token', type=float, default=0.2, help='Seconds before the fake model writes anything')
+        parser.add_argument('--ms-per-token', type=float, default=2.0, help='Milliseconds per output token')
+
+    def handle(self, *args, **options):
+        draft = sample_draft(options['section_words'])
+        self.stdout.write(f"Draft: {len(refine.split_sections(draft))} sections, {len(draft.split())} words; "
+                          f"{len(FEEDBACK)} refine steps")
+        previous = llm._client
+        try:
+            results = {mode: self.run(mode, draft, options) for mode in refine.REFINE_MODES}
+        finally:
+            llm.set_client(previous)
+
+        self.stdout.write(f"{'Step':>4}  {'Mode':<12}{'Sections':>9}{'Prompt tok':>11}{'Output tok':>11}{'Latency':>9}"
+                          f"    vs full: tokens / latency")
+        for n, (full, incremental) in enumerate(zip(results['full'], results['incremental']), start=1):
+            for mode, row in (('full', full), ('incremental', incremental)):
+                compared = ''
+                if mode == 'incremental':
+                    compared = (f"    {row['tokens'] / full['tokens']:.0%} / {row['latency'] / full['latency']:.0%}"
+                                f"  ({row['used']})")
+                self.stdout.write(f"{n:>4}  {mode:<12}{row['sections']:>9}{row['prompt_tokens']:>11}"
+                                  f"{row['output_tokens']:>11}{row['latency']:>8.2f}s{compared}")
+        for mode, rows in results.items():
+            tokens = sum(row['tokens'] for row in rows)
+            latency = sum(row['latency'] for row in rows)
+            self.stdout.write(f"Total {mode:<12} {tokens:>6} tokens  {latency:.2f}s")
+
+    def run(self, mode, draft, options):
+        backend = RevisingBackend(options['first_token'], options['ms_per_token'] / 1000)
+        llm.set_client(llm.LLMClient(
+            backend, rpm=10 ** 6, tpm=10 ** 9, max_concurrency=4, timeout=60, retries=0,
+            breaker=llm.CircuitBreaker(5, 30),
+        ))
+        rows = []
+        with override_settings(LLM_CACHE_ENABLED=False, REFINE_MODE=mode):
+            for step, feedback in enumerate(FEEDBACK, start=2):
+                payload = GenerateBlogView.refine_payload(draft, feedback, min(step, 4))
+                result = refine.refine(payload['draft'], payload['feedback'], payload['prompt'], payload['instructions'])
+                rows.append({
+                    'used': result['mode'],
+                    'sections': '-'.join(map(str, result.get('sections', []))) or 'all',
+                    'prompt_tokens': result['prompt_tokens'],
+                    'output_tokens': result['output_tokens'],
+                    'tokens': result['prompt_tokens'] + result['output_tokens'],
+                    'latency': result['latency'],
+                })
+                draft = result['content']
+        return rows
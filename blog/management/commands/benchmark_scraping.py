@@ -0,0 +1,88 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from blog.generate_seo_content import extract_article_text, extract_main_text
+from blog.page_fetcher import DEFAULT_HEADERS
+
+STUB_PAGE = (
+    "<html><body><header>Site navigation</header>"
+    "<article><h1>Stub article {path}</h1>{paragraphs}</article>"
+    "<footer>Footer links</footer></body></html>"
+)
+
+
+def make_stub_handler(delay, paragraphs):
+    body = "".join(f"<p>Paragraph {i} of the stub article with some filler text.</p>" for i in range(paragraphs))
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, so connection reuse is measurable
+
+        def do_GET(self):
+            time.sleep(delay)
+            payload = STUB_PAGE.format(path=self.path, paragraphs=body).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def extract_serially(urls):
+    """The pre-concurrency loop: one blocking request per URL, one after another."""
+    texts = []
+    for url in urls:
+        try:
+            response = requests.get(url, headers=DEFAULT_HEADERS, timeout=10)
+            response.raise_for_status()
+            article = extract_main_text(response.text)
+            if article:
+                texts.append(article)
+        except requests.exceptions.RequestException:
+            continue
+    return texts
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks serial vs concurrent article scraping against a local stub HTTP server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--urls', type=int, default=4, help='Number of URLs per run')
+        parser.add_argument('--delay', type=float, default=0.5, help='Server-side delay per request in seconds')
+        parser.add_argument('--rounds', type=int, default=3, help='Number of runs per mode')
+        parser.add_argument('--paragraphs', type=int, default=200, help='Paragraphs per stub page')
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_stub_handler(options['delay'], options['paragraphs']))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base_url}/article-{i}" for i in range(options['urls'])]
+        self.stdout.write(f"Stub server on {base_url}: {options['urls']} URLs, {options['delay']}s delay each")
+
+        try:
+            modes = [('serial', extract_serially), ('concurrent', extract_article_text)]
+            timings = {}
+            for name, func in modes:
+                runs = []
+                for _ in range(options['rounds']):
+                    started = time.perf_counter()
+                    texts = func(urls)
+                    runs.append(time.perf_counter() - started)
+                timings[name] = min(runs)
+                self.stdout.write(f"{name:>10}: best {min(runs):.3f}s, mean {sum(runs) / len(runs):.3f}s, "
+                                  f"{len(texts)}/{len(urls)} pages extracted")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        speedup = timings['serial'] / timings['concurrent'] if timings['concurrent'] else 0
+        self.stdout.write(f"Concurrent fetch is {speedup:.1f}x faster than the serial loop.")
@@ -0,0 +1,126 @@
+import contextlib
+import io
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from blog import llm
+from blog.extraction import extract_main_text
+from blog.generate_seo_content import GENERATION_MODES, clean_text, generate_blog_content
+from blog.sample_pages import WORDS, sample_pages
+
+
+class SeoBackend(llm.FakeBackend):
+    """
+    Fake Gemini for the SEO prompts: a meta description, a "Title: ... Body: ..." post or the JSON
+    object, depending on what was asked. Latency grows with the prompt it reads and the text it
+    writes, like a real model's.
+    """
+
+    def __init__(self, first_token, prompt_per_token, output_per_token, body_words, bad_json=False):
+        super().__init__()
+        self.first_token = first_token
+        self.prompt_per_token = prompt_per_token
+        self.output_per_token = output_per_token
+        self.body_words = body_words
+        self.bad_json = bad_json
+        self.rng = random.Random(0)
+
+    def html_body(self):
+        paragraphs = []
+        for n in range(0, self.body_words, 100):
+            words = " ".join(self.rng.choice(WORDS) for _ in range(100))
+            paragraphs.append(f"<h2>Section {n // 100 + 1}</h2><p>{words}.</p>")
+        return "".join(paragraphs)
+
+    def generate(self, prompt, timeout, generation_config=None):
+        self.calls += 1
+        title = "Boarding Schools in Dehradun: A Parent's Guide"
+        description = ("Boarding schools in Dehradun compared: curriculum, fees, facilities and admissions, "
+                       "so you can pick the right residential school for your child.")
+        if generation_config:
+            text = json.dumps({'title': title, 'meta_description': description, 'body': self.html_body()})
+            if self.bad_json:
+                text = text[:len(text) // 2]  # A response cut off mid-string
+        elif "meta description" in prompt:
+            text = description
+        else:
+            text = f"Title: {title}\nBody: {self.html_body()}"
+        prompt_tokens, output_tokens = llm.estimate_tokens(prompt), llm.estimate_tokens(text)
+        time.sleep(self.first_token + self.prompt_per_token * prompt_tokens + self.output_per_token * output_tokens)
+        return text, prompt_tokens, output_tokens
+
+
+class Command(BaseCommand):
+    help = ('Compares the SEO generation modes (description then body, both at once, one JSON-schema call) '
+            'on a scraped-style corpus against a fake model: latency, calls and tokens per post')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=4, help='Competitor pages in the corpus (the job uses 4)')
+        parser.add_argument('--rounds', type=int, default=3, help='Posts generated per mode')
+        parser.add_argument('--body-words', type=int, default=900, help='Words in the generated body')
+        parser.add_argument('--first-token', type=float, default=0.3, help='Seconds before the fake model writes anything')
+        parser.add_argument('--prompt-ms-per-token', type=float, default=0.05, help='Milliseconds per prompt token read')
+        parser.add_argument('--ms-per-token', type=float, default=1.0, help='Milliseconds per output token written')
+
+    def handle(self, *args, **options):
+        texts = [clean_text(extract_main_text(html), url) for url, html in sample_pages(options['pages'])]
+        self.stdout.write(f"Corpus: {len(texts)} cleaned pages, {sum(len(text.split()) for text in texts)} words "
+                          f"(~{llm.estimate_tokens(' '.join(texts))} tokens)")
+
+        results = {}
+        with override_settings(LLM_CACHE_ENABLED=False):
+            for mode in GENERATION_MODES:
+                results[mode] = self.run(mode, texts, options)
+            fallback = self.run('combined', texts, options, bad_json=True)
+
+        baseline = results['sequential']
+        self.stdout.write(f"{'Mode':<12}{'Latency':>9}{'Calls':>7}{'Prompt tok':>12}{'Output tok':>12}"
+                          f"{'Latency vs sequential':>24}{'Tokens vs sequential':>22}")
+        for mode, row in list(results.items()) + [('fallback', fallback)]:
+            self.stdout.write(
+                f"{mode:<12}{row['latency']:>8.2f}s{row['calls']:>7}{row['prompt_tokens']:>12}{row['output_tokens']:>12}"
+                f"{row['latency'] / baseline['latency']:>23.0%} {row['tokens'] / baseline['tokens']:>21.0%}"
+            )
+        self.stdout.write("Per post; latency is the median of the rounds. 'fallback' is combined mode with a truncated "
+                          "JSON answer, recovered by the concurrent calls.")
+
+    def run(self, mode, texts, options, bad_json=False):
+        backend = SeoBackend(options['first_token'], options['prompt_ms_per_token'] / 1000,
+                             options['ms_per_token'] / 1000, options['body_words'], bad_json=bad_json)
+        previous = llm.set_client(llm.LLMClient(
+            backend, rpm=10 ** 6, tpm=10 ** 9, max_concurrency=4, timeout=60, retries=0,
+            breaker=llm.CircuitBreaker(5, 30),
+        ))
+        latencies = []
+        original_generate = backend.generate
+        usage = {'prompt_tokens': 0, 'output_tokens': 0}
+
+        def counted_generate(prompt, timeout, generation_config=None):
+            text, prompt_tokens, output_tokens = original_generate(prompt, timeout, generation_config)
+            usage['prompt_tokens'] += prompt_tokens
+            usage['output_tokens'] += output_tokens
+            return text, prompt_tokens, output_tokens
+
+        backend.generate = counted_generate
+        try:
+            for _ in range(options['rounds']):
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_blog_content(texts, 'boarding schools in dehradun', mode=mode)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            llm.set_client(previous)
+        rounds = options['rounds']
+        prompt_tokens, output_tokens = usage['prompt_tokens'] // rounds, usage['output_tokens'] // rounds
+        return {
+            'latency': statistics.median(latencies),
+            'calls': backend.calls / rounds,
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'tokens': prompt_tokens + output_tokens,
+        }
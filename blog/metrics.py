@@ -0,0 +1,28 @@
+# blog/metrics.py
+from django.core.cache import cache
+
+METRICS_PREFIX = 'blog:metrics:'
+
+
+def incr(name, amount=1):
+    """
+    Bump a process-independent counter kept in the Django cache.
+    Cheap enough for the request path, unlike the CacheCounter rows.
+    """
+    key = METRICS_PREFIX + name
+    if not cache.add(key, amount, timeout=None):
+        try:
+            cache.incr(key, amount)
+        except ValueError:  # Evicted between add() and incr()
+            cache.set(key, amount, timeout=None)
+
+
+def get_counters(names):
+    """Return {name: value} for the given counters; missing ones read as 0."""
+    values = cache.get_many([METRICS_PREFIX + name for name in names])
+    return {name: values.get(METRICS_PREFIX + name, 0) for name in names}
+
+
+def hit_ratio(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_scheduledpost_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordPressPublication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_id', models.CharField(max_length=32, unique=True)),
+                ('slug', models.SlugField(max_length=200)),
+                ('state', models.CharField(choices=[('new', 'New'), ('in_flight', 'In flight'), ('published', 'Published'), ('failed', 'Failed')], default='new', max_length=10)),
+                ('wp_post_id', models.CharField(blank=True, max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_wordpresspublication'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AirtableSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=100, unique=True)),
+                ('synced_until', models.DateTimeField(blank=True, null=True)),
+                ('full_sync_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AirtableScheduleEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_id', models.CharField(max_length=32, unique=True)),
+                ('status', models.CharField(blank=True, max_length=50)),
+                ('publish_at', models.DateTimeField(blank=True, null=True)),
+                ('fields', models.JSONField(default=dict)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'Scheduled')), fields=['publish_at'], name='airtable_schedule_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,196 @@
+# blog/model_router.py
+"""
+Model tiering: picks the Gemini model for each task type.
+
+Each route in LLM_ROUTES lists the models a task may use, best first, with a p90 latency SLO
+and a per-call cost SLO. A call goes to the first model that meets both on this route's recent
+calls. A model with too few calls on the route yet is assumed to meet the latency SLO. One
+that misses it keeps its last latencies, however old, and gets one call in
+LLM_ROUTE_PROBE_EVERY as a probe, so it wins its traffic back once it is fast again. Cost is
+estimated before the call from the prompt and the model's recent output length on the route.
+Models whose circuit breaker is open are skipped. If no model meets the SLOs, the fastest one
+within the cost SLO is used, or else the cheapest.
+
+Calls without a task, or with LLM_ROUTING off, go to LLM_MODEL as before.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+from blog import llm, metrics
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ('chosen', 'calls', 'cached', 'errors', 'latency_ms', 'prompt_tokens', 'output_tokens',
+               'cost_micro_usd', 'slo_misses')
+
+
+class RouteStats:
+    """Recent (time, latency, output tokens) samples per route and model, in this process."""
+
+    def __init__(self):
+        self._samples = defaultdict(deque)
+        self._decisions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, task, model, latency, output_tokens):
+        with self._lock:
+            self._samples[task, model].append((time.monotonic(), latency, output_tokens))
+
+    def recent(self, task, model):
+        """
+        (sorted latencies, mean output tokens or None) over the last LLM_ROUTE_WINDOW seconds, or
+        the last LLM_ROUTE_MIN_SAMPLES calls if the window has fewer.
+        """
+        horizon = time.monotonic() - settings.LLM_ROUTE_WINDOW
+        with self._lock:
+            samples = self._samples[task, model]
+            while len(samples) > settings.LLM_ROUTE_MIN_SAMPLES and samples[0][0] < horizon:
+                samples.popleft()
+            samples = list(samples)
+        if not samples:
+            return [], None
+        return sorted(latency for _, latency, _ in samples), sum(tokens for _, _, tokens in samples) / len(samples)
+
+    def decision(self, task):
+        """Number this routing decision on the route (1, 2, ...)."""
+        with self._lock:
+            self._decisions[task] += 1
+            return self._decisions[task]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._decisions.clear()
+
+
+stats = RouteStats()
+
+
+def route_config(task):
+    route = settings.LLM_ROUTES.get(task)
+    if route is None:
+        raise ValueError(f"Unknown LLM route '{task}'; add it to LLM_ROUTES")
+    return route
+
+
+def p90(latencies):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))] if latencies else None
+
+
+def estimate_cost(model, prompt_tokens, output_tokens):
+    """USD for one call; 0 for a model without a price in LLM_MODEL_PRICES."""
+    prompt_price, output_price = settings.LLM_MODEL_PRICES.get(model, (0, 0))
+    return (prompt_tokens * prompt_price + output_tokens * output_price) / 1_000_000
+
+
+def candidates(task, prompt):
+    """
+    The route's models in preference order with what the router knows about them.
+    Returns:
+        list: dicts with 'model', 'p90' (seconds or None), 'samples', 'cost' (estimated USD),
+              'meets_latency', 'meets_cost' and 'available' (breaker not open).
+    """
+    route = route_config(task)
+    prompt_tokens = llm.estimate_tokens(prompt)
+    rows = []
+    for model in route['models']:
+        latencies, output_tokens = stats.recent(task, model)
+        latency = p90(latencies)
+        cost = estimate_cost(model, prompt_tokens, output_tokens or route['output_tokens'])
+        rows.append({
+            'model': model,
+            'p90': latency,
+            'samples': len(latencies),
+            'cost': cost,
+            'meets_latency': len(latencies) < settings.LLM_ROUTE_MIN_SAMPLES or latency <= route['latency_slo'],
+            'meets_cost': cost <= route['cost_slo'],
+            'available': not llm.breaker_open(model),
+        })
+    return rows
+
+
+def choose(task, prompt):
+    """
+    Pick the model for one call of a task type.
+    Args:
+        task (str): Route name from LLM_ROUTES.
+        prompt (str): The prompt, for the cost estimate.
+    Returns:
+        str: The model name.
+    """
+    rows = candidates(task, prompt)
+    available = [row for row in rows if row['available']] or rows
+    chosen = next((row for row in available if row['meets_latency'] and row['meets_cost']), None)
+    if chosen is None:
+        within_cost = [row for row in available if row['meets_cost']]
+        if within_cost:
+            chosen = min(within_cost, key=lambda row: row['p90'] if row['p90'] is not None else 0)
+        else:
+            chosen = min(available, key=lambda row: row['cost'])
+        logger.info(f"No model meets the SLOs of route {task}, using {chosen['model']}")
+        metrics.incr(f'route.{task}.slo_fallbacks')
+    if chosen is not available[0] and stats.decision(task) % settings.LLM_ROUTE_PROBE_EVERY == 0:
+        # Probe the best model skipped for latency alone, so its numbers stay current
+        probe = next(row for row in available if row['meets_cost'] or row is chosen)
+        if probe is not chosen:
+            metrics.incr(f'route.{task}.probes')
+            chosen = probe
+    if chosen is not rows[0]:
+        metrics.incr(f'route.{task}.downgrades')
+    metrics.incr(f"route.{task}.{chosen['model']}.chosen")
+    return chosen['model']
+
+
+def record(task, model, response):
+    """Count a finished call in the route's metrics and, unless cached, in its latency window."""
+    prefix = f'route.{task}.{model}.'
+    if response.cached:
+        metrics.incr(prefix + 'cached')
+        return
+    stats.add(task, model, response.latency, response.output_tokens)
+    metrics.incr(prefix + 'calls')
+    metrics.incr(prefix + 'latency_ms', round(response.latency * 1000))
+    metrics.incr(prefix + 'prompt_tokens', response.prompt_tokens)
+    metrics.incr(prefix + 'output_tokens', response.output_tokens)
+    metrics.incr(prefix + 'cost_micro_usd', round(estimate_cost(model, response.prompt_tokens, response.output_tokens) * 1_000_000))
+    if response.latency > route_config(task)['latency_slo']:
+        metrics.incr(prefix + 'slo_misses')
+
+
+def record_error(task, model):
+    metrics.incr(f'route.{task}.{model}.errors')
+
+
+def route_stats():
+    """Per route: its SLOs, downgrades and fallbacks, and per model the shared counters plus this process's p90."""
+    names = []
+    for task, route in settings.LLM_ROUTES.items():
+        names += [f'route.{task}.downgrades', f'route.{task}.slo_fallbacks', f'route.{task}.probes']
+        names += [f'route.{task}.{model}.{field}' for model in route['models'] for field in STAT_FIELDS]
+    counters = metrics.get_counters(names)
+    report = {}
+    for task, route in settings.LLM_ROUTES.items():
+        models = {}
+        for model in route['models']:
+            row = {field: counters[f'route.{task}.{model}.{field}'] for field in STAT_FIELDS}
+            calls = row['calls']
+            latencies, _ = stats.recent(task, model)
+            row['mean_latency_ms'] = round(row['latency_ms'] / calls) if calls else None
+            row['p90_latency_s'] = round(p90(latencies), 3) if latencies else None
+            row['cost_usd'] = round(row.pop('cost_micro_usd') / 1_000_000, 6)
+            row['cost_per_call_usd'] = round(row['cost_usd'] / calls, 6) if calls else None
+            row['slo_miss_rate'] = round(row['slo_misses'] / calls, 4) if calls else None
+            models[model] = row
+        report[task] = {
+            'latency_slo_s': route['latency_slo'],
+            'cost_slo_usd': route['cost_slo'],
+            'downgrades': counters[f'route.{task}.downgrades'],
+            'slo_fallbacks': counters[f'route.{task}.slo_fallbacks'],
+            'probes': counters[f'route.{task}.probes'],
+            'models': models,
+        }
+    return report
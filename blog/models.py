@@ -1,4 +1,5 @@
 # models.py 
+import uuid
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -12,6 +13,14 @@ class Post(models.Model):
     seo_keywords = models.CharField(max_length=200, blank=True, null=True)
     is_draft = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Newest-first feed and its (date_posted, id) keyset cursor
+            models.Index(fields=['-date_posted', '-id'], name='post_feed_idx'),
+            # UserPostListView: one author's posts, newest first
+            models.Index(fields=['author', '-date_posted', '-id'], name='post_author_feed_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -25,6 +34,188 @@ class ScheduledPost(models.Model):
     scheduled_datetime = models.DateTimeField()
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set by process_scheduled_posts when a run takes the row, so overlapping runs never generate it twice
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    claim_token = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        indexes = [
+            # auto_schedule (newest first)
+            models.Index(fields=['scheduled_datetime'], name='scheduled_post_due_idx'),
+            # process_scheduled_posts: due rows no run has claimed yet
+            models.Index(fields=['scheduled_datetime'], name='scheduled_post_unclaimed_idx',
+                         condition=models.Q(claimed_at__isnull=True)),
+            # Removing the matching ScheduledPost when a generated blog is published
+            models.Index(fields=['topic', 'primary_keyword'], name='scheduled_post_topic_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} - {self.scheduled_datetime}"
+
+class SerpCacheEntry(models.Model):
+    keyword = models.CharField(max_length=200, unique=True)  # Normalized keyword, see research_cache.normalize_keyword
+    urls = models.JSONField(default=list)
+    fetched_at = models.DateTimeField()
+    last_used = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.keyword
+
+
+class PageCacheEntry(models.Model):
+    url = models.URLField(max_length=2000, unique=True)
+    text = models.TextField(blank=True)  # Extracted article text, before clean_text
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    fetched_at = models.DateTimeField()
+    last_used = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.url
+
+
+class CacheCounter(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    revalidations = models.PositiveBigIntegerField(default=0)  # Stale entries confirmed by a 304 response
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return round(self.hits / total, 3) if total else 0
+
+
+class GenerationJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=30)  # Which runner executes the job, see blog.jobs.JOB_RUNNERS
+    action = models.CharField(max_length=30)  # The view action that submitted it, used for the session handoff
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    applied = models.BooleanField(default=False)  # True once the result has been copied into the session
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind}/{self.action} - {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class Draft(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20)  # Which generator owns it: 'generate', 'blogcraft' or 'seo'
+    title = models.CharField(max_length=200, blank=True)
+    meta_description = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} draft #{self.pk} ({self.user})"
+
+
+class DraftRevision(models.Model):
+    draft = models.ForeignKey(Draft, on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField()  # 1-based, in the order the revisions were made
+    prompt = models.TextField(blank=True)
+    content = models.TextField(blank=True)  # Full text; left empty when the revision is stored as a delta
+    delta = models.JSONField(null=True, blank=True)  # Word-level edit ops against the previous revision
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['number']
+        constraints = [
+            models.UniqueConstraint(fields=['draft', 'number'], name='unique_draft_revision_number'),
+        ]
+
+    def __str__(self):
+        return f"Revision {self.number} of draft #{self.draft_id}"
+
+
+class WordPressPublication(models.Model):
+    """Idempotency ledger: one row per Airtable record that has been (or is being) posted to WordPress."""
+    STATE_NEW = 'new'
+    STATE_IN_FLIGHT = 'in_flight'
+    STATE_PUBLISHED = 'published'
+    STATE_FAILED = 'failed'
+    STATE_CHOICES = [
+        (STATE_NEW, 'New'),
+        (STATE_IN_FLIGHT, 'In flight'),
+        (STATE_PUBLISHED, 'Published'),
+        (STATE_FAILED, 'Failed'),
+    ]
+
+    record_id = models.CharField(max_length=32, unique=True)  # Airtable record ID
+    slug = models.SlugField(max_length=200)  # Deterministic WP slug, looked up before any retry
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=STATE_NEW)
+    wp_post_id = models.CharField(max_length=20, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.record_id} - {self.state}"
+
+
+class AirtableScheduleEntry(models.Model):
+    """Local mirror of an Airtable blog record, kept in sync incrementally so due posts can be found by index."""
+    record_id = models.CharField(max_length=32, unique=True)  # Airtable record ID
+    status = models.CharField(max_length=50, blank=True)
+    publish_at = models.DateTimeField(null=True, blank=True)  # Parsed 'Publish Date'
+    fields = models.JSONField(default=dict)  # The record's Airtable fields as of the last sync
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The scheduler's "what is due next" query; only scheduled rows are ever scanned
+            models.Index(fields=['publish_at'], name='airtable_schedule_due_idx', condition=models.Q(status='Scheduled')),
+        ]
+
+    def __str__(self):
+        return f"{self.fields.get('Title', self.record_id)} - {self.status} - {self.publish_at}"
+
+
+class AirtableSyncState(models.Model):
+    """Where the last incremental sync of an Airtable table left off."""
+    table_name = models.CharField(max_length=100, unique=True)
+    synced_until = models.DateTimeField(null=True, blank=True)  # Records modified after this still need fetching
+    full_sync_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.table_name} - {self.synced_until}"
+
+
+class LLMCacheEntry(models.Model):
+    """A stored Gemini response, keyed by a hash of (model, normalized prompt, generation config)."""
+    key = models.CharField(max_length=64, unique=True)  # See llm_cache.cache_key
+    model = models.CharField(max_length=100)
+    response = models.TextField()
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    output_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)  # What the original call took, i.e. what each hit saves
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    last_used = models.DateTimeField(db_index=True)
 
     def __str__(self):
-        return f"{self.topic} - {self.scheduled_datetime}"
\ No newline at end of file
+        return f"{self.model} {self.key[:12]}"
@@ -0,0 +1,181 @@
+# blog/outline_generation.py
+"""
+Outline-first generation of long SEO articles.
+
+A single call writes the whole article token by token, so its latency grows with the article.
+Here one short call plans the post (title, meta description and the <h2> sections, each with
+the points it should cover). The sections are then written at the same time, at most
+SEO_SECTION_WORKERS at once. Each section gets the competitor passages most relevant to its
+own heading, packed to SEO_SECTION_CONTEXT_TOKENS. A last short call writes the introduction
+and conclusion from the opening and closing lines of the finished sections, and the body is
+assembled in outline order. Wall-clock time is then about the outline call, plus the slowest
+section, plus the stitch call.
+"""
+import contextvars
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from blog import context_packing, llm
+
+SECTION_WORDS = 300   # Aim for one <h2> section per this many words of the target
+FRAME_SHARE = 0.15    # Part of the target left to the introduction and conclusion
+
+OUTLINE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'title': {'type': 'STRING'},
+        'meta_description': {'type': 'STRING'},
+        'sections': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {'heading': {'type': 'STRING'}, 'points': {'type': 'STRING'}},
+                'required': ['heading', 'points'],
+            },
+        },
+    },
+    'required': ['title', 'meta_description', 'sections'],
+}
+FRAME_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'introduction': {'type': 'STRING'}, 'conclusion': {'type': 'STRING'}},
+    'required': ['introduction', 'conclusion'],
+}
+
+H2 = re.compile(r'<h2[^>]*>.*?</h2>', re.IGNORECASE | re.DOTALL)
+PARAGRAPH_TEXT = re.compile(r'<p[^>]*>(.*?)</p>', re.IGNORECASE | re.DOTALL)
+TAG = re.compile(r'<[^>]+>')
+
+
+def _json_config(schema):
+    return {'response_mime_type': 'application/json', 'response_schema': schema}
+
+
+def section_count(target_words):
+    return max(3, round(target_words * (1 - FRAME_SHARE) / SECTION_WORDS))
+
+
+def outline_prompt(combined_text, primary_keyword, target_words):
+    return f"""
+    Plan a blog post about '{primary_keyword}' of about {target_words} words, based on the text below, and return it as JSON with:
+    - "title": A catchy and engaging title (up to 60 characters) including '{primary_keyword}'.
+    - "meta_description": A concise meta description (150-160 characters) that includes '{primary_keyword}' at least once, ideally near the beginning, with no personal information, contact details, or irrelevant metadata.
+    - "sections": Exactly {section_count(target_words)} body sections in reading order, each with a "heading" (an <h2> subheading; one of them includes '{primary_keyword}') and "points" (one or two sentences on what the section covers, without overlapping the other sections). No introduction or conclusion; those are written separately.
+    Focus only on the provided text, avoiding extra details.
+
+    Text: {combined_text}
+    """
+
+
+def section_prompt(context, primary_keyword, title, outline, index, words):
+    section = outline[index]
+    headings = "\n".join(f"{n}. {item['heading']}" for n, item in enumerate(outline, start=1))
+    return f"""
+    You are writing one section of the blog post '{title}' about '{primary_keyword}'. The post's sections:
+    {headings}
+
+    Write section {index + 1} only: about {words} words of HTML for WordPress, starting with <h2>{section['heading']}</h2>, then paragraphs in <p> tags with emphasis in <strong> or <em>.
+    It should cover: {section['points']}
+    Use '{primary_keyword}' once if it fits naturally. Do not introduce the post or conclude it, and do not repeat what the other sections cover. Return only the HTML.
+    Focus only on the provided text, avoiding extra details.
+
+    Text: {context}
+    """
+
+
+def frame_prompt(primary_keyword, title, sections):
+    summary = "\n".join(f"- {heading}: {opening} ... {closing}" for heading, opening, closing in sections)
+    return f"""
+    Write the introduction and conclusion of the blog post '{title}' about '{primary_keyword}'. Its body sections, each with its first and last sentence:
+    {summary}
+
+    Return JSON with:
+    - "introduction": One or two <p> paragraphs (about 100 words) that lead into the first section and use '{primary_keyword}' in the first sentence.
+    - "conclusion": <h2>Conclusion</h2> followed by one <p> paragraph (about 80 words) that draws the sections together and uses '{primary_keyword}'.
+    Use HTML suitable for WordPress and no other headings.
+    """
+
+
+def _in_context(function, *args):
+    # Worker threads inherit the caller's LLM deadline and "regenerate fresh" setting
+    try:
+        return contextvars.copy_context().run(function, *args)
+    finally:
+        connection.close()  # The LLM response cache opened this thread's own DB connection; don't leak it
+
+
+def _loads(text, schema):
+    data = json.loads(text)
+    if not isinstance(data, dict) or any(not data.get(field) for field in schema['required']):
+        raise ValueError(f"Response is missing one of {', '.join(schema['required'])}")
+    return data
+
+
+def _clean_section(html, heading):
+    # Models sometimes wrap the HTML in a code fence or leave out the heading they were given
+    html = html.strip()
+    if html.startswith('```'):
+        html = html.strip('`').removeprefix('html').strip()
+    if not H2.match(html):
+        html = f"<h2>{heading}</h2>{html}"
+    return html
+
+
+def _edges(html):
+    # First and last sentence of a section's text, for the stitch call
+    text = " ".join(TAG.sub('', paragraph).strip() for paragraph in PARAGRAPH_TEXT.findall(html)) or TAG.sub('', html)
+    sentences = [s for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s]
+    return (sentences[0], sentences[-1]) if sentences else ("", "")
+
+
+def generate_outlined_post(texts, combined_text, primary_keyword, target_words, workers=None):
+    """
+    Write a post outline first, then its sections in parallel, then the introduction and conclusion.
+    Args:
+        texts (list): The cleaned competitor texts, packed again per section.
+        combined_text (str): The packed context for the whole post, used by the outline call.
+        primary_keyword (str): The post's keyword.
+        target_words (int): Intended length of the body.
+        workers (int, optional): Sections written at once (default: SEO_SECTION_WORKERS).
+    Returns:
+        tuple: ({'title', 'meta_description', 'body'}, list of LLMResponse for every call made).
+    Raises:
+        ValueError: The outline or stitch answer was not the JSON asked for.
+        LLMError: A call failed.
+    """
+    responses = []
+    response = llm.generate(outline_prompt(combined_text, primary_keyword, target_words),
+                            generation_config=_json_config(OUTLINE_SCHEMA), task='seo_meta')
+    responses.append(response)
+    plan = _loads(response.text, OUTLINE_SCHEMA)
+    outline = [item for item in plan['sections'] if isinstance(item, dict) and item.get('heading')]
+    if not outline:
+        raise ValueError("Outline has no sections")
+    print(f"Outlined '{plan['title']}' in {len(outline)} sections")
+
+    words = round(target_words * (1 - FRAME_SHARE) / len(outline))
+
+    def write_section(index):
+        heading = outline[index]['heading']
+        query = f"{primary_keyword} {heading} {outline[index].get('points', '')}"
+        context = context_packing.pack_context(texts, query, settings.SEO_SECTION_CONTEXT_TOKENS).text
+        return llm.generate(section_prompt(context, primary_keyword, plan['title'], outline, index, words), task='seo_post')
+
+    with ThreadPoolExecutor(max_workers=min(workers or settings.SEO_SECTION_WORKERS, len(outline))) as pool:
+        futures = [pool.submit(_in_context, write_section, index) for index in range(len(outline))]
+        section_responses = [future.result() for future in futures]
+    responses += section_responses
+    sections = [_clean_section(r.text, item['heading']) for r, item in zip(section_responses, outline)]
+
+    edges = [(item['heading'], *_edges(html)) for item, html in zip(outline, sections)]
+    response = llm.generate(frame_prompt(primary_keyword, plan['title'], edges),
+                            generation_config=_json_config(FRAME_SCHEMA), task='seo_post')
+    responses.append(response)
+    frame = _loads(response.text, FRAME_SCHEMA)
+
+    body = frame['introduction'].strip() + "".join(sections) + frame['conclusion'].strip()
+    return {"title": plan['title'].strip(), "meta_description": plan['meta_description'], "body": body}, responses
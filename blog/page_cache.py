@@ -0,0 +1,133 @@
+# blog/page_cache.py
+import functools
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from blog import metrics
+
+logger = logging.getLogger(__name__)
+
+VERSION_PREFIX = 'blog:version:'
+PAGE_PREFIX = 'blog:page:'
+
+
+def _new_version():
+    # A fresh timestamp rather than incr(): if a version key is evicted, the value it comes back
+    # with can never match a page that was cached under the old one
+    return time.time_ns()
+
+
+def get_versions(names):
+    """
+    Return the current version of each dependency name (e.g. 'feed', 'post:12', 'sidebar'),
+    creating the missing ones.
+    """
+    keys = {name: VERSION_PREFIX + name for name in names}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    missing = {}
+    for name, key in keys.items():
+        if key in found:
+            versions[name] = found[key]
+        else:
+            versions[name] = missing[key] = _new_version()
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return versions
+
+
+def bump(*names):
+    """Invalidate every cached page and fragment that depends on any of the given names."""
+    if names:
+        version = _new_version()
+        cache.set_many({VERSION_PREFIX + name: version for name in names}, timeout=None)
+        logger.debug(f"Bumped cache versions: {', '.join(names)}")
+
+
+def page_key(request, dependencies):
+    versions = get_versions(dependencies)
+    signature = "|".join(f"{name}={versions[name]}" for name in sorted(versions))
+    raw = f"{request.get_full_path()}|{signature}"
+    return PAGE_PREFIX + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def is_cacheable_request(request):
+    """Only anonymous GET/HEAD requests without pending flash messages share a cached page."""
+    if not settings.VIEW_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    return not len(messages.get_messages(request))
+
+
+def cached_response(request, dependencies, render):
+    """
+    Serve the page from the cache or render it and store it.
+    Args:
+        request (HttpRequest): The current request (must pass is_cacheable_request()).
+        dependencies (list): Version names the page depends on; bumping any of them invalidates it.
+        render (callable): Produces the response on a miss.
+    Returns:
+        HttpResponse: The cached or freshly rendered response.
+    """
+    key = page_key(request, dependencies)
+    entry = cache.get(key)
+    if entry is not None:
+        metrics.incr('view_cache.hits')
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['X-Page-Cache'] = 'hit'
+        patch_vary_headers(response, ['Cookie'])  # Logged-in visitors get the uncached page
+        return response
+
+    metrics.incr('view_cache.misses')
+    response = render()
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    # Responses that set cookies (session, CSRF) are specific to this visitor
+    if response.status_code == 200 and not response.cookies and not response.streaming:
+        cache.set(key, {
+            'content': response.content,
+            'content_type': response.get('Content-Type', 'text/html; charset=utf-8'),
+        }, settings.VIEW_CACHE_TTL)
+    response['X-Page-Cache'] = 'miss'
+    return response
+
+
+class AnonymousPageCacheMixin:
+    """
+    Cache whole responses of a public view for anonymous visitors.
+    Views list what they depend on in get_cache_dependencies(); see blog/signals.py for the bumps.
+    """
+    cache_dependencies = ()
+
+    def get_cache_dependencies(self):
+        return list(self.cache_dependencies)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return super().dispatch(request, *args, **kwargs)
+        self.request, self.args, self.kwargs = request, args, kwargs
+        return cached_response(
+            request,
+            self.get_cache_dependencies(),
+            lambda: super(AnonymousPageCacheMixin, self).dispatch(request, *args, **kwargs),
+        )
+
+
+def cache_anonymous_page(*dependencies):
+    """Function-view version of AnonymousPageCacheMixin."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+            return cached_response(request, list(dependencies), lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,115 @@
+# blog/page_fetcher.py
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from decouple import config
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+SCRAPE_MAX_WORKERS = config('SCRAPE_MAX_WORKERS', default=4, cast=int)
+SCRAPE_TIMEOUT = config('SCRAPE_TIMEOUT', default=10, cast=float)
+SCRAPE_DEADLINE = config('SCRAPE_DEADLINE', default=15, cast=float)
+
+# One session per host so repeated fetches against the same site reuse pooled connections
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url):
+    """
+    Return the shared requests.Session for the host of the given URL, creating it on first use.
+    Args:
+        url (str): Any URL on the host.
+    Returns:
+        requests.Session: A session whose connection pool is kept alive between calls.
+    """
+    parts = urlsplit(url)
+    host_key = f"{parts.scheme}://{parts.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(host_key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SCRAPE_MAX_WORKERS)
+            session.mount(f"{parts.scheme}://", adapter)
+            _sessions[host_key] = session
+        return session
+
+
+def _fetch_one(url, headers, timeout, deadline_at, handler):
+    result = {'url': url, 'status': None, 'response': None, 'result': None, 'error': None, 'elapsed': 0.0}
+    started = time.monotonic()
+    remaining = deadline_at - started
+    if remaining <= 0:
+        result['error'] = "Deadline exceeded before request started"
+        return result
+    try:
+        response = get_session(url).get(url, headers=headers, timeout=min(timeout, remaining))
+        result['status'] = response.status_code
+        response.raise_for_status()
+        result['response'] = response
+        if handler is not None:
+            result['result'] = handler(response)
+    except requests.exceptions.RequestException as e:
+        result['error'] = str(e)
+    except Exception as e:
+        result['error'] = f"Error handling response: {str(e)}"
+    result['elapsed'] = time.monotonic() - started
+    return result
+
+
+def fetch_pages(urls, handler=None, headers=None, extra_headers=None, timeout=None, deadline=None, max_workers=None):
+    """
+    Fetch several URLs concurrently on a bounded thread pool.
+    Args:
+        urls (list): URLs to fetch.
+        handler (callable, optional): Called in the worker thread with each successful response;
+                                      its return value is stored under 'result'.
+        headers (dict, optional): Request headers (default: a desktop browser User-Agent).
+        extra_headers (dict, optional): Maps a URL to additional headers for that request only
+                                        (e.g. conditional If-None-Match / If-Modified-Since).
+        timeout (float, optional): Per-request timeout in seconds (default: SCRAPE_TIMEOUT).
+        deadline (float, optional): Overall wall-clock budget in seconds (default: SCRAPE_DEADLINE).
+        max_workers (int, optional): Maximum number of requests in flight (default: SCRAPE_MAX_WORKERS).
+    Returns:
+        list: One dict per input URL, in input order, with keys 'url', 'status', 'response',
+              'result', 'error' and 'elapsed'. URLs still running at the deadline get an error.
+    """
+    if not urls:
+        return []
+
+    headers = headers or DEFAULT_HEADERS
+    timeout = SCRAPE_TIMEOUT if timeout is None else timeout
+    deadline = SCRAPE_DEADLINE if deadline is None else deadline
+    max_workers = max(1, min(max_workers or SCRAPE_MAX_WORKERS, len(urls)))
+    deadline_at = time.monotonic() + deadline
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='page-fetcher')
+    extra_headers = extra_headers or {}
+    futures = [
+        executor.submit(_fetch_one, url, {**headers, **extra_headers.get(url, {})}, timeout, deadline_at, handler)
+        for url in urls
+    ]
+    try:
+        wait(futures, timeout=max(0, deadline_at - time.monotonic()))
+    finally:
+        # Requests still in flight are bounded by their own timeout; we just stop waiting for them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for url, future in zip(urls, futures):
+        if future.done() and not future.cancelled():
+            results.append(future.result())
+        else:
+            logger.warning(f"Fetching {url} did not finish within the {deadline}s deadline.")
+            results.append({'url': url, 'status': None, 'response': None, 'result': None,
+                            'error': f"Deadline of {deadline}s exceeded", 'elapsed': deadline})
+    return results
@@ -0,0 +1,142 @@
+# blog/pagination.py
+import base64
+import json
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(post):
+    """Opaque ?after= / ?before= value for a post's position in the feed."""
+    raw = f"{post.date_posted.isoformat()}|{post.pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Turn a cursor back into its (date_posted, id) key.
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor().
+    """
+    padded = cursor + '=' * (-len(cursor) % 4)
+    date_str, pk = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').rsplit('|', 1)
+    date_posted = parse_datetime(date_str)
+    if date_posted is None:
+        raise ValueError(f"Invalid cursor date: {date_str}")
+    return date_posted, int(pk)
+
+
+def approximate_count(queryset):
+    """
+    Estimate the number of rows from the Postgres planner instead of running COUNT(*).
+    Falls back to an exact count on other databases.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated feed. Exposes the page_obj attributes the templates use,
+    plus the cursors for the neighbouring pages.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor, count=None, count_is_estimate=False):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_is_estimate = count_is_estimate
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_page(queryset, page_size, after=None, before=None, count_mode='none'):
+    """
+    Fetch one page of a newest-first feed keyed on (date_posted, id), without OFFSET.
+    Args:
+        queryset (QuerySet): Post queryset, already filtered; it is re-ordered here.
+        page_size (int): Posts per page.
+        after (str, optional): Cursor of the last post on the previous page (go forward / older).
+        before (str, optional): Cursor of the first post on the next page (go back / newer).
+        count_mode (str): 'exact', 'approximate' or 'none' (no total shown).
+    Returns:
+        KeysetPage: The page.
+    Raises:
+        ValueError: If a cursor is malformed.
+    """
+    if before:
+        date_posted, pk = decode_cursor(before)
+        # The plain range condition lets Postgres walk the (date_posted, id) index; the Q breaks ties on id
+        rows = list(
+            queryset.filter(date_posted__gte=date_posted)
+            .filter(Q(date_posted__gt=date_posted) | Q(id__gt=pk))
+            .order_by('date_posted', 'id')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        next_cursor = encode_cursor(rows[-1]) if rows else before
+        previous_cursor = encode_cursor(rows[0]) if rows and has_more else None
+    else:
+        feed = queryset.order_by('-date_posted', '-id')
+        if after:
+            date_posted, pk = decode_cursor(after)
+            feed = feed.filter(date_posted__lte=date_posted).filter(Q(date_posted__lt=date_posted) | Q(id__lt=pk))
+        rows = list(feed[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1]) if rows and has_more else None
+        previous_cursor = encode_cursor(rows[0]) if rows and after else None
+
+    count = None
+    estimated = count_mode == 'approximate' and connection.vendor == 'postgresql'
+    if count_mode == 'exact':
+        count = queryset.count()
+    elif count_mode == 'approximate':
+        count = approximate_count(queryset)
+    return KeysetPage(rows, next_cursor, previous_cursor, count, count_is_estimate=estimated)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that pages with ?after= / ?before= cursors instead of ?page= when
+    POST_FEED_PAGINATION is 'keyset'. Deep pages cost the same as the first one.
+    """
+
+    def paginate_queryset(self, queryset, page_size):
+        if settings.POST_FEED_PAGINATION != 'keyset':
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            page = keyset_page(
+                queryset,
+                page_size,
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before'),
+                count_mode=settings.POST_FEED_COUNT,
+            )
+        except ValueError as e:
+            logger.info(f"Rejected feed cursor: {e}")
+            raise Http404("Invalid page cursor.")
+        return None, page, page.object_list, page.has_other_pages()
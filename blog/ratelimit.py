@@ -0,0 +1,109 @@
+# blog/ratelimit.py
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens are added per second, up to `capacity`.
+    Callers block in acquire() only as long as needed to stay under the rate, instead of
+    sleeping a fixed amount after every request.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if they are available right now. Returns True on success."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until `tokens` are available and take them.
+        Args:
+            tokens (float): Tokens to take (default: 1).
+            timeout (float, optional): Give up after this many seconds.
+        Returns:
+            float: Seconds spent waiting.
+        Raises:
+            TimeoutError: If the tokens were not available within the timeout.
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+        started = self._clock()
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return self._clock() - started
+                wait = (tokens - self._tokens) / self.rate
+            if timeout is not None and self._clock() - started + wait > timeout:
+                raise TimeoutError(f"Rate limit: {tokens} tokens not available within {timeout}s")
+            self._sleep(wait)
+
+    def penalize(self, seconds):
+        """Empty the bucket and push the next token `seconds` into the future (e.g. after an HTTP 429)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+    def debit(self, tokens):
+        """Take tokens without waiting, going into debt if needed (e.g. to settle usage that was only known afterwards)."""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+
+
+class FairSemaphore:
+    """
+    Bounded semaphore that hands free slots to waiters in arrival order. threading.Semaphore lets a
+    thread that just released a slot take it straight back, which can starve earlier waiters.
+    """
+
+    def __init__(self, value):
+        self._free = value
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take a slot, waiting at most `timeout` seconds. Returns True on success."""
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if waiter.wait(timeout):
+            return True
+        with self._lock:
+            if waiter.is_set():  # Handed a slot just as the wait timed out
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()  # The slot passes straight to the oldest waiter
+            else:
+                self._free += 1
@@ -0,0 +1,264 @@
+# blog/refine.py
+"""
+Incremental refinement of generated drafts.
+
+A full refine step sends the whole previous draft to Gemini and gets a whole new article
+back, so every step costs about two drafts' worth of tokens. When the feedback points at part
+of the article ("expand the section on fees", "shorten the conclusion"), the incremental
+mode sends a compact outline plus only the targeted sections and splices the answer back in
+place; the rest of the draft is kept byte for byte. Feedback that concerns the whole article
+("make the tone friendlier throughout"), or that matches no section, still gets a full rewrite.
+
+Every step records its tokens and latency per mode, and incremental steps also record what
+the full rewrite would have cost, so refine_stats() can compare the two.
+"""
+import logging
+import re
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from blog import llm, metrics
+
+logger = logging.getLogger(__name__)
+
+HEADING = re.compile(r'^#{1,6}[ \t]+\S.*$', re.MULTILINE)
+WORD = re.compile(r'[a-z0-9]+')
+SECTION_NUMBER = re.compile(r'\b(?:section|part)\s+(\d+)\b')
+
+# Feedback about the article as a whole; these always get a full rewrite
+GLOBAL_WORDS = {'whole', 'entire', 'overall', 'throughout', 'everywhere', 'tone', 'voice'}
+GLOBAL_PHRASES = ('all sections', 'each section', 'every section', 'all paragraphs', 'every paragraph')
+FIRST_WORDS = {'intro', 'introduction', 'opening', 'beginning', 'title', 'headline'}
+LAST_WORDS = {'conclusion', 'ending', 'closing', 'outro', 'summary'}
+ORDINALS = {'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5, 'sixth': 6, 'seventh': 7, 'eighth': 8}
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'make', 'more', 'less', 'add', 'about', 'into', 'part',
+    'section', 'paragraph', 'please', 'should', 'could', 'would', 'article', 'some', 'also', 'from', 'your',
+    'its', 'are', 'was', 'bit', 'rewrite', 'expand', 'shorten', 'improve', 'change', 'keep',
+}
+
+REFINE_MODES = ('full', 'incremental')
+STAT_FIELDS = ('steps', 'cached', 'prompt_tokens', 'output_tokens', 'latency_ms', 'full_prompt_tokens', 'full_output_tokens')
+
+
+@dataclass
+class Section:
+    heading: str  # The heading line, '' for text before the first heading
+    start: int    # Offsets into the draft
+    end: int
+
+    def words(self, draft):
+        return len(draft[self.start:self.end].split())
+
+
+def split_sections(draft):
+    """Split a markdown draft at its heading lines. Text before the first heading is a section of its own."""
+    starts = [match.start() for match in HEADING.finditer(draft)]
+    if not starts or starts[0] > 0 and draft[:starts[0]].strip():
+        starts.insert(0, 0)
+    else:
+        starts[0] = 0  # Blank lines before the first heading belong to it
+    bounds = starts + [len(draft)]
+    sections = []
+    for start, end in zip(bounds, bounds[1:]):
+        match = HEADING.match(draft[start:end].lstrip())
+        sections.append(Section(match.group(0).strip() if match else '', start, end))
+    return sections
+
+
+def _stems(text):
+    # Crude stemming, enough to match "facility" against "Facilities" or "sport" against "Sports"
+    return {word.rstrip('s')[:6] for word in WORD.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS}
+
+
+def target_sections(sections, feedback):
+    """
+    Pick the sections the feedback is about.
+    Args:
+        sections (list): Sections of the draft, from split_sections.
+        feedback (str): The user's refine prompt.
+    Returns:
+        list or None: Indexes of the targeted sections, or None when the feedback concerns the
+                      whole article or names no section.
+    """
+    text = feedback.lower()
+    words = set(WORD.findall(text))
+    if words & GLOBAL_WORDS or any(phrase in text for phrase in GLOBAL_PHRASES) or len(sections) < 2:
+        return None
+
+    targets = set()
+    if words & FIRST_WORDS:
+        targets.add(0)
+    if words & LAST_WORDS:
+        targets.add(len(sections) - 1)
+    numbers = [int(n) for n in SECTION_NUMBER.findall(text)]
+    numbers += [n for word, n in ORDINALS.items() if f"{word} section" in text or f"{word} part" in text]
+    targets.update(n - 1 for n in numbers if 0 < n <= len(sections))
+
+    # Otherwise the sections whose headings share the most words with the feedback
+    wanted = _stems(feedback)
+    scores = [len(wanted & _stems(section.heading)) for section in sections]
+    best = max(scores)
+    if best:
+        targets.update(i for i, score in enumerate(scores) if score == best)
+    return sorted(targets) or None
+
+
+def outline(draft, sections, first, last):
+    """One line per section: its heading and length, with the ones being revised marked."""
+    lines = []
+    for i, section in enumerate(sections):
+        heading = section.heading or '(introduction)'
+        marker = '  <- revise' if first <= i <= last else ''
+        lines.append(f"{i + 1}. {heading} ({section.words(draft)} words){marker}")
+    return "\n".join(lines)
+
+
+class RefineStep:
+    """
+    One refine step: the prompt to send, and how to turn the answer into the new draft.
+    Build it with plan_step().
+    """
+
+    def __init__(self, draft, feedback, full_prompt, instructions, sections=None, first=None, last=None):
+        self.draft = draft
+        self.full_prompt = full_prompt
+        self.sections = sections
+        self.first = first
+        self.last = last
+        self.mode = 'full' if sections is None else 'incremental'
+        if self.mode == 'full':
+            self.prompt = full_prompt
+        else:
+            self.prompt = (
+                f"You are revising part of a longer article. The article's outline:\n"
+                f"{outline(draft, sections, first, last)}\n\n"
+                f"Revise only the section(s) below based on feedback: '{feedback}'. {instructions} "
+                f"Keep each section's heading line as it is and return only the revised section(s) in markdown, "
+                f"nothing else.\n\nSections to revise:\n\n{self.target_text()}"
+            )
+
+    @property
+    def task(self):
+        """LLM_ROUTES task type: a few sections are an 'edit', a whole article a 'rewrite'."""
+        return 'rewrite' if self.mode == 'full' else 'edit'
+
+    @property
+    def span(self):
+        return self.sections[self.first].start, self.sections[self.last].end
+
+    def target_text(self):
+        start, end = self.span
+        return self.draft[start:end].strip()
+
+    def apply(self, text):
+        """The new draft: the answer itself for a full rewrite, otherwise spliced in place of the targeted sections."""
+        text = text.strip()
+        if self.mode == 'full':
+            return text
+        if text.startswith('```'):
+            text = text.strip('`').removeprefix('markdown').strip()
+        if not text:
+            return self.draft
+        start, end = self.span
+        after = self.draft[end:]
+        return self.draft[:start] + text + ("\n\n" if after else "") + after
+
+    def record(self, prompt_tokens, output_tokens, latency, cached=False):
+        """Count this step in the per-mode refine stats."""
+        prefix = f"refine.{self.mode}."
+        metrics.incr(prefix + 'steps')
+        if cached:
+            metrics.incr(prefix + 'cached')
+            return
+        metrics.incr(prefix + 'prompt_tokens', prompt_tokens)
+        metrics.incr(prefix + 'output_tokens', output_tokens)
+        metrics.incr(prefix + 'latency_ms', round(latency * 1000))
+        if self.mode == 'incremental':
+            # What the full rewrite would have cost: the whole-draft prompt in, about the draft's length out
+            metrics.incr(prefix + 'full_prompt_tokens', llm.estimate_tokens(self.full_prompt))
+            metrics.incr(prefix + 'full_output_tokens', llm.estimate_tokens(self.draft))
+            logger.info(f"Incremental refine of sections {self.first + 1}-{self.last + 1} of {len(self.sections)}: "
+                        f"{prompt_tokens}+{output_tokens} tokens (full rewrite ~{llm.estimate_tokens(self.full_prompt)}"
+                        f"+{llm.estimate_tokens(self.draft)}), {latency:.2f}s")
+        else:
+            logger.info(f"Full refine: {prompt_tokens}+{output_tokens} tokens, {latency:.2f}s")
+
+
+def plan_step(draft, feedback, full_prompt, instructions, mode=None):
+    """
+    Decide how to run a refine step.
+    Args:
+        draft (str): The previous draft (markdown).
+        feedback (str): The user's refine prompt, used to find the sections it is about.
+        full_prompt (str): The whole-draft refine prompt the view would send in full mode.
+        instructions (str): The view's standing instructions (keywords, length), repeated in the section prompt.
+        mode (str, optional): 'incremental' or 'full' (default: REFINE_MODE).
+    Returns:
+        RefineStep: Full-rewrite steps when the mode is 'full', the feedback concerns the whole
+                    article, or the targeted sections are most of it.
+    """
+    mode = mode or settings.REFINE_MODE
+    sections = split_sections(draft)
+    targets = target_sections(sections, feedback) if mode == 'incremental' else None
+    if targets is not None:
+        # One contiguous span, so the answer can always be spliced back even if Gemini merges or splits sections
+        first, last = targets[0], targets[-1]
+        span_words = sum(section.words(draft) for section in sections[first:last + 1])
+        if span_words <= settings.REFINE_MAX_SHARE * len(draft.split()):
+            return RefineStep(draft, feedback, full_prompt, instructions, sections, first, last)
+    return RefineStep(draft, feedback, full_prompt, instructions)
+
+
+def refine(draft, feedback, full_prompt, instructions, mode=None):
+    """
+    Run one refine step through the shared LLM client.
+    Returns:
+        dict: 'content' (the new draft), 'mode', 'prompt_tokens', 'output_tokens', 'latency' (seconds)
+              and, for incremental steps, 'sections' (first, last; 1-based).
+    """
+    step = plan_step(draft, feedback, full_prompt, instructions, mode)
+    response = llm.generate(step.prompt, task=step.task)
+    step.record(response.prompt_tokens, response.output_tokens, response.latency, response.cached)
+    result = {
+        'content': step.apply(response.text),
+        'mode': step.mode,
+        'prompt_tokens': response.prompt_tokens,
+        'output_tokens': response.output_tokens,
+        'latency': round(response.latency, 3),
+    }
+    if step.mode == 'incremental':
+        result['sections'] = [step.first + 1, step.last + 1]
+    return result
+
+
+def refine_stats():
+    """Per-mode refine counters with per-step averages, and the tokens incremental steps saved over full rewrites."""
+    names = [f"refine.{mode}.{field}" for mode in REFINE_MODES for field in STAT_FIELDS]
+    counters = metrics.get_counters(names)
+    report = {}
+    for mode in REFINE_MODES:
+        stats = {field: counters[f"refine.{mode}.{field}"] for field in STAT_FIELDS}
+        billed = stats['steps'] - stats['cached']
+        stats['tokens_per_step'] = round((stats['prompt_tokens'] + stats['output_tokens']) / billed) if billed else None
+        stats['mean_latency_ms'] = round(stats['latency_ms'] / billed) if billed else None
+        report[mode] = stats
+    incremental = report['incremental']
+    full_estimate = incremental['full_prompt_tokens'] + incremental['full_output_tokens']
+    used = incremental['prompt_tokens'] + incremental['output_tokens']
+    incremental['tokens_saved'] = full_estimate - used
+    incremental['token_ratio'] = round(used / full_estimate, 3) if full_estimate else None
+    return report
+
+
+def timed_apply(step):
+    """For streamed steps: a function that splices the streamed text and records the step, timed from now."""
+    started = time.monotonic()
+
+    def finish(text):
+        step.record(llm.estimate_tokens(step.prompt), llm.estimate_tokens(text), time.monotonic() - started)
+        return step.apply(text)
+
+    return finish
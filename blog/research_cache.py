@@ -0,0 +1,141 @@
+# blog/research_cache.py
+import logging
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from blog.generate_seo_content import fetch_article_pages, fetch_google_articles
+from blog.models import CacheCounter, PageCacheEntry, SerpCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_keyword(keyword):
+    """Lower-case the keyword and collapse whitespace so trivially different searches share a cache entry."""
+    return re.sub(r'\s+', ' ', keyword or '').strip().lower()
+
+
+def count_cache_use(name, hits=0, misses=0, revalidations=0):
+    if not (hits or misses or revalidations):
+        return
+    CacheCounter.objects.get_or_create(name=name)
+    CacheCounter.objects.filter(name=name).update(
+        hits=F('hits') + hits,
+        misses=F('misses') + misses,
+        revalidations=F('revalidations') + revalidations,
+    )
+
+
+def evict_least_recently_used(model, max_entries):
+    """Drop the least recently used rows beyond max_entries."""
+    stale_ids = list(model.objects.order_by('-last_used').values_list('id', flat=True)[max_entries:])
+    if stale_ids:
+        model.objects.filter(id__in=stale_ids).delete()
+        logger.info(f"Evicted {len(stale_ids)} {model.__name__} rows")
+
+
+def cached_google_articles(primary_keyword, num_results=4):
+    """
+    Return the organic article URLs for a keyword, using the SERP cache when the entry is still fresh.
+    Args:
+        primary_keyword (str): The keyword to search for.
+        num_results (int): Number of organic articles to return (default: 4).
+    Returns:
+        list: List of organic article URLs.
+    """
+    keyword = normalize_keyword(primary_keyword)
+    now = timezone.now()
+    entry = SerpCacheEntry.objects.filter(keyword=keyword).first()
+    if entry and entry.fetched_at >= now - timedelta(seconds=settings.SERP_CACHE_TTL):
+        SerpCacheEntry.objects.filter(pk=entry.pk).update(last_used=now)
+        count_cache_use('serp', hits=1)
+        logger.info(f"SERP cache hit for '{keyword}'")
+        return entry.urls[:num_results]
+
+    count_cache_use('serp', misses=1)
+    urls = fetch_google_articles(primary_keyword, num_results=num_results)
+    if urls:
+        SerpCacheEntry.objects.update_or_create(
+            keyword=keyword,
+            defaults={'urls': urls, 'fetched_at': now, 'last_used': now},
+        )
+        evict_least_recently_used(SerpCacheEntry, settings.SERP_CACHE_MAX_ENTRIES)
+    return urls
+
+
+def cached_article_text(article_urls):
+    """
+    Extract article text for a list of URLs, serving fresh pages from the page cache and
+    re-validating stale ones with conditional requests (ETag / Last-Modified).
+    Args:
+        article_urls (list): List of article URLs to scrape.
+    Returns:
+        list: List of extracted text content, in the same order as the URLs (failed URLs are left out).
+    """
+    return [text for _, text in cached_articles(article_urls)]
+
+
+def cached_articles(article_urls):
+    """Like cached_article_text, but returns (url, text) pairs so callers know each text's source."""
+    urls = [url for url in article_urls if url]
+    if not urls:
+        return []
+
+    now = timezone.now()
+    fresh_after = now - timedelta(seconds=settings.PAGE_CACHE_TTL)
+    entries = {entry.url: entry for entry in PageCacheEntry.objects.filter(url__in=urls)}
+
+    texts = {}
+    to_fetch = []
+    validators = {}
+    for url in urls:
+        entry = entries.get(url)
+        if entry and entry.fetched_at >= fresh_after:
+            texts[url] = entry.text
+        else:
+            to_fetch.append(url)
+            if entry and (entry.etag or entry.last_modified):
+                validators[url] = {'etag': entry.etag, 'last_modified': entry.last_modified}
+
+    hits = len(texts)
+    revalidated = []
+    misses = 0
+    for page in fetch_article_pages(to_fetch, validators=validators) if to_fetch else []:
+        url = page['url']
+        if page['error']:
+            misses += 1
+            if url in entries:
+                texts[url] = entries[url].text  # Serving the stale copy beats dropping the competitor
+            continue
+        if page['not_modified'] and url in entries:
+            texts[url] = entries[url].text
+            revalidated.append(url)
+            continue
+        misses += 1
+        if page['text']:
+            texts[url] = page['text']
+            PageCacheEntry.objects.update_or_create(
+                url=url,
+                defaults={
+                    'text': page['text'],
+                    'etag': page['etag'],
+                    'last_modified': page['last_modified'],
+                    'fetched_at': now,
+                    'last_used': now,
+                },
+            )
+
+    fresh_urls = [url for url in texts if url in entries and url not in revalidated]
+    if fresh_urls:
+        PageCacheEntry.objects.filter(url__in=fresh_urls).update(last_used=now)
+    if revalidated:
+        PageCacheEntry.objects.filter(url__in=revalidated).update(fetched_at=now, last_used=now)
+    count_cache_use('page', hits=hits + len(revalidated), misses=misses, revalidations=len(revalidated))
+    if misses:
+        evict_least_recently_used(PageCacheEntry, settings.PAGE_CACHE_MAX_ENTRIES)
+
+    logger.info(f"Page cache: {hits} fresh, {len(revalidated)} revalidated, {misses} fetched")
+    return [(url, texts[url]) for url in urls if texts.get(url)]
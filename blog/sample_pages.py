@@ -0,0 +1,111 @@
+# blog/sample_pages.py
+"""
+Deterministic competitor-style article pages (navigation, sidebars, author lines, contact
+details, comment sections) for the text cleaning and extraction benchmarks, so they can run
+on a realistic corpus without scraping anything.
+"""
+import random
+
+WORDS = (
+    "school students campus learning teachers boarding hostel curriculum sports academic "
+    "facilities admission parents education activities library science music discipline "
+    "environment residential holistic development faculty classrooms programme excellence"
+).split()
+
+SCHOOLS = ["Doon Valley Academy", "Himalayan Heights School", "Pinegrove International", "Welham Hill School"]
+EMOJIS = ["\U0001F600", "\U0001F680", "\U0001F3EB", "\U0001F1EE\U0001F1F3"]
+
+
+def _sentence(rng, words=14):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng, sentences=5):
+    return " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(sentences))
+
+
+def _navigation(rng, items=40):
+    links = "".join(f'<li><a href="/section-{n}">Section {rng.choice(WORDS).title()} {n}</a></li>' for n in range(items))
+    return f'<header class="site-header"><nav class="menu"><ul>{links}</ul></nav></header>'
+
+
+def _sidebar(rng, items=15):
+    links = "".join(f'<li><a href="/post-{n}">{_sentence(rng, 6)}</a></li>' for n in range(items))
+    return (f'<aside class="sidebar"><h3>Recent Posts</h3><ul>{links}</ul>'
+            f'<div class="widget">Subscribe to our newsletter {_sentence(rng, 8)}</div></aside>')
+
+
+def _comments(rng, count):
+    comments = "".join(
+        f'<li class="comment"><p>Comment by {rng.choice(["Asha", "Rohan", "Meera"])} Sharma</p>'
+        f'<p>{_paragraph(rng, 2)}</p><a class="reply">Reply</a></li>'
+        for _ in range(count)
+    )
+    return (f'<section id="comments"><h3>This Post Has {count} Comments</h3><ol>{comments}</ol>'
+            '<div id="respond"><h3>Leave a Reply</h3><a>Cancel reply</a>'
+            '<p>Enter your name or username to comment</p><p>Enter your email address to comment</p>'
+            '<p>Enter your website URL (optional)</p>'
+            '<p>Save my name, email, and website in this browser for the next time I comment</p></div></section>')
+
+
+def _school_listing(rng, n):
+    school = SCHOOLS[n % len(SCHOOLS)]
+    return (
+        f'<h3>{n + 1}. {school}</h3>'
+        f'<p>{rng.randint(3, 4)}.{rng.randint(0, 9)} ⭐⭐⭐⭐ ({rng.randint(10, 300)} Reviews)</p>'
+        f'<p>Important School Information:-</p>'
+        f'<p>Fee Structure (Annual)Rs {rng.randint(3, 9)}00000 – {rng.randint(10, 15)}00000</p>'
+        f'<p>GradesKG-12</p>'
+        f'<p>Location – Dehradun</p>'
+        f'<p>Address {rng.randint(1, 99)} Rajpur Road, Dehradun, Uttarakhand, India 248001</p>'
+        f'<p>Phone +91 {rng.randint(100, 999)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}</p>'
+        f'<p>Email admissions@{school.split()[0].lower()}.edu.in</p>'
+        f'<p>{_paragraph(rng, 4)}</p>'
+    )
+
+
+def sample_page(n, paragraphs=20):
+    """
+    Return (url, html) for the n-th sample page. Even pages are school directory listings (the
+    pages the Dehradun rules were written for), odd pages generic blog posts; both carry the
+    usual theme boilerplate around the article. Every third page wraps the article in plain
+    divs instead of <main>/<article>.
+    """
+    rng = random.Random(n)
+    school_page = n % 2 == 0
+    host = "www.topschools.example" if school_page else f"blog{n % 5}.example.com"
+    title = "The Top 10 Boarding Schools in Dehradun for 2025-26" if school_page else _sentence(rng, 7)
+
+    body = [
+        f'<p>Post author:{rng.choice(["Admin", "Editorial Team"])}</p>',
+        f'<p>Post published:March {rng.randint(1, 28)}, 2025</p>',
+        f'<p>LAST UPDATED: {rng.randint(1, 28)}/03/2025</p>',
+        '<div class="toc"><p>Table of Contents</p><a>Toggle</a></div>',
+    ]
+    for p in range(paragraphs):
+        body.append(f'<p>{_paragraph(rng)} {rng.choice(EMOJIS) if p % 4 == 0 else ""}</p>')
+        if p % 7 == 3:
+            body.append(f'<p><strong>Also Read:</strong> <a href="/related-{p}">{_sentence(rng, 6)}</a></p>')
+        if school_page and p % 3 == 0:
+            body.append(_school_listing(rng, p // 3))
+    body.append(f'<p>Reach us at info@{host} or +91-135-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}.</p>')
+    body.append('<a class="more">Read More</a><a class="cta">Enquire now</a>')
+
+    content = f'<h1>{title}</h1>{"".join(body)}{_comments(rng, rng.randint(1, 6))}'
+    if n % 3 == 2:
+        # An older theme with no semantic containers or well-known content classes
+        layout = f'<div id="page"><div class="row"><div class="col-8 entry">{content}</div>{_sidebar(rng)}</div></div>'
+    else:
+        layout = f'<main><article class="post">{content}</article>{_sidebar(rng)}</main>'
+    html = (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+        f'<script>var config = {{"theme": "{rng.choice(WORDS)}"}};</script></head><body>'
+        f'{_navigation(rng)}{layout}'
+        f'<footer class="site-footer"><p>{_sentence(rng, 10)}</p></footer></body></html>'
+    )
+    return f"https://{host}/articles/{n}", html
+
+
+def sample_pages(count, paragraphs=20):
+    return [sample_page(n, paragraphs) for n in range(count)]
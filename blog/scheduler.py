@@ -1,63 +1,163 @@
 # blog/scheduler.py
 from django.http import JsonResponse
+from django.utils import timezone
 import logging
-from .cron import publish_scheduled_blogs  # Import the publishing function
-from pyairtable import Table
+from .cron import publish_records  # Import the publishing function
+from .airtable_client import AirtableClient, chunked
+from .models import AirtableScheduleEntry, AirtableSyncState
 from decouple import config
-from datetime import datetime
-import pytz
+from datetime import datetime, timedelta, timezone as dt_timezone
 
 # Setting up logging to send messages to Vercel logs
 logger = logging.getLogger(__name__)
 
-def schedule_new_blogs():
+SCHEDULER_SYNC_INTERVAL = config('SCHEDULER_SYNC_INTERVAL', default=300, cast=int)  # Longest the scheduler sleeps without looking for Airtable edits
+SCHEDULER_FULL_SYNC_INTERVAL = config('SCHEDULER_FULL_SYNC_INTERVAL', default=24 * 3600, cast=int)  # Full resync, to drop records deleted in Airtable
+SYNC_OVERLAP = timedelta(seconds=60)  # Re-read a minute before the last sync, in case our clock and Airtable's disagree
+SCHEDULED = 'Scheduled'
+REFRESH_BATCH = 50  # Due records re-read per request; keeps the filterByFormula URL short
+
+
+def parse_publish_date(value):
     """
-    Check Airtable for scheduled SEO blog posts and publish them to WordPress if their Publish Date has passed.
-    This function will be called by the cron job.
+    Parse Airtable's ISO 8601 'Publish Date' (e.g. "2025-03-25T00:00:00.000Z") into an aware datetime, or None.
+    Date-only values and times without an offset are taken as UTC, like Airtable's API does.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def sync_schedule(airtable=None, full=False):
+    """
+    Bring the local mirror of scheduled records up to date.
+
+    The first sync (and one every SCHEDULER_FULL_SYNC_INTERVAL) reads every Scheduled record; after
+    that only records modified since the previous sync are fetched, so the cost follows the number
+    of edits rather than the size of the schedule.
+    Returns:
+        int: Number of records fetched from Airtable.
     """
-    # Configuring to Airtable
-    api_key = config('AIRTABLE_API_KEY')
-    base_id = config('AIRTABLE_BASE_ID')
-    table_name = config('AIRTABLE_TABLE_NAME')
-    table = Table(api_key, base_id, table_name)
-
-    # Fetching all scheduled blog posts
-    records = table.all(formula="{Status}='Scheduled'")
-    if not records:
-        logger.info("No scheduled SEO blog posts found in Airtable.")
-        return
+    airtable = airtable or AirtableClient()
+    state, _ = AirtableSyncState.objects.get_or_create(table_name=airtable.table_name)
+    started = timezone.now()
+    full = full or state.synced_until is None or state.full_sync_at is None or \
+        started - state.full_sync_at > timedelta(seconds=SCHEDULER_FULL_SYNC_INTERVAL)
+
+    if full:
+        records = airtable.all(formula=f"{{Status}}='{SCHEDULED}'")
+    else:
+        since = (state.synced_until - SYNC_OVERLAP).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        records = airtable.all(formula=f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since}'))")
 
+    scheduled = []
+    unscheduled = []
     for record in records:
-        record_id = record['id']
         fields = record['fields']
-        title = fields.get('Title', 'Untitled')
-        publish_date_str = fields.get('Publish Date', '')
-
-        if not publish_date_str:
-            logger.info(f"Blog '{title}' has no Publish Date. Skipping.")
+        if fields.get('Status') != SCHEDULED or fields.get('WP Post ID'):
+            unscheduled.append(record['id'])
             continue
+        publish_at = parse_publish_date(fields.get('Publish Date'))
+        if publish_at is None:
+            logger.warning(f"Blog '{fields.get('Title', 'Untitled')}' has no valid Publish Date: {fields.get('Publish Date')!r}. Skipping.")
+        scheduled.append(AirtableScheduleEntry(record_id=record['id'], status=SCHEDULED, publish_at=publish_at, fields=fields))
+
+    if scheduled:
+        AirtableScheduleEntry.objects.bulk_create(
+            scheduled, update_conflicts=True, unique_fields=['record_id'],
+            update_fields=['status', 'publish_at', 'fields', 'synced_at'],
+        )
+    # The mirror only holds records that are still waiting to go out
+    if full:
+        AirtableScheduleEntry.objects.exclude(record_id__in=[entry.record_id for entry in scheduled]).delete()
+    elif unscheduled:
+        AirtableScheduleEntry.objects.filter(record_id__in=unscheduled).delete()
+
+    state.synced_until = started
+    if full:
+        state.full_sync_at = started
+    state.save()
+    logger.info(f"Synced {len(records)} Airtable records ({'full' if full else 'incremental'}).")
+    return len(records)
+
+
+def due_entries(now=None):
+    """Mirrored records whose Publish Date has passed, oldest first (served by airtable_schedule_due_idx)."""
+    return AirtableScheduleEntry.objects.filter(status=SCHEDULED, publish_at__lte=now or timezone.now()).order_by('publish_at')
+
 
-        try:
-            # Parsing the Publish Date in ISO 8601 format (e.g., "2025-03-25T00:00:00.000Z")
-            publish_date = datetime.strptime(publish_date_str, '%Y-%m-%dT%H:%M:%S.%fZ')
-            publish_date = publish_date.replace(tzinfo=pytz.UTC)
-            local_tz = pytz.timezone('Asia/Kolkata')  # Use IST timezone
-            publish_date = publish_date.astimezone(local_tz)
-            now = datetime.now(local_tz)
-
-            logger.info(f"Checking blog '{title}' (Record ID: {record_id})")
-            logger.info(f"Publish Date: {publish_date.strftime('%Y-%m-%d %I:%M%p %Z')}")
-            logger.info(f"Current Time: {now.strftime('%Y-%m-%d %I:%M%p %Z')}")
-            logger.info(f"Is Publish Date in the past? {publish_date <= now}")
-
-            if publish_date <= now:
-                logger.info(f"Publish Date for '{title}' is in the past ({publish_date_str}). Posting as draft to WordPress.")
-                publish_scheduled_blogs(record_id=record_id, immediate=False)  # Post as draft
-            else:
-                logger.info(f"Blog '{title}' is scheduled for {publish_date.strftime('%Y-%m-%d %I:%M%p %Z')}. Waiting to publish.")
-        except ValueError as e:
-            logger.error(f"Invalid Publish Date format for '{title}': {publish_date_str}. Error: {str(e)}")
+def next_due_at(now=None):
+    """When the next mirrored record falls due, or None if nothing is scheduled."""
+    return AirtableScheduleEntry.objects.filter(
+        status=SCHEDULED, publish_at__gt=now or timezone.now()
+    ).order_by('publish_at').values_list('publish_at', flat=True).first()
+
+
+def refresh_due(airtable, entries, now=None):
+    """
+    Re-read due mirror entries from Airtable just before they are published, so a record deleted,
+    unscheduled or already published since the last sync is dropped instead of posted, and one
+    whose Publish Date moved into the future waits for it.
+    Args:
+        airtable (AirtableClient): Client for the scheduled table.
+        entries (list): Due AirtableScheduleEntry rows.
+    Returns:
+        list: The records still due, with their current Airtable fields.
+    """
+    now = now or timezone.now()
+    fresh = {}
+    for batch in chunked(entries, REFRESH_BATCH):
+        formula = "OR(" + ",".join(f"RECORD_ID()='{entry.record_id}'" for entry in batch) + ")"
+        fresh.update((record['id'], record) for record in airtable.all(formula=formula))
+
+    due = []
+    gone = []
+    for entry in entries:
+        record = fresh.get(entry.record_id)
+        fields = record['fields'] if record else {}
+        if record is None or fields.get('Status') != SCHEDULED or fields.get('WP Post ID'):
+            gone.append(entry.record_id)
+            continue
+        publish_at = parse_publish_date(fields.get('Publish Date'))
+        if publish_at is None or publish_at > now:
+            AirtableScheduleEntry.objects.filter(pk=entry.pk).update(publish_at=publish_at, fields=fields)
             continue
+        due.append(record)
+    if gone:
+        logger.info(f"{len(gone)} due records were deleted or unscheduled in Airtable; dropping them.")
+        AirtableScheduleEntry.objects.filter(record_id__in=gone).delete()
+    return due
+
+
+def schedule_new_blogs():
+    """
+    Sync the scheduled SEO blog posts from Airtable and publish the due ones to WordPress as drafts.
+    This function will be called by the cron job.
+    Returns:
+        dict: 'synced' (records fetched), 'published' (records posted) and 'next_due' (datetime or None).
+    """
+    airtable = AirtableClient()
+    synced = sync_schedule(airtable)
+
+    now = timezone.now()
+    # The mirror can be up to SCHEDULER_FULL_SYNC_INTERVAL behind on deletions, so the due records are re-read
+    due = refresh_due(airtable, list(due_entries(now)), now)
+    published = {}
+    if due:
+        logger.info(f"{len(due)} scheduled blogs are due. Posting as drafts to WordPress.")
+        published = publish_records(due, immediate=False, airtable=airtable)
+        AirtableScheduleEntry.objects.filter(record_id__in=list(published)).delete()
+    else:
+        logger.info("No scheduled SEO blog posts are due.")
+
+    return {'synced': synced, 'published': len(published), 'next_due': next_due_at(now)}
+
 
 def run_scheduler(request):
     """
@@ -65,6 +165,12 @@ def run_scheduler(request):
     Returns a JSON response for Vercel compatibility.
     """
     logger.info("Scheduler cron job triggered.")
-    schedule_new_blogs()
+    result = schedule_new_blogs()
     logger.info("Scheduler run completed.")
-    return JsonResponse({"status": "success", "message": "Scheduler executed"})
+    return JsonResponse({
+        "status": "success",
+        "message": "Scheduler executed",
+        "synced": result['synced'],
+        "published": result['published'],
+        "next_due": result['next_due'].isoformat() if result['next_due'] else None,
+    })
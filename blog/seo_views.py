@@ -1,35 +1,84 @@
 from django.shortcuts import render, redirect
 from django.views.generic import View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from blog.generate_seo_content import fetch_google_articles, extract_article_text, clean_text, generate_blog_content, save_to_airtable
+from blog.generate_seo_content import save_to_airtable
+from blog.models import GenerationJob
+from blog.jobs import submit_job, take_finished_job, pending_job_id
+from blog.drafts import add_revision, clear_session_draft, get_session_draft, latest_content, start_session_draft
 from blog.cron import publish_scheduled_blogs
-import google.generativeai as genai
-from decouple import config
-import requests
 from datetime import datetime
 import pytz  # For timezone handling
 
 # Configuring Gemini API
-genai.configure(api_key=config('GEMINI_API_KEY'))
 
 class SEOBlogGeneratorView(LoginRequiredMixin, View):
     template_name = 'blog/seo_generator.html'
     login_url = '/login/'
+    job_session_key = 'seo_job'
+    draft_session_key = 'seo_draft_id'
+
+    def current_draft(self, request):
+        # Returning the session Draft (title and meta description) and the body of its newest revision
+        draft = get_session_draft(request, self.draft_session_key)
+        return draft, latest_content(draft) if draft else ''
+
+    def apply_finished_job(self, request):
+        # Recording the result of a finished background job as a new revision of the session draft
+        job = take_finished_job(request, self.job_session_key)
+        if job is None:
+            return
+        draft = get_session_draft(request, self.draft_session_key)
+        if job.status == GenerationJob.STATUS_FAILED:
+            error_messages = {
+                'generate': "Failed to generate blog content.",
+                'refine': f"Error refining blog: {job.error}",
+                'humanize': f"Error humanizing blog: {job.error}",
+                'check_grammar': f"Grammar check failed: {job.error}",
+            }
+            request.session['error'] = error_messages.get(job.action, job.error)
+        elif job.action == 'generate':
+            if not job.result.get('body'):
+                request.session['error'] = "Failed to generate blog content."
+            else:
+                draft = start_session_draft(
+                    request, self.draft_session_key, 'seo',
+                    title=job.result['title'], meta_description=job.result['meta_description'],
+                )
+                add_revision(draft, 'Generate', job.result['body'])
+                request.session['grammar_result'] = ''
+                print("Draft after generation:", job.result)
+        elif draft is None:
+            request.session['error'] = "No draft found. Please generate a draft first."
+        elif job.action in ('refine', 'humanize'):
+            body = job.result['content']
+            add_revision(draft, job.payload.get('feedback') or job.action.capitalize(), body)
+            if job.action == 'refine':
+                request.session['grammar_result'] = ''
+            new_word_count = len(body.split()) if body else 0
+            print(f"Draft after {job.action} ({new_word_count} words):", body)
+        elif job.action == 'check_grammar':
+            add_revision(draft, 'Grammar check', job.result['content'])
+            if job.result['fixes']:
+                request.session['grammar_result'] = f"Applied {job.result['fixes']} grammar fixes (HTML tags preserved)."
+            else:
+                request.session['grammar_result'] = "No grammar issues found."
+        request.session.modified = True
 
     def get(self, request):
+        self.apply_finished_job(request)
         keyword = request.session.get('keyword', '')
-        draft = request.session.get('seo_draft', {})
+        draft, body = self.current_draft(request)
         feedback = request.session.get('feedback', '')
-        body = draft.get('body', '') if isinstance(draft.get('body', ''), str) else ''
         word_count = len(body.split()) if body else 0
         return render(request, self.template_name, {
             'keyword': keyword,
-            'draft': draft.get('body', ''),
-            'title': draft.get('title', ''),
+            'draft': body,
+            'title': draft.title if draft else '',
             'word_count': word_count,
             'feedback': feedback,
             'grammar_result': request.session.get('grammar_result', ''),
             'error': request.session.get('error', ''),
+            'pending_job': pending_job_id(request, self.job_session_key),
         })
 
     def post(self, request):
@@ -37,7 +86,7 @@ class SEOBlogGeneratorView(LoginRequiredMixin, View):
         initial_keyword = request.POST.get('keyword', '').strip()
         feedback = request.POST.get('feedback', '').strip()
         action = request.POST.get('action')
-        draft = request.session.get('seo_draft', {})
+        draft, body = self.current_draft(request)
 
         # Storing the initial keyword in the session and use it throughout
         request.session['keyword'] = initial_keyword if initial_keyword else request.session.get('keyword', '')
@@ -50,32 +99,18 @@ class SEOBlogGeneratorView(LoginRequiredMixin, View):
         print(f"Keyword stored in session: '{request.session['keyword']}'")
         print(f"Current keyword in use: '{keyword}'")
 
-        if action == 'generate':
+        if action in ('generate', 'refine', 'humanize', 'check_grammar') and pending_job_id(request, self.job_session_key):
+            request.session['error'] = "Still working on the previous step. Please wait for it to finish."
+
+        elif action == 'generate':
             if not keyword:
                 request.session['error'] = "Please provide a keyword/topic."
             else:
-                urls = fetch_google_articles(keyword, num_results=4)
-                raw_texts = extract_article_text(urls)
-                cleaned_texts = [clean_text(text) for text in raw_texts]
-                blog_content = generate_blog_content(cleaned_texts, keyword)
-                if not blog_content['body']:
-                    request.session['error'] = "Failed to generate blog content."
-                else:
-                    draft = blog_content
-                    # Preparing records for Airtable (we can save content as draft onto Airtable this is optional)
-                    record = {
-                        "Title": draft['title'],
-                        "Content": draft['body'],
-                        "SEO Summary": draft.get('meta_description', ''),
-                        "Primary Keyword": keyword,
-                        "Status": "Draft",  # Setting as Draft since this is the initial generation
-                        "Created At": datetime.now().isoformat()
-                    }
-                    print("Record being sent to Airtable (generate):", record)  # Debug
-                    # saving record to airtable
-                    request.session['seo_draft'] = draft
-                    request.session['grammar_result'] = ''
-                    print("Draft after generation:", draft)
+                # Research (Google + scraping) and generation both run in the background job
+                submit_job(request, self.job_session_key, 'seo_generate', action, {
+                    'keyword': keyword, 'fresh': request.POST.get('fresh') == '1', 'site': 'seo.generate',
+                })
+                return redirect('seo-generator')
 
         elif action == 'refine':
             if not draft:
@@ -83,82 +118,45 @@ class SEOBlogGeneratorView(LoginRequiredMixin, View):
             elif not feedback:
                 request.session['error'] = "Please provide feedback to refine the draft."
             else:
-                model = genai.GenerativeModel('gemini-1.5-flash')
                 prompt = (
-                    f"Refine this blog post: '{draft['body']}' based on the following feedback: '{feedback}'. "
+                    f"Refine this blog post: '{body}' based on the following feedback: '{feedback}'. "
                     f"Keep it SEO-optimized for the keyword '{keyword}' and maintain a similar length."
                 )
-                try:
-                    response = model.generate_content(prompt)
-                    draft['body'] = response.text.strip()
-                    request.session['seo_draft'] = draft
-                    request.session['grammar_result'] = ''
-                    print("Draft after refinement:", draft)
-                except Exception as e:
-                    request.session['error'] = f"Error refining blog: {str(e)}"
+                submit_job(request, self.job_session_key, 'llm', action, {
+                    'prompt': prompt, 'feedback': feedback, 'site': 'seo.refine', 'task': 'rewrite',
+                })
+                return redirect('seo-generator')
 
         elif action == 'humanize':
             if not draft:
                 request.session['error'] = "No draft to humanize. Please generate a draft first."
             else:
-                original_body = draft['body']
+                original_body = body
                 original_word_count = len(original_body.split()) if original_body else 0
                 print("Original word count before humanizing:", original_word_count)
 
-                model = genai.GenerativeModel('gemini-1.5-flash')
                 min_words = max(0, original_word_count - 30)
                 max_words = original_word_count + 30
                 prompt = (
-                    f"Rewrite this blog post: '{draft['body']}' to sound less robotic, with a natural, conversational tone and a flowy structure. "
+                    f"Rewrite this blog post: '{body}' to sound less robotic, with a natural, conversational tone and a flowy structure. "
                     f"Preserve all the HTML tags (<h2>, <p>, <strong>, <em>) as they are essential for WordPress formatting. "
                     f"Remove any special characters like **, ##, or other markdown formatting that are not HTML. "
                     f"Maintain SEO optimization for the keyword '{keyword}'. "
                     f"The original blog has {original_word_count} words. Ensure the rewritten blog has a word count between {min_words} and {max_words} words, "
                     f"avoiding any significant decrease in length. If necessary, add relevant details or examples to maintain the length while improving the tone."
                 )
-                try:
-                    response = model.generate_content(prompt)
-                    draft['body'] = response.text.strip()
-                    request.session['seo_draft'] = draft
-                    new_word_count = len(draft['body'].split()) if draft['body'] else 0
-                    word_count_diff = new_word_count - original_word_count
-                    print("New word count after humanizing:", new_word_count)
-                    print("Word count difference (new - original):", word_count_diff)
-                    print("Draft after humanizing:", draft)
-                except Exception as e:
-                    request.session['error'] = f"Error humanizing blog: {str(e)}"
+                submit_job(request, self.job_session_key, 'llm', action, {
+                    'prompt': prompt, 'site': 'seo.humanize', 'task': 'rewrite',
+                })
+                return redirect('seo-generator')
 
         elif action == 'check_grammar':
             if not draft:
                 request.session['error'] = "No draft to check. Please generate a draft first."
             else:
-                url = "https://api.languagetool.org/v2/check"
-                data = {'text': draft['body'], 'language': 'en-US'}
-                try:
-                    response = requests.post(url, data=data)
-                    result = response.json()
-                    matches = result.get('matches', [])
-                    if matches:
-                        fixed_text = draft['body']
-                        offset_shift = 0
-                        for match in matches:
-                            # Skipping fixes that might affect the HTML Tags 
-                            if any(fixed_text[match['offset'] + offset_shift:match['offset'] + offset_shift + match['length']].startswith(tag) 
-                                   for tag in ['<h2>', '<p>', '<strong>', '<em>', '</h2>', '</p>', '</strong>', '</em>']):
-                                continue
-                            start = match['offset'] + offset_shift
-                            length = match['length']
-                            replacement = match['replacements'][0]['value'] if match['replacements'] else fixed_text[start:start+length]
-                            fixed_text = fixed_text[:start] + replacement + fixed_text[start+length:]
-                            offset_shift += len(replacement) - length
-                        draft['body'] = fixed_text
-                        request.session['grammar_result'] = f"Applied {len(matches)} grammar fixes (HTML tags preserved)."
-                    else:
-                        request.session['grammar_result'] = "No grammar issues found."
-                    request.session['seo_draft'] = draft
-                    print("Draft after grammar check:", draft)
-                except Exception as e:
-                    request.session['error'] = f"Grammar check failed: {str(e)}"
+                # Skipping fixes that might affect the HTML Tags
+                submit_job(request, self.job_session_key, 'grammar', action, {'text': body, 'preserve_html': True})
+                return redirect('seo-generator')
 
         elif action in ['schedule', 'publish']:
             if not draft:
@@ -200,9 +198,9 @@ class SEOBlogGeneratorView(LoginRequiredMixin, View):
 
                         # Preparing record for Airtable with ensured Primary Keyword
                         record = {
-                            "Title": draft['title'],
-                            "Content": draft['body'],
-                            "SEO Summary": draft.get('meta_description', ''),
+                            "Title": draft.title,
+                            "Content": body,
+                            "SEO Summary": draft.meta_description,
                             "Primary Keyword": keyword if keyword else request.session.get('keyword', 'N/A'),  # Enforce keyword
                             "Publish Date": publish_date.isoformat(),
                             "Status": status,
@@ -219,7 +217,7 @@ class SEOBlogGeneratorView(LoginRequiredMixin, View):
                             else:
                                 print("Status is Scheduled, not publishing immediately")
                             # Clearing session to reset the form
-                            request.session['seo_draft'] = {}
+                            clear_session_draft(request, self.draft_session_key)
                             request.session['keyword'] = ''
                             request.session['feedback'] = ''
                             request.session['grammar_result'] = ''
@@ -230,14 +228,13 @@ class SEOBlogGeneratorView(LoginRequiredMixin, View):
                     except ValueError as e:
                         request.session['error'] = f"Invalid date format. Use YYYY-MM-DDTHH:MM. Error: {str(e)}"
 
-        body = draft.get('body', '') if isinstance(draft.get('body', ''), str) else ''
         word_count = len(body.split()) if body else 0
         print("Word count in POST:", word_count)
         request.session.modified = True
         return render(request, self.template_name, {
             'keyword': keyword,
-            'draft': draft.get('body', ''),
-            'title': draft.get('title', ''),
+            'draft': body,
+            'title': draft.title if draft else '',
             'word_count': word_count,
             'feedback': feedback,
             'grammar_result': request.session.get('grammar_result', ''),
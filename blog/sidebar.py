@@ -0,0 +1,40 @@
+# blog/sidebar.py
+from django.conf import settings
+from django.core.cache import cache
+
+from blog.models import Post
+from blog.page_cache import bump, get_versions
+
+SIDEBAR_CACHE_KEY = 'blog:sidebar:latest_posts'
+SIDEBAR_SIZE = 5
+
+
+def latest_posts():
+    """
+    Return the five newest posts for the sidebar, from the cache when possible.
+    Returns:
+        list: Dicts with 'id', 'title' and 'date_posted', newest first.
+    """
+    posts = cache.get(SIDEBAR_CACHE_KEY)
+    if posts is None:
+        posts = list(Post.objects.order_by('-date_posted').values('id', 'title', 'date_posted')[:SIDEBAR_SIZE])
+        cache.set(SIDEBAR_CACHE_KEY, posts, settings.SIDEBAR_CACHE_TTL)
+    return posts
+
+
+def sidebar_version():
+    """Version the sidebar fragment and every cached page containing it are keyed on."""
+    return get_versions(['sidebar'])['sidebar']
+
+
+def affects_sidebar(post):
+    """Whether saving or deleting this post can change the latest-posts list."""
+    posts = latest_posts()
+    if len(posts) < SIDEBAR_SIZE or any(entry['id'] == post.pk for entry in posts):
+        return True
+    return post.date_posted >= posts[-1]['date_posted']
+
+
+def invalidate_sidebar():
+    cache.delete(SIDEBAR_CACHE_KEY)
+    bump('sidebar')
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from users.models import Profile
+from .models import Post
+from .page_cache import bump
+from .sidebar import affects_sidebar, invalidate_sidebar
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def refresh_post_caches(sender, instance, **kwargs):
+    # The post's own page and every feed page; the sidebar (and so every page showing it) only when it changes
+    if affects_sidebar(instance):
+        invalidate_sidebar()
+    bump(f'post:{instance.pk}', 'feed')
+
+
+@receiver(pre_save, sender=Profile)
+def remember_profile_image(sender, instance, **kwargs):
+    instance._previous_image = (
+        Profile.objects.filter(pk=instance.pk).values_list('image', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Profile)
+def refresh_author_caches(sender, instance, created, **kwargs):
+    # The avatar is shown on the feeds and on each of the author's post pages
+    if created or instance.image.name == getattr(instance, '_previous_image', None):
+        return
+    post_ids = Post.objects.filter(author_id=instance.user_id).values_list('id', flat=True)
+    bump('feed', *[f'post:{pk}' for pk in post_ids])
@@ -0,0 +1,70 @@
+# blog/streaming.py
+import json
+import logging
+
+from django.http import StreamingHttpResponse
+
+from blog import llm
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(data, event=None):
+    """Format one server-sent event."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def sse_response(events, status=200):
+    response = StreamingHttpResponse(events, content_type='text/event-stream', status=status)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx-style proxies from buffering the stream
+    return response
+
+
+def sse_error(message, status=400):
+    """A one-event stream carrying a validation error, so the browser handles it like any other event."""
+    return sse_response([sse_event({'error': message}, 'error')], status=status)
+
+
+def stream_draft(request, prompt, commit, fresh=False, site='default', task=None):
+    """
+    Stream a Gemini draft to the browser as server-sent events and commit the full text when it finishes.
+    Args:
+        request (HttpRequest): The current request; its session is saved after commit.
+        prompt (str): The prompt to send to Gemini.
+        commit (callable): Called with the complete draft text; it should write the draft history into
+                           request.session. The session middleware has already run by then, so the
+                           session is saved here.
+        fresh (bool): Skip a cached response for this prompt ("regenerate fresh").
+        site (str): Call site from LLM_CALL_SITES; its deadline bounds the whole stream.
+        task (str, optional): Task type from LLM_ROUTES, which picks the model.
+    Returns:
+        StreamingHttpResponse: 'delta' events with text chunks, then a 'done' or 'error' event.
+    """
+    def events():
+        yield ": started\n\n"  # First byte goes out before Gemini answers
+        parts = []
+        try:
+            # Inside the generator, because the response body is iterated after the view returns
+            with llm.call_site(site):
+                for text in llm.stream(prompt, fresh=fresh, task=task):
+                    parts.append(text)
+                    yield sse_event({'delta': text})
+        except llm.DeadlineExceeded:
+            logger.warning(f"Streaming generation at {site} ran out of time")
+            seconds = llm.site_config(site).get('deadline')
+            yield sse_event({'error': f"This took longer than {seconds:.0f} seconds and was stopped. "
+                                      f"Please try again in a moment."}, 'error')
+            return
+        except Exception as e:
+            logger.exception("Streaming generation failed")
+            yield sse_event({'error': f"Error generating content: {str(e)}"}, 'error')
+            return
+
+        content = "".join(parts).strip()
+        commit(content)
+        request.session.save()
+        yield sse_event({'words': len(content.split())}, 'done')
+
+    return sse_response(events())
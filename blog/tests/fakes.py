@@ -0,0 +1,325 @@
+# blog/tests/fakes.py
+"""
+In-process fake Airtable, WordPress and LanguageTool servers, used by the tests and the
+benchmark commands so the pipelines can be exercised end to end without the real services.
+"""
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from blog.ratelimit import TokenBucket
+
+
+def start_server(handler_class):
+    """Serve handler_class on a random local port in a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up (e.g. timed out) before the answer arrived
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _utcnow_iso():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class FakeAirtable:
+    """
+    In-memory Airtable table. Understands the small subset of filterByFormula the app uses
+    ({Status} comparisons, {Publish Date} <= NOW(), IS_AFTER(LAST_MODIFIED_TIME(), ...) and
+    OR(RECORD_ID()='...', ...)),
+    pages with `offset`, rejects writes of more than 10 records and answers 429 above
+    `rate_limit` requests per second, like the real API.
+    """
+
+    def __init__(self, rate_limit=5, page_size_max=100):
+        self.rate_limit = rate_limit
+        self.page_size_max = page_size_max
+        self.records = {}
+        self.lock = threading.Lock()
+        self.requests = []  # (method, path) of every request
+        self.rate_limited = 0
+        self.records_served = 0  # Records returned by list requests, i.e. what reads actually transfer
+        self._bucket = TokenBucket(rate_limit)
+        self._next_id = 1
+
+    def add(self, fields):
+        with self.lock:
+            record_id = f"rec{self._next_id:014d}"
+            self._next_id += 1
+            now = _utcnow_iso()
+            self.records[record_id] = {'id': record_id, 'createdTime': now, 'modifiedTime': now, 'fields': dict(fields)}
+            return self.records[record_id]
+
+    def count(self, method):
+        return sum(1 for request_method, _ in self.requests if request_method == method)
+
+    def over_limit(self):
+        if self._bucket.try_acquire():
+            return False
+        with self.lock:
+            self.rate_limited += 1
+        return True
+
+    def matches(self, record, formula):
+        if not formula:
+            return True
+        fields = record['fields']
+        record_ids = re.findall(r"RECORD_ID\(\)\s*=\s*'([^']*)'", formula)
+        if record_ids and record['id'] not in record_ids:
+            return False
+        for field, value in re.findall(r"\{([^}]+)\}\s*=\s*[\"']([^\"']*)[\"']", formula):
+            if fields.get(field) != value:
+                return False
+        if re.search(r"\{Publish Date\}\s*<=\s*NOW\(\)", formula):
+            publish_date = fields.get('Publish Date')
+            if not publish_date or _parse_iso(publish_date) > datetime.now(timezone.utc):
+                return False
+        modified_after = re.search(r"IS_AFTER\(LAST_MODIFIED_TIME\(\),\s*DATETIME_PARSE\('([^']+)'\)\)", formula)
+        if modified_after and _parse_iso(record['modifiedTime']) <= _parse_iso(modified_after.group(1)):
+            return False
+        return True
+
+    def list(self, query):
+        formula = query.get('filterByFormula', [None])[0]
+        records = [record for record in self.records.values() if self.matches(record, formula)]
+        sort_field = query.get('sort[0][field]', [None])[0]
+        if sort_field:
+            reverse = query.get('sort[0][direction]', ['asc'])[0] == 'desc'
+            records.sort(key=lambda record: record['fields'].get(sort_field) or '', reverse=reverse)
+        if 'maxRecords' in query:
+            records = records[:int(query['maxRecords'][0])]
+        page_size = min(int(query.get('pageSize', [self.page_size_max])[0]), self.page_size_max)
+        start = int(query.get('offset', ['0'])[0])
+        page = {'records': records[start:start + page_size]}
+        self.records_served += len(page['records'])
+        if start + page_size < len(records):
+            page['offset'] = str(start + page_size)
+        return page
+
+    def delete(self, record_id):
+        with self.lock:
+            self.records.pop(record_id, None)
+
+    def update(self, items):
+        updated = []
+        with self.lock:
+            for item in items:
+                record = self.records[item['id']]
+                record['fields'].update(item['fields'])
+                record['modifiedTime'] = _utcnow_iso()
+                updated.append(record)
+        return updated
+
+    def handler(self):
+        fake = self
+
+        class FakeAirtableHandler(JSONHandler):
+            def route(self, method):
+                fake.requests.append((method, self.path))
+                if fake.over_limit():
+                    return self.send_json(429, {'errors': [{'type': 'RATE_LIMIT_REACHED'}]})
+                parts = urlsplit(self.path)
+                segments = [unquote(segment) for segment in parts.path.strip('/').split('/')]
+                # /v0/<base>/<table>[/<record id>]
+                record_id = segments[3] if len(segments) > 3 else None
+                if method == 'GET' and record_id:
+                    record = fake.records.get(record_id)
+                    return self.send_json(200, record) if record else self.send_json(404, {'error': 'NOT_FOUND'})
+                if method == 'GET':
+                    return self.send_json(200, fake.list(parse_qs(parts.query)))
+                payload = self.read_json()
+                items = payload.get('records', [])
+                if len(items) > 10:
+                    return self.send_json(422, {'error': {'type': 'INVALID_RECORDS', 'message': 'Max 10 records'}})
+                if method == 'PATCH':
+                    return self.send_json(200, {'records': fake.update(items)})
+                if method == 'POST':
+                    return self.send_json(200, {'records': [fake.add(item['fields']) for item in items]})
+                return self.send_json(405, {'error': 'METHOD_NOT_ALLOWED'})
+
+            def do_GET(self):
+                self.route('GET')
+
+            def do_PATCH(self):
+                self.route('PATCH')
+
+            def do_POST(self):
+                self.route('POST')
+
+        return FakeAirtableHandler
+
+
+class FakeWordPress:
+    """
+    In-memory WordPress /wp-json/wp/v2/posts endpoint with a configurable per-request delay.
+    With `hang_every=n`, every n-th POST creates the post but then stalls for `hang_seconds`
+    before answering, the way a slow WordPress does when the client gives up on a POST that landed.
+    With `fail_status`, every POST is answered with that status and creates nothing.
+    """
+
+    def __init__(self, delay=0.0, hang_every=0, hang_seconds=0.0, fail_status=None):
+        self.delay = delay
+        self.hang_every = hang_every
+        self.hang_seconds = hang_seconds
+        self.fail_status = fail_status
+        self.hung = 0
+        self.posts = {}
+        self.lock = threading.Lock()
+        self.requests = []
+        self._next_id = 1
+
+    def create(self, payload):
+        with self.lock:
+            post_id = self._next_id
+            self._next_id += 1
+            slug = payload.get('slug') or re.sub(r'[^a-z0-9]+', '-', payload.get('title', '').lower()).strip('-')
+            post = {'id': post_id, 'slug': slug, 'status': payload.get('status', 'draft'),
+                    'title': {'raw': payload.get('title', '')}, 'meta': payload.get('meta', {})}
+            self.posts[post_id] = post
+            return post
+
+    def should_hang(self, path):
+        """Count an incoming POST; True if it is one that should hang."""
+        with self.lock:
+            self.requests.append(('POST', path))
+            posts_seen = sum(1 for method, _ in self.requests if method == 'POST')
+            if self.hang_every and posts_seen % self.hang_every == 0:
+                self.hung += 1
+                return True
+            return False
+
+    def duplicates(self):
+        """Number of posts beyond the first for each slug."""
+        slugs = [post['slug'] for post in self.posts.values()]
+        return len(slugs) - len(set(slugs))
+
+    def handler(self):
+        fake = self
+
+        class FakeWordPressHandler(JSONHandler):
+            def do_POST(self):
+                hang = fake.should_hang(self.path)
+                payload = self.read_json()
+                time.sleep(fake.delay)
+                if fake.fail_status:
+                    return self.send_json(fake.fail_status, {'code': 'rest_error', 'message': 'Rejected by the fake'})
+                post = fake.create(payload)
+                if hang:
+                    time.sleep(fake.hang_seconds)
+                self.send_json(201, post)
+
+            def do_GET(self):
+                fake.requests.append(('GET', self.path))
+                query = parse_qs(urlsplit(self.path).query)
+                slug = query.get('slug', [None])[0]
+                statuses = query.get('status', ['publish'])[0].split(',')
+                posts = [post for post in fake.posts.values()
+                         if (slug is None or post['slug'] == slug) and post['status'] in statuses]
+                self.send_json(200, posts)
+
+        return FakeWordPressHandler
+
+
+class FakeLanguageTool:
+    """
+    LanguageTool /v2/check endpoint backed by the local grammar rules. Takes plain `text` or
+    annotated `data` (offsets in the answer then refer to the original text, markup included,
+    as with the real server), rejects requests over `max_chars` with a 413 like the public API,
+    and takes `delay` seconds plus `per_kb` seconds per kilobyte to answer.
+    """
+
+    def __init__(self, delay=0.1, per_kb=0.05, max_chars=20000):
+        self.delay = delay
+        self.per_kb = per_kb
+        self.max_chars = max_chars
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+        self.chars_checked = 0
+
+    def check(self, form):
+        from blog.grammar import LOCAL_RULES
+
+        if 'data' in form:
+            # Rebuild what LanguageTool reads, remembering where each character sits in the original
+            plain = []
+            origin = []
+            position = 0
+            for item in json.loads(form['data'][0])['annotation']:
+                if 'text' in item:
+                    plain.append(item['text'])
+                    origin.extend(range(position, position + len(item['text'])))
+                    position += len(item['text'])
+                else:
+                    plain.append(item.get('interpretAs', ''))
+                    origin.extend([position] * len(item.get('interpretAs', '')))
+                    position += len(item['markup'])
+            plain = ''.join(plain)
+        else:
+            plain = form.get('text', [''])[0]
+            origin = range(len(plain))
+        matches = []
+        for rule, pattern, replace, message in LOCAL_RULES:
+            for found in pattern.finditer(plain):
+                start = origin[found.start()]
+                end = origin[found.end() - 1] + 1
+                matches.append({'offset': start, 'length': end - start, 'message': message,
+                                'replacements': [{'value': replace(found)}], 'rule': {'id': rule}})
+        return plain, sorted(matches, key=lambda match: match['offset'])
+
+    def handler(self):
+        fake = self
+
+        class FakeLanguageToolHandler(JSONHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                plain, matches = fake.check(form)
+                with fake.lock:
+                    fake.requests += 1
+                    if len(plain) > fake.max_chars:
+                        fake.rejected += 1
+                    else:
+                        fake.chars_checked += len(plain)
+                if len(plain) > fake.max_chars:
+                    return self.send_json(413, {'message': f"Text exceeds the limit of {fake.max_chars} characters"})
+                time.sleep(fake.delay + fake.per_kb * len(plain) / 1000)
+                self.send_json(200, {'matches': matches})
+
+        return FakeLanguageToolHandler
@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+
+from blog import context_packing
+from blog.extraction import extract_main_text
+from blog.sample_pages import sample_pages
+
+
+class SplitPassagesTests(SimpleTestCase):
+    def test_sentences_are_grouped_whole(self):
+        text = " ".join(f"Sentence {n} has exactly six words." for n in range(20))
+        passages = context_packing.split_passages(text, passage_words=20)
+        self.assertEqual([len(p.text.split()) for p in passages], [18] * 6 + [12])
+        self.assertTrue(all(p.text.endswith('words.') for p in passages))
+
+    def test_text_without_punctuation_is_cut_at_word_boundaries(self):
+        text = ' '.join(f'word{n} alpha beta' for n in range(100))
+        passages = context_packing.split_passages(text, passage_words=60)
+        self.assertEqual([len(p.text.split()) for p in passages], [60] * 5)
+        self.assertEqual(' '.join(p.text for p in passages), text)
+
+    def test_long_sentence_starts_a_new_passage(self):
+        text = "A short opening sentence. Long " + ' '.join(['long'] * 129) + ". Closing line."
+        lengths = [len(p.text.split()) for p in context_packing.split_passages(text, passage_words=60)]
+        self.assertEqual(lengths, [4, 60, 60, 12])
+
+
+class PackContextTests(SimpleTestCase):
+    def test_text_without_punctuation_is_packed(self):
+        texts = [' '.join(f'word{n} alpha beta' for n in range(3000))]
+        packed = context_packing.pack_context(texts, 'alpha', 4000)
+        self.assertGreater(packed.tokens, 3000)
+        self.assertLessEqual(packed.tokens, 4000)
+
+    def test_sample_corpus_stays_within_budget_and_drops_the_syndicated_copy(self):
+        texts = [extract_main_text(html) for _, html in sample_pages(4, 60)]
+        sentences = context_packing.SENTENCE_END.split(texts[0])
+        texts.append(' '.join(sentences[1:]) + ' Republished with permission.')
+        for keyword in ('boarding school', 'admission', 'hostel discipline'):
+            with self.subTest(keyword=keyword):
+                packed = context_packing.pack_context(texts, keyword, 4000)
+                self.assertLessEqual(packed.tokens, 4000)
+                self.assertLess(packed.tokens, packed.raw_tokens / 4)
+                self.assertGreater(packed.duplicates, 0)
+
+    def test_zero_budget_sends_the_texts_whole(self):
+        packed = context_packing.pack_context(['One text.', 'Another.'], 'text', 0)
+        self.assertEqual(packed.text, 'One text. Another.')
@@ -0,0 +1,51 @@
+import contextlib
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from blog import airtable_client, wp_publisher
+from blog.cron import publish_scheduled_blogs
+from blog.tests.fakes import FakeAirtable, FakeWordPress, start_server, stop_server
+
+
+class PublishScheduledBlogsTests(TransactionTestCase):
+    """
+    The publishing cron job against fake Airtable and WordPress servers. A TransactionTestCase,
+    because the WordPress publisher writes its ledger from worker threads.
+    """
+
+    def setUp(self):
+        self.airtable = FakeAirtable()
+        self.wordpress = FakeWordPress()
+        airtable_server, airtable_url = start_server(self.airtable.handler())
+        wordpress_server, wordpress_url = start_server(self.wordpress.handler())
+        self.addCleanup(stop_server, airtable_server)
+        self.addCleanup(stop_server, wordpress_server)
+        for patcher in (
+            mock.patch.object(airtable_client, 'AIRTABLE_API_URL', f"{airtable_url}/v0"),
+            # One publisher thread: SQLite test databases fail concurrent writes instead of waiting
+            mock.patch.object(wp_publisher, 'WP_PUBLISH_WORKERS', 1),
+            mock.patch.dict(os.environ, {
+                'WORDPRESS_API_URL': f"{wordpress_url}/wp-json/wp/v2", 'WORDPRESS_USERNAME': 'user',
+                'WORDPRESS_APP_PASSWORD': 'pass', 'AIRTABLE_API_KEY': 'fake-key', 'AIRTABLE_BASE_ID': 'appFakeBase',
+            }),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_due_records_are_published_once_in_batches(self):
+        due = (datetime.now(timezone.utc) - timedelta(minutes=5)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        for n in range(25):
+            self.airtable.add({'Title': f"Post {n}", 'Content': f"<p>Content {n}</p>", 'Primary Keyword': 'school',
+                               'Status': 'Scheduled', 'Publish Date': due})
+        with contextlib.redirect_stdout(io.StringIO()):
+            publish_scheduled_blogs()
+        self.assertTrue(all(record['fields'].get('WP Post ID') for record in self.airtable.records.values()))
+        self.assertEqual(len(self.wordpress.posts), 25)
+        self.assertEqual(self.wordpress.duplicates(), 0)
+        self.assertEqual(self.airtable.rate_limited, 0)
+        self.assertEqual(self.airtable.count('GET'), 1)
+        self.assertEqual(self.airtable.count('PATCH'), 3)  # 10 records per PATCH
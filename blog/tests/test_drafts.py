@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from blog.drafts import add_revision, draft_history, latest_content
+from blog.models import Draft
+
+BASE = ' '.join(f"word{n}" for n in range(200))
+
+
+@override_settings(DRAFT_STORE_DELTAS=True, DRAFT_SNAPSHOT_INTERVAL=10)
+class AddRevisionTests(TestCase):
+    """Revisions stored as deltas rebuild to exactly the text that was appended."""
+
+    def setUp(self):
+        self.draft = Draft.objects.create(user=User.objects.create_user('writer', password='x'), kind='blogcraft')
+
+    def test_history_round_trips_through_deltas(self):
+        texts = [BASE.replace('word7 ', f"edit{n} ") for n in range(12)]
+        for n, text in enumerate(texts, start=1):
+            add_revision(self.draft, f"Prompt {n}", text)
+        self.assertTrue(self.draft.revisions.filter(delta__isnull=False).exists())
+        self.assertEqual([entry['content'] for entry in draft_history(self.draft)], texts)
+        self.assertEqual([entry['number'] for entry in draft_history(self.draft)], list(range(1, 13)))
+
+    def test_delta_is_against_the_stored_latest_revision(self):
+        # A grammar job started on the first text finishes after a refine step was appended in between
+        started_on = BASE
+        add_revision(self.draft, 'Prompt 1', started_on)
+        add_revision(self.draft, 'Prompt 2', BASE.replace('word3 ', 'refined '))
+        corrected = started_on.replace('word9 ', 'corrected ')
+        add_revision(self.draft, 'AI Grammar Zap', corrected)
+        self.assertEqual(latest_content(self.draft), corrected)
+        self.assertEqual(draft_history(self.draft)[-1]['content'], corrected)
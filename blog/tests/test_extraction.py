@@ -0,0 +1,48 @@
+import re
+from collections import Counter
+
+from bs4 import BeautifulSoup
+from django.test import SimpleTestCase
+
+from blog.extraction import CONTENT_SELECTORS, available_backends, extract_main_text
+from blog.sample_pages import sample_pages
+
+
+def words(text):
+    return Counter(re.findall(r'\w+', text.lower()))
+
+
+class ExtractionBackendTests(SimpleTestCase):
+    """The stream and lxml backends give the soup path's text, and find the article where no selector matches."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pages = []
+        for _, html in sample_pages(30):
+            soup = BeautifulSoup(html, 'html.parser')
+            article = soup.select_one('article.post, div.entry')  # Where the sample pages keep the article
+            has_selector = any(soup.select_one(selector) for selector in CONTENT_SELECTORS)
+            cls.pages.append((html.encode('utf-8'), article.get_text(strip=True), has_selector))
+
+    def backends(self):
+        return [backend for backend in available_backends() if backend != 'soup']
+
+    def test_same_text_as_soup_where_a_selector_matches(self):
+        pages = [content for content, _, has_selector in self.pages if has_selector]
+        self.assertTrue(pages)
+        expected = [extract_main_text(content, backend='soup') for content in pages]
+        for backend in self.backends():
+            with self.subTest(backend=backend):
+                self.assertEqual([extract_main_text(content, backend=backend) for content in pages], expected)
+
+    def test_article_found_where_no_selector_matches(self):
+        pages = [(content, article) for content, article, has_selector in self.pages if not has_selector]
+        self.assertTrue(pages)
+        for backend in self.backends():
+            for content, article in pages:
+                with self.subTest(backend=backend):
+                    found, wanted = words(extract_main_text(content, backend=backend)), words(article)
+                    overlap = sum((found & wanted).values())
+                    self.assertGreater(overlap / sum(found.values()), 0.95)
+                    self.assertGreater(overlap / sum(wanted.values()), 0.95)
@@ -0,0 +1,63 @@
+import random
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog import grammar
+from blog.sample_pages import WORDS
+from blog.tests.fakes import FakeLanguageTool, start_server, stop_server
+
+MISTAKES = ["teh", "the the", "recieve", "wierd", "it , and"]
+
+
+def long_draft(paragraphs, seed=0):
+    """A WordPress-style HTML article with a few typical slips in every paragraph."""
+    rng = random.Random(seed)
+    parts = []
+    for n in range(paragraphs):
+        if n % 5 == 0:
+            parts.append(f"<h2>Section {n // 5 + 1}: {' '.join(rng.choice(WORDS) for _ in range(4))}</h2>\n")
+        sentences = []
+        for _ in range(rng.randint(5, 9)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(10, 22))]
+            words.insert(rng.randrange(len(words)), rng.choice(MISTAKES))
+            sentences.append(' '.join(words).capitalize() + '.')
+        parts.append(f"<p>{' '.join(sentences)} <strong>Tip:</strong> teh end &amp; more.</p>\n")
+    return ''.join(parts)
+
+
+@override_settings(GRAMMAR_MAX_WORKERS=4)
+class ChunkedGrammarCheckTests(TestCase):
+    """A long draft is checked in cached paragraph chunks against a fake LanguageTool server."""
+
+    def setUp(self):
+        cache.clear()
+        self.fake = FakeLanguageTool(delay=0, per_kb=0)
+        server, base_url = start_server(self.fake.handler())
+        self.addCleanup(stop_server, server)
+        previous = grammar.set_backend(grammar.LanguageToolBackend(base_url, 'en-US', timeout=60))
+        self.addCleanup(grammar.set_backend, previous)
+        self.draft = long_draft(60)
+
+    def test_whole_draft_is_over_the_server_limit(self):
+        self.assertGreater(len(self.draft), self.fake.max_chars)
+        with self.assertRaises(grammar.GrammarError):
+            grammar.get_backend().check(self.draft, html=True)
+
+    def test_chunked_corrections_match_a_whole_document_check(self):
+        corrected, applied = grammar.correct(self.draft, html=True)
+        expected, expected_applied = grammar.apply_matches(
+            self.draft, grammar.LocalRuleBackend().check(self.draft, html=True), html=True)
+        self.assertGreater(self.fake.requests, 1)
+        self.assertEqual(self.fake.rejected, 0)
+        self.assertEqual(corrected, expected)
+        self.assertEqual(applied, expected_applied)
+
+    def test_revision_rechecks_only_the_changed_paragraph(self):
+        grammar.correct(self.draft, html=True)
+        paragraphs = self.draft.split('\n')
+        paragraphs[len(paragraphs) // 2] = "<p>This paragraph was rewritten in the the new revision.</p>"
+        requests_before = self.fake.requests
+        corrected, _ = grammar.correct('\n'.join(paragraphs), html=True)
+        self.assertEqual(self.fake.requests - requests_before, 1)
+        self.assertIn("<p>This paragraph was rewritten in the new revision.</p>", corrected)
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from blog import jobs
+from blog.jobs import execute_job, pending_job_id, take_finished_job
+from blog.models import GenerationJob
+
+SITES = {'default': {'deadline': 60, 'hedge': False}, 'test.site': {'deadline': 30, 'hedge': False}}
+
+
+@override_settings(LLM_CALL_SITES=SITES, GENERATION_JOB_GRACE=10)
+class StuckJobTests(TestCase):
+    """A job whose worker died must not keep the view waiting forever."""
+
+    session_key = 'test_job'
+
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='x')
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+        self.request.session = SessionStore()
+
+    def track(self, status, age, site='test.site'):
+        job = GenerationJob.objects.create(user=self.user, kind='blogcraft', action='generate',
+                                           payload={'site': site}, status=status)
+        past = timezone.now() - timedelta(seconds=age)
+        GenerationJob.objects.filter(pk=job.pk).update(created_at=past, updated_at=past)
+        self.request.session[self.session_key] = str(job.pk)
+        return job
+
+    def test_job_within_deadline_stays_pending(self):
+        job = self.track(GenerationJob.STATUS_RUNNING, age=35)
+        self.assertEqual(pending_job_id(self.request, self.session_key), str(job.pk))
+        self.assertIsNone(take_finished_job(self.request, self.session_key))
+
+    def test_stuck_running_job_is_failed_and_handed_off(self):
+        job = self.track(GenerationJob.STATUS_RUNNING, age=41)
+        self.assertIsNone(pending_job_id(self.request, self.session_key))
+        finished = take_finished_job(self.request, self.session_key)
+        self.assertEqual(finished.pk, job.pk)
+        self.assertEqual(finished.status, GenerationJob.STATUS_FAILED)
+        self.assertIn('did not finish in time', finished.error)
+        self.assertNotIn(self.session_key, self.request.session)
+        self.assertEqual(GenerationJob.objects.get(pk=job.pk).status, GenerationJob.STATUS_FAILED)
+
+    def test_stuck_pending_job_uses_default_site_deadline(self):
+        self.track(GenerationJob.STATUS_PENDING, age=65, site='unknown.site')
+        self.assertIsNotNone(pending_job_id(self.request, self.session_key))
+        self.track(GenerationJob.STATUS_PENDING, age=71, site='unknown.site')
+        self.assertIsNone(pending_job_id(self.request, self.session_key))
+
+    def test_finished_job_is_not_touched(self):
+        job = self.track(GenerationJob.STATUS_DONE, age=3600)
+        finished = take_finished_job(self.request, self.session_key)
+        self.assertEqual(finished.status, GenerationJob.STATUS_DONE)
+        self.assertEqual(GenerationJob.objects.get(pk=job.pk).error, job.error)
+
+
+class ExecuteJobTests(TestCase):
+    """A job runs once, however many times its task is delivered."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='x')
+
+    def test_job_that_is_no_longer_pending_is_not_run(self):
+        runner = mock.Mock(return_value={'content': 'Text'})
+        job = GenerationJob.objects.create(user=self.user, kind='llm', action='generate', payload={'prompt': 'Write'})
+        with mock.patch.dict(jobs.JOB_RUNNERS, {'llm': runner}):
+            execute_job(str(job.pk))
+            execute_job(str(job.pk))
+        runner.assert_called_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+        self.assertEqual(job.result, {'content': 'Text'})
+
+    def test_running_job_is_left_alone(self):
+        runner = mock.Mock()
+        job = GenerationJob.objects.create(user=self.user, kind='llm', action='generate', payload={},
+                                           status=GenerationJob.STATUS_RUNNING)
+        with mock.patch.dict(jobs.JOB_RUNNERS, {'llm': runner}):
+            execute_job(str(job.pk))
+        runner.assert_not_called()
+        self.assertEqual(GenerationJob.objects.get(pk=job.pk).status, GenerationJob.STATUS_RUNNING)
@@ -0,0 +1,272 @@
+import contextlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from blog import llm, metrics
+from blog.generate_seo_content import generate_blog_content
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedBackend(llm.FakeBackend):
+    """Fake backend that raises the queued errors, one per attempt, and answers once they run out."""
+
+    def __init__(self, *errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def respond(self, prompt):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"# {prompt}\n\nA paragraph about {prompt.lower()}."
+
+
+class TrackingBackend(llm.FakeBackend):
+    """Fake backend that records the most calls it had in flight at once."""
+
+    def __init__(self, latency):
+        super().__init__(latency)
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, timeout, generation_config=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            return super().generate(prompt, timeout, generation_config)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class TailBackend(llm.FakeBackend):
+    """Fake backend whose calls take `fast` seconds, except those numbered in `slow_calls`, which take `slow`."""
+
+    def __init__(self, fast, slow):
+        super().__init__()
+        self.fast = fast
+        self.slow = slow
+        self.slow_calls = set()
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, timeout, generation_config=None):
+        with self.lock:
+            self.calls += 1
+            latency = self.slow if self.calls in self.slow_calls else self.fast
+        time.sleep(latency)
+        text = f"# {prompt}\n\nA paragraph about {prompt.lower()}."
+        return text, llm.estimate_tokens(prompt), llm.estimate_tokens(text)
+
+
+class BadRequest(Exception):
+    """A non-transient error, like Gemini rejecting the prompt with a 400."""
+
+
+@override_settings(LLM_CACHE_ENABLED=False)
+class CircuitBreakerTests(SimpleTestCase):
+    """The breaker opens on Gemini failing, not on bad requests, retries or abandoned streams."""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.breaker = llm.CircuitBreaker(threshold=3, reset_timeout=30, clock=self.clock)
+        patcher = mock.patch('blog.llm.time.sleep')  # Retry backoff
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def llm_client(self, backend, retries=0):
+        return llm.LLMClient(backend, rpm=10 ** 6, tpm=10 ** 9, max_concurrency=4, timeout=30, retries=retries,
+                             breaker=self.breaker)
+
+    def fail_calls(self, client, count):
+        for _ in range(count):
+            with self.assertRaises(llm.LLMError), self.assertLogs('blog.llm', 'WARNING'):
+                client.generate("Boarding schools")
+
+    def open_breaker(self):
+        self.fail_calls(self.llm_client(ScriptedBackend(*[ConnectionError("down")] * 3)), 3)
+        self.assertEqual(self.breaker.state, 'open')
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, 'half-open')
+
+    def test_transient_failures_open_the_breaker(self):
+        self.open_breaker()
+
+    def test_non_transient_failures_do_not_open_the_breaker(self):
+        self.fail_calls(self.llm_client(ScriptedBackend(*[BadRequest("400 invalid argument")] * 5)), 5)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_a_call_with_retries_counts_once(self):
+        backend = ScriptedBackend(*[ConnectionError("down")] * 3)
+        self.fail_calls(self.llm_client(backend, retries=2), 1)
+        self.assertEqual(backend.calls, 3)
+        self.assertEqual(self.breaker._failures, 1)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_a_retried_call_that_succeeds_resets_the_count(self):
+        self.fail_calls(self.llm_client(ScriptedBackend(ConnectionError("down"))), 1)
+        with self.assertLogs('blog.llm', 'INFO'):
+            self.llm_client(ScriptedBackend(ConnectionError("down")), retries=1).generate("Boarding schools")
+        self.assertEqual(self.breaker._failures, 0)
+
+    def test_retry_backoff_does_not_hold_a_slot(self):
+        client = llm.LLMClient(ScriptedBackend(ConnectionError("down")), rpm=10 ** 6, tpm=10 ** 9, max_concurrency=1,
+                               timeout=30, retries=1, breaker=self.breaker)
+        free_while_sleeping = []
+
+        def sleep(seconds):
+            if seconds >= 1:  # The backoff, not the fake backend's latency
+                free = client.slots.acquire(timeout=0)
+                free_while_sleeping.append(free)
+                if free:
+                    client.slots.release()
+
+        with mock.patch('blog.llm.time.sleep', sleep), self.assertLogs('blog.llm', 'INFO'):
+            self.assertTrue(client.generate("Boarding schools").text)
+        self.assertEqual(free_while_sleeping, [True])
+
+    def test_rejected_trial_frees_the_half_open_slot(self):
+        self.open_breaker()
+        self.fail_calls(self.llm_client(ScriptedBackend(BadRequest("400 invalid argument"))), 1)
+        self.assertTrue(self.llm_client(ScriptedBackend()).generate("Boarding schools").text)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_closed_stream_frees_the_half_open_slot(self):
+        self.open_breaker()
+        chunks = self.llm_client(ScriptedBackend()).stream("Boarding schools " * 20)
+        next(chunks)
+        chunks.close()
+        self.assertFalse(self.breaker._trial_running)
+        # The next call is the new trial, and its success closes the breaker
+        self.assertTrue("".join(self.llm_client(ScriptedBackend()).stream("Boarding schools")))
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_closed_stream_releases_its_slot(self):
+        client = self.llm_client(ScriptedBackend())
+        for _ in range(8):
+            chunks = client.stream("Boarding schools " * 20)
+            next(chunks)
+            chunks.close()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue("".join(client.stream("Boarding schools")))
+
+    def test_open_breaker_fails_fast(self):
+        self.open_breaker()
+        self.clock.now = 0  # Back within the reset timeout
+        backend = ScriptedBackend()
+        with self.assertRaises(llm.CircuitOpenError):
+            self.llm_client(backend).generate("Boarding schools")
+        self.assertEqual(backend.calls, 0)
+
+
+def llm_client(backend, max_concurrency=4, **hedging):
+    return llm.LLMClient(backend, rpm=10 ** 6, tpm=10 ** 9, max_concurrency=max_concurrency, timeout=30, retries=0,
+                         breaker=llm.CircuitBreaker(5, 30), **hedging)
+
+
+@override_settings(LLM_CACHE_ENABLED=False)
+class LLMClientTests(SimpleTestCase):
+    """The shared client caps calls in flight and stops at the caller's deadline."""
+
+    def test_concurrency_cap_holds(self):
+        backend = TrackingBackend(latency=0.02)
+        client = llm_client(backend, max_concurrency=4)
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            responses = list(pool.map(lambda n: client.generate(f"Write about topic {n}"), range(32)))
+        self.assertEqual(len(responses), 32)
+        self.assertLessEqual(backend.peak, 4)
+
+    def test_deadline_stops_a_slow_call(self):
+        client = llm_client(llm.FakeBackend(latency=1.0))
+        started = time.monotonic()
+        with self.assertRaises(llm.DeadlineExceeded), self.assertLogs('blog.llm', 'WARNING'), llm.deadline(0.3):
+            client.generate("A call slower than its deadline")
+        self.assertLess(time.monotonic() - started, 0.6)
+
+    def test_call_site_deadline_stops_a_slow_call(self):
+        previous = llm.set_client(llm_client(llm.FakeBackend(latency=1.0)))
+        self.addCleanup(llm.set_client, previous)
+        sites = {**settings.LLM_CALL_SITES, 'test': {'deadline': 0.3, 'hedge': False}}
+        started = time.monotonic()
+        with override_settings(LLM_CALL_SITES=sites), llm.call_site('test'), self.assertLogs('blog.llm', 'WARNING'):
+            with self.assertRaises(llm.DeadlineExceeded):
+                llm.generate("A call slower than its site's deadline")
+        self.assertLess(time.monotonic() - started, 0.6)
+
+
+@override_settings(LLM_CACHE_ENABLED=False, LLM_CALL_SITES={**settings.LLM_CALL_SITES,
+                                                            'test': {'deadline': 60, 'hedge': True}})
+class HedgingTests(SimpleTestCase):
+    """A call still running past the site's p90 latency gets a second request, within the hedge budget."""
+
+    def setUp(self):
+        cache.clear()
+        self.backend = TailBackend(fast=0.01, slow=0.2)
+        self.client = llm_client(self.backend, max_concurrency=8, hedge_percentile=0.9, hedge_min_delay=0.0,
+                                 hedge_min_samples=10, hedge_budget=0.1)
+        self.warm_up()
+
+    def warm_up(self):
+        with llm.call_site('test'):
+            for n in range(10):
+                self.client.generate(f"Warm-up call {n}")
+
+    def hedges(self):
+        return metrics.get_counters(['llm.hedges', 'llm.hedge_wins'])
+
+    def test_slow_call_is_hedged(self):
+        self.backend.slow = 1.0
+        self.backend.slow_calls = {self.backend.calls + 1}
+        started = time.monotonic()
+        with llm.call_site('test'), self.assertLogs('blog.llm', 'INFO'):
+            self.client.generate("A call that lands on a slow replica")
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.hedges(), {'llm.hedges': 1, 'llm.hedge_wins': 1})
+
+    def test_hedges_stay_within_the_budget(self):
+        self.backend.slow_calls = set(range(self.backend.calls + 1, self.backend.calls + 100))
+        with llm.call_site('test'), self.assertLogs('blog.llm', 'INFO'):
+            for n in range(10):
+                self.client.generate(f"Slow call {n}")
+        self.assertGreater(self.hedges()['llm.hedges'], 0)
+        self.assertLessEqual(self.hedges()['llm.hedges'], 0.1 * 20)
+
+    def test_sites_without_hedging_are_not_hedged(self):
+        self.backend.slow_calls = {self.backend.calls + 1}
+        self.client.generate("A slow call at the default site")
+        self.assertEqual(self.hedges()['llm.hedges'], 0)
+
+
+@override_settings(LLM_CACHE_ENABLED=True)
+class ResponseCacheTests(TestCase):
+    """Repeated SEO generations are served from the response cache, unless asked for fresh responses."""
+
+    def test_repeat_is_cached_and_fresh_bypasses_the_cache(self):
+        backend = llm.FakeBackend()
+        previous = llm.set_client(llm_client(backend))
+        self.addCleanup(llm.set_client, previous)
+        texts = ["Competitor article one about composting at home.", "Competitor article two, on   compost bins."]
+        calls = []
+        for fresh in (False, False, True):
+            calls_before = backend.calls
+            with llm.fresh_responses(fresh), contextlib.redirect_stdout(io.StringIO()):
+                post = generate_blog_content(texts, 'composting', mode='sequential')
+            self.assertTrue(post['body'])
+            calls.append(backend.calls - calls_before)
+        self.assertGreater(calls[0], 0)
+        self.assertEqual(calls, [calls[0], 0, calls[0]])
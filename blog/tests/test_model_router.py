@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from blog import llm, metrics, model_router
+
+CHEAP, MID, STRONG = 'gemini-1.5-flash-8b', 'gemini-1.5-flash', 'gemini-1.5-pro'
+ROUTES = {
+    'edit': {'models': [CHEAP, MID], 'latency_slo': 1.0, 'cost_slo': 0.01, 'output_tokens': 500},
+    'draft': {'models': [STRONG, MID], 'latency_slo': 1.0, 'cost_slo': 0.05, 'output_tokens': 1500},
+    'bulk': {'models': [STRONG, CHEAP], 'latency_slo': 1.0, 'cost_slo': 0.002, 'output_tokens': 1000},
+}
+PROMPT = "Revise this section: " + "context " * 800
+
+
+def llm_client(model, breaker=None):
+    backend = llm.FakeBackend()
+    backend.model_name = model
+    return llm.LLMClient(backend, rpm=10 ** 6, tpm=10 ** 9, max_concurrency=4, timeout=30, retries=0,
+                         breaker=breaker or llm.CircuitBreaker(5, 30))
+
+
+@override_settings(LLM_ROUTING=True, LLM_ROUTES=ROUTES, LLM_ROUTE_MIN_SAMPLES=5, LLM_ROUTE_PROBE_EVERY=100,
+                   LLM_CACHE_ENABLED=False)
+class ModelRouterTests(SimpleTestCase):
+    """Each call goes to the first model of its route that meets the latency and cost SLOs."""
+
+    def setUp(self):
+        cache.clear()
+        model_router.stats.clear()
+        self.addCleanup(model_router.stats.clear)
+        previous = llm.set_client(None)
+        self.addCleanup(llm.set_client, previous)
+
+    def calls(self, task, model, latency, count=5):
+        for _ in range(count):
+            model_router.stats.add(task, model, latency, 500)
+
+    def test_first_model_is_used_while_it_meets_the_slos(self):
+        self.assertEqual(model_router.choose('edit', PROMPT), CHEAP)
+        self.assertEqual(model_router.choose('draft', PROMPT), STRONG)
+
+    def test_model_over_the_cost_slo_is_skipped(self):
+        self.assertEqual(model_router.choose('bulk', PROMPT), CHEAP)
+        self.assertEqual(metrics.get_counters(['route.bulk.downgrades'])['route.bulk.downgrades'], 1)
+
+    def test_slow_model_is_skipped(self):
+        self.calls('edit', CHEAP, 2.0)
+        self.assertEqual(model_router.choose('edit', PROMPT), MID)
+
+    @override_settings(LLM_ROUTE_PROBE_EVERY=5, LLM_ROUTE_WINDOW=0)
+    def test_probes_win_the_traffic_back(self):
+        self.calls('edit', CHEAP, 2.0)
+        chosen = [model_router.choose('edit', PROMPT) for _ in range(10)]
+        self.assertEqual(chosen.count(CHEAP), 2)
+        self.assertEqual(metrics.get_counters(['route.edit.probes'])['route.edit.probes'], 2)
+        # The probes come back fast, and the slow calls drop out of the window
+        self.calls('edit', CHEAP, 0.1)
+        self.assertEqual(model_router.choose('edit', PROMPT), CHEAP)
+
+    def test_no_model_meeting_the_slos_falls_back_to_the_fastest(self):
+        self.calls('edit', CHEAP, 3.0)
+        self.calls('edit', MID, 2.0)
+        self.assertEqual(model_router.choose('edit', PROMPT), MID)
+        self.assertEqual(metrics.get_counters(['route.edit.slo_fallbacks'])['route.edit.slo_fallbacks'], 1)
+
+    def test_model_with_an_open_breaker_is_skipped(self):
+        breaker = llm.CircuitBreaker(1, 30)
+        with self.assertLogs('blog.llm', 'WARNING'):
+            breaker.record_failure()
+        with mock.patch.dict(llm._clients, {CHEAP: llm_client(CHEAP, breaker)}):
+            self.assertEqual(model_router.choose('edit', PROMPT), MID)
+
+    def test_generate_records_the_call_on_its_route(self):
+        with mock.patch.dict(llm._clients, {model: llm_client(model) for model in (CHEAP, MID, STRONG)}):
+            response = llm.generate(PROMPT, task='edit')
+        self.assertEqual(response.model, CHEAP)
+        stats = model_router.route_stats()['edit']['models'][CHEAP]
+        self.assertEqual(stats['calls'], 1)
+        self.assertEqual(stats['output_tokens'], response.output_tokens)
+
+    def test_unknown_route_is_an_error(self):
+        with self.assertRaises(ValueError):
+            model_router.choose('translate', PROMPT)
+
+
+@override_settings(LLM_ROUTING=True, LLM_CACHE_ENABLED=False)
+class ShippedRoutesTests(SimpleTestCase):
+    """The LLM_ROUTES settings ship with, without overrides, send the short and bulk tasks to the cheap tier."""
+
+    def setUp(self):
+        cache.clear()
+        model_router.stats.clear()
+        self.addCleanup(model_router.stats.clear)
+
+    def test_latency_sensitive_and_bulk_routes_start_on_the_cheap_model(self):
+        for task in ('edit', 'seo_meta', 'bulk'):
+            with self.subTest(task=task):
+                models = settings.LLM_ROUTES[task]['models']
+                self.assertEqual(models, [settings.LLM_CHEAP_MODEL, settings.LLM_MODEL])
+                self.assertEqual(model_router.choose(task, PROMPT), settings.LLM_CHEAP_MODEL)
+
+    def test_slow_cheap_model_falls_back_to_the_default_model(self):
+        for _ in range(settings.LLM_ROUTE_MIN_SAMPLES):
+            model_router.stats.add('edit', settings.LLM_CHEAP_MODEL, settings.LLM_ROUTES['edit']['latency_slo'] * 2, 500)
+        self.assertEqual(model_router.choose('edit', PROMPT), settings.LLM_MODEL)
+
+    def test_every_shipped_model_has_a_price(self):
+        for task, route in settings.LLM_ROUTES.items():
+            for model in route['models']:
+                with self.subTest(task=task, model=model):
+                    self.assertIn(model, settings.LLM_MODEL_PRICES)
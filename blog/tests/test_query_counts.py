@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Post
+from blog.sidebar import latest_posts
+
+
+@override_settings(VIEW_CACHE_ENABLED=False, POST_FEED_PAGINATION='keyset', POST_FEED_COUNT='none')
+class PostPageQueryCountTests(TestCase):
+    """
+    Query budgets for the public post pages. A page costs the same number of queries whatever
+    the number of posts and authors on it; a warm sidebar saves its query.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [User.objects.create_user(f'author{n}', password='x') for n in range(3)]
+        now = timezone.now()
+        cls.posts = [
+            Post.objects.create(title=f'Post {n}', content='Words ' * 50, author=cls.authors[n % 3],
+                                date_posted=now - timedelta(hours=n))
+            for n in range(12)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, queries, warm_sidebar):
+        if warm_sidebar:
+            latest_posts()
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_post_list_cold_sidebar(self):
+        response = self.get(reverse('blog-home'), 2, warm_sidebar=False)
+        self.assertEqual(len(response.context['posts']), 5)
+
+    def test_post_list_warm_sidebar(self):
+        self.get(reverse('blog-home'), 1, warm_sidebar=True)
+
+    def test_post_list_next_page(self):
+        first = self.get(reverse('blog-home'), 1, warm_sidebar=True)
+        cursor = first.context['page_obj'].next_cursor
+        self.get(f"{reverse('blog-home')}?after={cursor}", 1, warm_sidebar=True)
+
+    def test_user_post_list_cold_sidebar(self):
+        response = self.get(reverse('user-posts', args=[self.authors[0].username]), 3, warm_sidebar=False)
+        self.assertTrue(all(post.author == self.authors[0] for post in response.context['posts']))
+
+    def test_user_post_list_warm_sidebar(self):
+        self.get(reverse('user-posts', args=[self.authors[0].username]), 2, warm_sidebar=True)
+
+    def test_post_detail_cold_sidebar(self):
+        self.get(reverse('post-detail', args=[self.posts[3].pk]), 2, warm_sidebar=False)
+
+    def test_post_detail_warm_sidebar(self):
+        self.get(reverse('post-detail', args=[self.posts[3].pk]), 1, warm_sidebar=True)
+
+    def test_post_list_cost_does_not_grow_with_posts(self):
+        latest_posts()
+        with self.assertNumQueries(1):
+            self.client.get(reverse('blog-home'))
+        for n in range(20):
+            Post.objects.create(title=f'More {n}', content='Words', author=self.authors[n % 3])
+        latest_posts()
+        with self.assertNumQueries(1):
+            self.client.get(reverse('blog-home'))
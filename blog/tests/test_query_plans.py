@@ -0,0 +1,73 @@
+import json
+import unittest
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import TestCase
+from django.utils import timezone
+
+from blog.models import Post, ScheduledPost
+
+
+def hot_queries():
+    """
+    The query shapes the views and tasks actually run, keyed by a short name.
+    Each entry is (queryset, table that must not be sequentially scanned).
+    """
+    now = timezone.now()
+    post_table = Post._meta.db_table
+    scheduled_table = ScheduledPost._meta.db_table
+    return {
+        # PostListView, first keyset page
+        'post_feed': (Post.objects.order_by('-date_posted', '-id')[:6], post_table),
+        # PostListView, ?after= cursor page (see blog.pagination.keyset_page)
+        'post_feed_after_cursor': (
+            Post.objects.filter(date_posted__lte=now - timedelta(days=30))
+            .filter(Q(date_posted__lt=now - timedelta(days=30)) | Q(id__lt=1000))
+            .order_by('-date_posted', '-id')[:6],
+            post_table,
+        ),
+        # UserPostListView
+        'user_feed': (Post.objects.filter(author_id=1).order_by('-date_posted', '-id')[:6], post_table),
+        # blog.tasks.claim_due_posts
+        'due_scheduled_posts': (
+            ScheduledPost.objects.filter(
+                scheduled_datetime__lte=now, created_by__is_superuser=True, claimed_at__isnull=True
+            ).order_by('scheduled_datetime')[:8],
+            scheduled_table,
+        ),
+        # auto_schedule listing
+        'auto_schedule_list': (ScheduledPost.objects.order_by('-scheduled_datetime'), scheduled_table),
+        # GenerateBlogView publish: drop the matching ScheduledPost
+        'scheduled_post_match': (
+            ScheduledPost.objects.filter(topic='topic', primary_keyword='keyword', additional_keywords='more'),
+            scheduled_table,
+        ),
+    }
+
+
+def seq_scans(plan, table):
+    """Walk an EXPLAIN (FORMAT JSON) plan tree and return the Seq Scan nodes on `table`."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') == table:
+        found.append(plan)
+    for child in plan.get('Plans', []):
+        found.extend(seq_scans(child, table))
+    return found
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on PostgreSQL only')
+class HotQueryPlanTests(TestCase):
+    """The hot Post/ScheduledPost queries must be served by an index, never a sequential scan."""
+
+    def test_hot_queries_use_an_index(self):
+        for name, (queryset, table) in hot_queries().items():
+            with self.subTest(query=name):
+                # Seq scans are off for this transaction only: on a small test table the planner
+                # would rightly prefer one, but if it still picks it here there is no usable index
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+                    plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+                self.assertFalse(seq_scans(plan, table), f"{name} scans {table}:\n{json.dumps(plan, indent=2)}")
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from blog import llm, refine
+from blog.management.commands.benchmark_refine import FEEDBACK, RevisingBackend, sample_draft
+from blog.views import GenerateBlogView
+
+
+@override_settings(LLM_CACHE_ENABLED=False)
+class IncrementalRefineTests(SimpleTestCase):
+    """Section-level refine steps revise what the feedback is about and leave the rest byte for byte."""
+
+    def setUp(self):
+        cache.clear()
+        previous = llm.set_client(llm.LLMClient(RevisingBackend(first_token=0, per_token=0), rpm=10 ** 6, tpm=10 ** 9,
+                                                max_concurrency=4, timeout=30, retries=0,
+                                                breaker=llm.CircuitBreaker(5, 30)))
+        self.addCleanup(llm.set_client, previous)
+
+    def session(self, mode):
+        """Run the refine steps of FEEDBACK one after another. Returns (draft before, result) per step."""
+        draft = sample_draft(70)
+        steps = []
+        with override_settings(REFINE_MODE=mode):
+            for step, feedback in enumerate(FEEDBACK, start=2):
+                payload = GenerateBlogView.refine_payload(draft, feedback, min(step, 4))
+                result = refine.refine(payload['draft'], payload['feedback'], payload['prompt'], payload['instructions'])
+                steps.append((draft, result))
+                draft = result['content']
+        return steps
+
+    def test_untargeted_sections_are_kept(self):
+        steps = self.session('incremental')
+        self.assertEqual([result['mode'] for _, result in steps], ['incremental'] * 3 + ['full'])
+        for before, result in steps[:3]:
+            sections = refine.split_sections(before)
+            first, last = result['sections']
+            start, end = sections[first - 1].start, sections[last - 1].end
+            self.assertTrue(result['content'].startswith(before[:start]))
+            self.assertTrue(result['content'].endswith(before[end:]))
+            self.assertNotEqual(result['content'], before)
+
+    def test_every_section_is_revised_by_the_end(self):
+        before, result = self.session('incremental')[-1]
+        self.assertGreaterEqual(result['content'].count('(revised)'), len(refine.split_sections(before)))
+
+    def test_incremental_steps_cost_fewer_tokens(self):
+        full, incremental = self.session('full'), self.session('incremental')
+        for (_, full_step), (_, step) in zip(full[:3], incremental[:3]):
+            self.assertLess(step['output_tokens'], full_step['output_tokens'])
@@ -0,0 +1,119 @@
+import threading
+import time
+import unittest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from blog import tasks
+from blog.models import Post, ScheduledPost
+
+
+def seed_due_posts(count, admin):
+    due = timezone.now() - timedelta(minutes=1)
+    ScheduledPost.objects.bulk_create(
+        ScheduledPost(topic=f"Topic {n}", primary_keyword='school', additional_keywords='boarding',
+                      scheduled_datetime=due, created_by=admin)
+        for n in range(count)
+    )
+
+
+class FanOutTests(TransactionTestCase):
+    """The claimed posts of a run are generated in parallel, so throughput grows with the workers."""
+
+    posts = 16
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        seed_due_posts(self.posts, self.admin)
+
+    def drain(self, workers):
+        """What process_scheduled_posts and its chord do, with a thread pool for the chord. Returns the seconds taken."""
+
+        def generate(topic, primary_keyword, additional_keywords):
+            time.sleep(0.05)
+            return f"# {topic}\n\nText"
+
+        def generate_post(sp_id, token):
+            try:
+                return tasks.generate_scheduled_post(sp_id, token)
+            finally:
+                connection.close()
+
+        started = time.monotonic()
+        with mock.patch.object(tasks, 'generate_scheduled_content', generate), \
+                ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                token, ids = tasks.claim_due_posts(workers)
+                if not ids:
+                    break
+                results = list(pool.map(generate_post, ids, [token] * len(ids)))
+                tasks.finish_scheduled_posts(results, token, drain=False)
+        return time.monotonic() - started
+
+    def test_more_workers_publish_faster(self):
+        serial = self.drain(1)
+        self.assertEqual(Post.objects.count(), self.posts)
+        Post.objects.all().delete()
+        seed_due_posts(self.posts, self.admin)
+        self.assertLess(self.drain(4), serial / 2)
+        self.assertEqual(sorted(Post.objects.values_list('title', flat=True)),
+                         sorted(f"Topic {n}" for n in range(self.posts)))
+
+
+@unittest.skipUnless(connection.features.has_select_for_update_skip_locked,
+                     'Overlapping claims rely on SELECT ... FOR UPDATE SKIP LOCKED')
+class OverlappingRunTests(TransactionTestCase):
+    """Runs of process_scheduled_posts that overlap must never generate the same post twice."""
+
+    runs = 4
+    posts = 24
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        seed_due_posts(self.posts, self.admin)
+
+    def test_overlapping_runs_generate_each_post_once(self):
+        generated = Counter()
+        lock = threading.Lock()
+        start = threading.Barrier(self.runs)
+        errors = []
+
+        def generate(topic, primary_keyword, additional_keywords):
+            with lock:
+                generated[topic] += 1
+            time.sleep(0.01)  # Keeps the runs overlapping
+            return f"# {topic}\n\nText"
+
+        def run():
+            try:
+                start.wait()
+                while True:
+                    token, ids = tasks.claim_due_posts(3)
+                    if not ids:
+                        return
+                    results = [tasks.generate_scheduled_post(sp_id, token) for sp_id in ids]
+                    tasks.finish_scheduled_posts(results, token, drain=False)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with mock.patch.object(tasks, 'generate_scheduled_content', generate):
+            threads = [threading.Thread(target=run) for _ in range(self.runs)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(generated), self.posts)
+        self.assertEqual(max(generated.values()), 1)
+        self.assertEqual(Post.objects.count(), self.posts)
+        self.assertFalse(ScheduledPost.objects.exists())
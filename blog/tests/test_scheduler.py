@@ -0,0 +1,135 @@
+import contextlib
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from blog import airtable_client, wp_publisher
+from blog.models import AirtableScheduleEntry
+from blog.scheduler import parse_publish_date, schedule_new_blogs
+from blog.tests.fakes import FakeAirtable, FakeWordPress, start_server, stop_server
+
+
+def airtable_date(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+class SchedulerTests(TransactionTestCase):
+    """
+    Scheduler ticks against fake Airtable and WordPress servers. A TransactionTestCase, because
+    the WordPress publisher writes its ledger from worker threads.
+    """
+
+    def setUp(self):
+        self.airtable = FakeAirtable(rate_limit=50)
+        self.wordpress = FakeWordPress()
+        airtable_server, airtable_url = start_server(self.airtable.handler())
+        wordpress_server, wordpress_url = start_server(self.wordpress.handler())
+        self.addCleanup(stop_server, airtable_server)
+        self.addCleanup(stop_server, wordpress_server)
+        for patcher in (
+            mock.patch.object(airtable_client, 'AIRTABLE_API_URL', f"{airtable_url}/v0"),
+            # One publisher thread: SQLite test databases fail concurrent writes instead of waiting
+            mock.patch.object(wp_publisher, 'WP_PUBLISH_WORKERS', 1),
+            mock.patch.dict(os.environ, {
+                'WORDPRESS_API_URL': f"{wordpress_url}/wp-json/wp/v2", 'WORDPRESS_USERNAME': 'user',
+                'WORDPRESS_APP_PASSWORD': 'pass', 'AIRTABLE_API_KEY': 'fake-key',
+                'AIRTABLE_BASE_ID': 'appFakeBase', 'AIRTABLE_TABLE_NAME': 'Test Schedule',
+            }),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.now = datetime.now(timezone.utc)
+
+    def schedule(self, count, publish_at):
+        records = [
+            self.airtable.add({'Title': f"Post {n}", 'Content': f"<p>Content {n}</p>", 'Primary Keyword': 'school',
+                               'Status': 'Scheduled', 'Publish Date': airtable_date(publish_at)})
+            for n in range(count)
+        ]
+        # Built up well before this run, outside the scheduler's re-read overlap
+        for record in records:
+            record['modifiedTime'] = airtable_date(self.now - timedelta(days=1))
+        return records
+
+    def fall_due(self, *records):
+        """Make synced records due without the sync noticing, the way time passing does."""
+        for record in records:
+            record['fields']['Publish Date'] = airtable_date(self.now - timedelta(minutes=1))
+        AirtableScheduleEntry.objects.update(publish_at=self.now - timedelta(minutes=1))
+
+    def tick(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return schedule_new_blogs()
+
+    def test_due_records_are_published_once(self):
+        self.schedule(3, self.now - timedelta(minutes=1))
+        self.assertEqual(self.tick()['published'], 3)
+        self.assertEqual(self.tick()['published'], 0)
+        self.assertEqual(len(self.wordpress.posts), 3)
+        self.assertEqual(self.wordpress.duplicates(), 0)
+        self.assertFalse(AirtableScheduleEntry.objects.exists())
+
+    def test_date_only_publish_date_is_read_as_utc(self):
+        self.assertEqual(parse_publish_date('2025-03-25'), datetime(2025, 3, 25, tzinfo=timezone.utc))
+        self.assertEqual(parse_publish_date('2025-03-25T08:30:00'), datetime(2025, 3, 25, 8, 30, tzinfo=timezone.utc))
+        record, = self.schedule(1, self.now - timedelta(minutes=1))
+        record['fields']['Publish Date'] = '2025-03-25'
+        self.assertEqual(self.tick()['published'], 1)
+
+    def test_record_deleted_in_airtable_is_not_published(self):
+        kept, deleted = self.schedule(2, self.now + timedelta(minutes=1))
+        self.tick()
+        self.assertEqual(AirtableScheduleEntry.objects.count(), 2)
+        # Deletions reach the mirror only on a full sync, so the entry is still there when it falls due
+        self.fall_due(kept, deleted)
+        self.airtable.delete(deleted['id'])
+        self.assertEqual(self.tick()['published'], 1)
+        self.assertEqual([post['title']['raw'] for post in self.wordpress.posts.values()], [kept['fields']['Title']])
+        self.assertFalse(AirtableScheduleEntry.objects.filter(record_id=deleted['id']).exists())
+
+    def test_due_record_is_published_with_its_current_fields(self):
+        record, = self.schedule(1, self.now + timedelta(minutes=1))
+        self.tick()
+        self.fall_due(record)
+        # Edited without the sync seeing it, as an edit racing the tick would be
+        record['fields']['Title'] = 'Edited title'
+        self.assertEqual(self.tick()['published'], 1)
+        self.assertEqual([post['title']['raw'] for post in self.wordpress.posts.values()], ['Edited title'])
+
+    def test_record_moved_to_the_future_waits(self):
+        record, = self.schedule(1, self.now + timedelta(minutes=1))
+        self.tick()
+        self.fall_due(record)
+        record['fields']['Publish Date'] = airtable_date(self.now + timedelta(days=2))
+        result = self.tick()
+        self.assertEqual(result['published'], 0)
+        self.assertEqual(self.wordpress.posts, {})
+        self.assertGreater(result['next_due'], self.now + timedelta(days=1))
+
+    def test_tick_cost_grows_with_the_due_records_not_the_schedule(self):
+        records = self.schedule(250, self.now + timedelta(days=1))
+
+        def tick_cost():
+            requests_before, served_before = len(self.airtable.requests), self.airtable.records_served
+            published = self.tick()['published']
+            return len(self.airtable.requests) - requests_before, self.airtable.records_served - served_before, published
+
+        self.assertEqual(tick_cost(), (3, 250, 0))  # Full sync, one page per 100 records
+        self.assertEqual(tick_cost(), (1, 0, 0))
+        # Pulled forward so they fall due, the way an editor reschedules posts
+        self.airtable.update([
+            {'id': record['id'], 'fields': {'Publish Date': airtable_date(self.now - timedelta(minutes=1))}}
+            for record in records[:5]
+        ])
+        requests_made, served, published = tick_cost()
+        self.assertEqual(published, 5)
+        self.assertLessEqual(requests_made, 3)
+        self.assertLessEqual(served, 10)
+        # The sync re-reads its overlap, which holds the records just published and nothing else
+        requests_made, served, published = tick_cost()
+        self.assertEqual((requests_made, published), (1, 0))
+        self.assertLessEqual(served, 5)
+        self.assertEqual(self.wordpress.duplicates(), 0)
@@ -0,0 +1,71 @@
+import contextlib
+import io
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from blog import llm, metrics
+from blog.extraction import extract_main_text
+from blog.generate_seo_content import GENERATION_MODES, clean_text, generate_blog_content
+from blog.management.commands.benchmark_outline_generation import WritingBackend
+from blog.management.commands.benchmark_seo_generation import SeoBackend
+from blog.sample_pages import sample_pages
+
+KEYWORD = 'boarding schools in dehradun'
+
+
+@override_settings(LLM_CACHE_ENABLED=False, SEO_SECTION_WORKERS=4)
+class SeoGenerationModeTests(SimpleTestCase):
+    """Every SEO generation mode gets a complete post out of a scraped-style corpus."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.texts = [clean_text(extract_main_text(html), url) for url, html in sample_pages(4)]
+
+    def setUp(self):
+        cache.clear()
+
+    def generate(self, backend, mode, target_words=None):
+        previous = llm.set_client(llm.LLMClient(backend, rpm=10 ** 6, tpm=10 ** 9, max_concurrency=8, timeout=30,
+                                                retries=0, breaker=llm.CircuitBreaker(5, 30)))
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return generate_blog_content(self.texts, KEYWORD, mode=mode, target_words=target_words)
+        finally:
+            llm.set_client(previous)
+
+    def assertComplete(self, post):
+        self.assertTrue(post['title'])
+        self.assertTrue(post['body'])
+        self.assertTrue(0 < len(post['meta_description']) <= 160)
+
+    def test_every_mode_writes_a_complete_post(self):
+        for mode in GENERATION_MODES:
+            with self.subTest(mode=mode):
+                self.assertComplete(self.generate(SeoBackend(0, 0, 0, body_words=300), mode))
+
+    def test_truncated_json_falls_back_to_concurrent_calls(self):
+        self.assertComplete(self.generate(SeoBackend(0, 0, 0, body_words=300, bad_json=True), 'combined'))
+        self.assertEqual(metrics.get_counters(['seo_generation.combined.fallbacks'])['seo_generation.combined.fallbacks'], 1)
+
+    def test_concurrent_is_faster_than_sequential(self):
+        elapsed = {}
+        for mode in ('sequential', 'concurrent'):
+            started = time.monotonic()
+            self.assertComplete(self.generate(SeoBackend(0.1, 0, 0, body_words=300), mode))
+            elapsed[mode] = time.monotonic() - started
+        self.assertLess(elapsed['concurrent'], elapsed['sequential'])
+
+    def test_combined_sends_the_corpus_once(self):
+        for mode in ('sequential', 'combined'):
+            self.generate(SeoBackend(0, 0, 0, body_words=300), mode)
+        tokens = metrics.get_counters(['seo_generation.sequential.prompt_tokens', 'seo_generation.combined.prompt_tokens'])
+        self.assertLess(tokens['seo_generation.combined.prompt_tokens'], tokens['seo_generation.sequential.prompt_tokens'])
+
+    def test_outline_mode_writes_sections(self):
+        post = self.generate(WritingBackend(0, 0, 0), 'outline', target_words=2000)
+        self.assertComplete(post)
+        self.assertGreater(post['body'].count('<h2>'), 2)
+        self.assertEqual(metrics.get_counters(['seo_generation.outline.fallbacks'])['seo_generation.outline.fallbacks'], 0)
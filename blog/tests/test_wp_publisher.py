@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from blog import wp_publisher
+from blog.models import WordPressPublication
+from blog.tests.fakes import FakeWordPress, start_server, stop_server
+from blog.wp_publisher import WordPressPublisher, record_slug
+
+JOB = {'record_id': 'rec00000000000042', 'title': 'Boarding schools', 'content': '<p>Text</p>', 'status': 'draft'}
+
+
+class WordPressPublisherTests(TestCase):
+    """A record reaches WordPress at most once, whatever fails along the way."""
+
+    def setUp(self):
+        self.sleeps = []
+        # Retry backoff is recorded rather than slept; the fake server's own sleeps are unaffected
+        clock = SimpleNamespace(monotonic=time.monotonic, sleep=self.sleeps.append)
+        patcher = mock.patch.object(wp_publisher, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def publisher(self, wordpress, timeout=2.0, retries=3):
+        server, url = start_server(wordpress.handler())
+        self.addCleanup(stop_server, server)
+        return WordPressPublisher(api_url=f"{url}/wp-json/wp/v2", username='user', password='pass',
+                                  max_workers=2, timeout=timeout, retries=retries)
+
+    def post_count(self, wordpress):
+        return sum(1 for method, _ in wordpress.requests if method == 'POST')
+
+    def test_publishes_once_and_skips_published_records(self):
+        wordpress = FakeWordPress()
+        publisher = self.publisher(wordpress)
+        self.assertEqual(publisher.publish_one(JOB)['outcome'], 'created')
+        again = publisher.publish_one(JOB)
+        self.assertEqual(again['outcome'], 'already_published')
+        self.assertEqual(len(wordpress.posts), 1)
+
+    def test_post_that_landed_but_timed_out_is_adopted(self):
+        wordpress = FakeWordPress(hang_every=1, hang_seconds=1.0)
+        publisher = self.publisher(wordpress, timeout=0.3)
+        with self.assertLogs('blog.wp_publisher', 'WARNING'):
+            result = publisher.publish_one(JOB)
+        self.assertEqual(result['outcome'], 'adopted')
+        self.assertEqual(self.post_count(wordpress), 1)
+        self.assertEqual(wordpress.duplicates(), 0)
+
+    def test_no_double_publish_after_a_crash(self):
+        # A worker claimed the record, created the post and died before recording it
+        wordpress = FakeWordPress()
+        post = wordpress.create({'title': JOB['title'], 'slug': record_slug(JOB['record_id'], JOB['title'])})
+        WordPressPublication.objects.create(
+            record_id=JOB['record_id'], slug=post['slug'], state=WordPressPublication.STATE_IN_FLIGHT, attempts=1,
+            claimed_at=timezone.now() - timedelta(seconds=wp_publisher.WP_INFLIGHT_STALE + 60),
+        )
+        result = self.publisher(wordpress).publish_one(JOB)
+        self.assertEqual(result['outcome'], 'adopted')
+        self.assertEqual(str(result['wp_post_id']), str(post['id']))
+        self.assertEqual(self.post_count(wordpress), 0)
+        self.assertEqual(len(wordpress.posts), 1)
+        entry = WordPressPublication.objects.get(record_id=JOB['record_id'])
+        self.assertEqual(entry.state, WordPressPublication.STATE_PUBLISHED)
+
+    def test_fresh_in_flight_claim_is_left_alone(self):
+        wordpress = FakeWordPress()
+        WordPressPublication.objects.create(record_id=JOB['record_id'], slug='x', attempts=1,
+                                            state=WordPressPublication.STATE_IN_FLIGHT, claimed_at=timezone.now())
+        self.assertEqual(self.publisher(wordpress).publish_one(JOB)['outcome'], 'in_flight')
+        self.assertEqual(wordpress.requests, [])
+
+    def test_client_error_is_not_retried(self):
+        wordpress = FakeWordPress(fail_status=400)
+        result = self.publisher(wordpress).publish_one(JOB)
+        self.assertEqual(result['outcome'], 'failed')
+        self.assertIn('Rejected by the fake', result['error'])
+        self.assertEqual(self.post_count(wordpress), 1)
+        self.assertEqual(self.sleeps, [])
+        entry = WordPressPublication.objects.get(record_id=JOB['record_id'])
+        self.assertEqual(entry.state, WordPressPublication.STATE_FAILED)
+
+    def test_server_error_is_retried_without_sleeping_after_the_last_attempt(self):
+        wordpress = FakeWordPress(fail_status=503)
+        with self.assertLogs('blog.wp_publisher', 'WARNING'):
+            result = self.publisher(wordpress, retries=3).publish_one(JOB)
+        self.assertEqual(result['outcome'], 'failed')
+        self.assertEqual(self.post_count(wordpress), 3)
+        self.assertEqual(self.sleeps, [1, 2])
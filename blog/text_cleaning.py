@@ -0,0 +1,132 @@
+# blog/text_cleaning.py
+"""
+Rule-driven cleaning of scraped competitor articles before they go into a prompt.
+
+The rules live in a data file (TEXT_CLEANING_RULES, blog/cleaning_rules.json by default) as
+named rule sets, and the "domains" map picks the sets for a page by its host ("*" is the
+fallback). Rules are compiled once. Rather than one re.sub per rule, the removal rules that
+apply to a text are merged into a single alternation, so an article is scanned once for
+removals, once for a truncation marker and once to collapse whitespace.
+
+A merged pass is not the same as running the rules one after another where one rule's match
+can run into another's: the alternation takes whichever match starts first, while the chain
+lets an earlier rule remove text before a later one looks. Rules marked "ordered" (the greedy
+byline and date rules, whose word runs swallow what follows them) therefore still run one by
+one, in file order, before the truncation marker is looked for and the rest are merged.
+
+A rule is {"name", "pattern"} plus optional "ignorecase", "ordered", "action" ("remove", the
+default, or "truncate": drop everything from the first match on) and "requires": lower-case literals
+of which at least one must occur in the text for the rule to run, which keeps rules for
+other sites out of the pass. Patterns that open with a repeated class (the address rules)
+start with a lookbehind so they are only tried where a run of that class begins; otherwise
+they re-scan the run from every character in it.
+"""
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+Rule = namedtuple('Rule', ['name', 'pattern', 'ignorecase', 'ordered', 'action', 'requires'])
+
+WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=None)
+def load_rules(path=None):
+    """Read the rules file. Returns (rule sets by name as tuples of Rule, domains map)."""
+    with open(path or settings.TEXT_CLEANING_RULES, encoding='utf-8') as f:
+        data = json.load(f)
+    rule_sets = {}
+    for set_name, rules in data['rule_sets'].items():
+        rule_sets[set_name] = tuple(
+            Rule(
+                name=rule['name'],
+                pattern=rule['pattern'],
+                ignorecase=rule.get('ignorecase', False),
+                ordered=rule.get('ordered', False),
+                action=rule.get('action', 'remove'),
+                requires=tuple(literal.lower() for literal in rule.get('requires', ())),
+            )
+            for rule in rules
+        )
+        for rule in rule_sets[set_name]:
+            try:
+                re.compile(rule.pattern)
+            except re.error as e:
+                # Fail when the file is loaded, not on the first page that reaches the bad rule
+                raise ValueError(f"Cleaning rule '{rule.name}' has an invalid pattern: {e}") from e
+    return rule_sets, data.get('domains', {})
+
+
+def rule_sets_for(source_url=None, path=None):
+    """
+    Names of the rule sets that apply to a page: the entry for its host, else for the nearest
+    parent domain, else "*".
+    """
+    _, domains = load_rules(path)
+    host = (urlsplit(source_url).hostname or '') if source_url else ''
+    parts = host.split('.')
+    for i in range(len(parts) - 1):
+        names = domains.get('.'.join(parts[i:]))
+        if names is not None:
+            return tuple(names)
+    return tuple(domains.get('*', ['default']))
+
+
+@lru_cache(maxsize=256)
+def _compile(rules):
+    """One pattern matching any of the rules, each keeping its own case sensitivity."""
+    if not rules:
+        return None
+    return re.compile('|'.join(f"(?{'i' if rule.ignorecase else ''}:{rule.pattern})" for rule in rules))
+
+
+@lru_cache(maxsize=None)
+def get_cleaner(set_names, path=None):
+    rule_sets, _ = load_rules(path)
+    return TextCleaner(tuple(rule for name in set_names for rule in rule_sets[name]))
+
+
+class TextCleaner:
+    def __init__(self, rules):
+        self.rules = rules
+
+    def active_rules(self, text):
+        lowered = text.lower()
+        return [rule for rule in self.rules if not rule.requires or any(literal in lowered for literal in rule.requires)]
+
+    def clean(self, text):
+        if not text:
+            return ""
+        active = self.active_rules(text)
+
+        for rule in active:
+            if rule.ordered and rule.action == 'remove':
+                text = _compile((rule,)).sub('', text)
+
+        # Truncating before the merged pass means it never scans the comment section it would drop anyway
+        truncate = _compile(tuple(rule for rule in active if rule.action == 'truncate'))
+        if truncate:
+            match = truncate.search(text)
+            if match:
+                text = text[:match.start()]
+
+        remove = _compile(tuple(rule for rule in active if rule.action == 'remove' and not rule.ordered))
+        if remove:
+            text = remove.sub('', text)
+        return WHITESPACE.sub(' ', text).strip()
+
+
+def clean_text(text, source_url=None):
+    """
+    Clean scraped article text with the rule sets for its source.
+    Args:
+        text (str): The raw extracted text.
+        source_url (str, optional): URL the text came from, to pick per-domain rule sets.
+    Returns:
+        str: The cleaned text.
+    """
+    return get_cleaner(rule_sets_for(source_url)).clean(text)
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import PostListView, PostDetailView, PostCreateView, PostUpdateView, PostDeleteView, UserPostListView
 from . import views
-from .blogcraft_views import BlogCraftView
+from .blogcraft_views import BlogCraftView, BlogCraftStreamView
 from .seo_views import SEOBlogGeneratorView  # Importing from seo_views.py
 
 urlpatterns = [
@@ -13,8 +13,12 @@ urlpatterns = [
     path('post/<int:pk>/delete/', PostDeleteView.as_view(), name='post-delete'),
     path('about/', views.about, name='blog-about'),
     path('generate/', views.GenerateBlogView.as_view(), name='blog-generate'),
+    path('generate/stream/', views.GenerateBlogStreamView.as_view(), name='blog-generate-stream'),
     path('auto-schedule/', views.auto_schedule, name='auto-schedule'),
     path('auto-schedule/delete/<int:pk>/', views.delete_scheduled_post, name='delete-scheduled-post'),
     path('blogcraft/', BlogCraftView.as_view(), name='blogcraft'),
+    path('blogcraft/stream/', BlogCraftStreamView.as_view(), name='blogcraft-stream'),
     path('seo-generator/', SEOBlogGeneratorView.as_view(), name='seo-generator'),  # Updated reference
+    path('jobs/<uuid:pk>/', views.job_status, name='job-status'),
+    path('metrics/cache/', views.cache_metrics, name='cache-metrics'),
 ]
\ No newline at end of file
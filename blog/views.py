@@ -1,11 +1,25 @@
 from django.shortcuts import render, get_object_or_404, redirect
-import requests 
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
 from .models import Post, ScheduledPost
 from django import forms 
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View
-import google.generativeai as genai
+from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from .models import GenerationJob, CacheCounter
+from . import llm, metrics, model_router, refine
+from .jobs import submit_job, take_finished_job, pending_job_id
+from .drafts import (
+    add_revision, clear_session_draft, get_session_draft, session_draft_history, start_session_draft,
+)
+from .streaming import stream_draft, sse_error
+from .generate_seo_content import seo_generation_stats
+from .sidebar import latest_posts, sidebar_version
+from .page_cache import AnonymousPageCacheMixin, cache_anonymous_page
+from .pagination import KeysetPaginationMixin
+from django.conf import settings
+from django.urls import reverse
 from decouple import config
 from pyairtable import Table
 from datetime import datetime
@@ -24,30 +38,35 @@ def home(request):
     }
     return render(request, 'blog/home.html', context)
 
-class PostListView(ListView):
+class PostListView(AnonymousPageCacheMixin, KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'blog/home.html'
     context_object_name = 'posts'
     ordering = ['-date_posted']
     paginate_by = 5
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['latest_posts'] = Post.objects.all().order_by('-date_posted')[:5]
-        return context
+    cache_dependencies = ('feed', 'sidebar')
+
+    def get_queryset(self):
+        # Joining author and profile so the avatar and username don't cost two queries per row
+        return super().get_queryset().select_related('author__profile')
 
-class UserPostListView(ListView):
+class UserPostListView(AnonymousPageCacheMixin, KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'blog/user_posts.html'
     context_object_name = 'posts'
     paginate_by = 5
+    cache_dependencies = ('feed', 'sidebar')
     
     def get_queryset(self):
         user = get_object_or_404(User, username=self.kwargs.get('username'))
-        return Post.objects.filter(author=user).order_by('-date_posted')
+        return Post.objects.filter(author=user).select_related('author__profile').order_by('-date_posted')
     
-class PostDetailView(DetailView):
+class PostDetailView(AnonymousPageCacheMixin, DetailView):
     model = Post
+    queryset = Post.objects.select_related('author__profile')
+
+    def get_cache_dependencies(self):
+        return [f"post:{self.kwargs['pk']}", 'sidebar']
     
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
@@ -81,15 +100,75 @@ class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
             return True
         return False  
 
+@cache_anonymous_page('sidebar')
 def about(request):
     return render(request, 'blog/about.html', {'title': 'About'})
 
-genai.configure(api_key=config('GEMINI_API_KEY'))
 class GenerateBlogView(LoginRequiredMixin, View):
     template_name = 'blog/generate.html'
+    job_session_key = 'generate_job'
+    draft_session_key = 'generate_draft'
+
+    @staticmethod
+    def generate_prompt(prompt_1, primary_keyword, additional_keywords):
+        return (
+            f"{prompt_1} Ensure the article is 500 words and uses the primary keyword '{primary_keyword}' "
+            f"5-10 times (1-2% density) for SEO. Include additional keywords '{additional_keywords}' naturally."
+        )
+
+    @staticmethod
+    def refine_instructions(step):
+        if step == 4:
+            return "Maintain the same keyword density and word length untill explicitly mentioned by the user."
+        return "Maintain keyword density and length."
+
+    @classmethod
+    def refine_prompt(cls, prev_draft, feedback, step):
+        return f"Refine this 500-word article: '{prev_draft}' based on feedback: '{feedback}'. {cls.refine_instructions(step)}"
+
+    @classmethod
+    def refine_step(cls, prev_draft, feedback, step):
+        # Whole-draft rewrite or, when the feedback targets some sections, just those (REFINE_MODE)
+        return refine.plan_step(prev_draft, feedback, cls.refine_prompt(prev_draft, feedback, step), cls.refine_instructions(step))
+
+    @classmethod
+    def refine_payload(cls, prev_draft, feedback, step):
+        return {
+            'prompt': cls.refine_prompt(prev_draft, feedback, step), 'instructions': cls.refine_instructions(step),
+            'draft': prev_draft, 'feedback': feedback, 'user_prompt': feedback,
+        }
+
+    def apply_finished_job(self, request):
+        # Recording the result of a finished background job as a new revision of the session draft
+        job = take_finished_job(request, self.job_session_key)
+        if job is None:
+            return
+        draft = get_session_draft(request, self.draft_session_key)
+        if job.action == 'check_grammar':
+            if job.status == GenerationJob.STATUS_DONE:
+                content = job.result['content']
+                if job.result['fixes']:
+                    grammar_result = f"Applied {job.result['fixes']} grammar fixes."
+                else:
+                    grammar_result = "No grammar issues found."
+            else:
+                content = job.payload['text']
+                grammar_result = f"Grammar check failed: {job.error}"
+            if draft is not None:
+                add_revision(draft, 'AI Grammar Zap', content)
+            request.session['grammar_checked'] = True
+            request.session['grammar_result'] = grammar_result
+        elif job.status == GenerationJob.STATUS_DONE:
+            if job.action == 'generate' or draft is None:
+                draft = start_session_draft(request, self.draft_session_key, 'generate')
+            add_revision(draft, job.payload['user_prompt'], job.result['content'])
+        else:
+            request.session['generate_error'] = f"Error generating content: {job.error}"
+        request.session.modified = True
 
     def get(self, request):
-        drafts = request.session.get('drafts', [])
+        self.apply_finished_job(request)
+        drafts = session_draft_history(request, self.draft_session_key)
         topic = request.GET.get('topic', request.session.get('topic', ''))
         primary_keyword = request.GET.get('primary_keyword', request.session.get('primary_keyword', ''))
         additional_keywords = request.GET.get('additional_keywords', request.session.get('additional_keywords', ''))
@@ -102,7 +181,13 @@ class GenerateBlogView(LoginRequiredMixin, View):
             'prompt_3': request.session.get('prompt_3', ''),
             'prompt_4': request.session.get('prompt_4', ''),
             'drafts': drafts,
+            'grammar_checked': request.session.get('grammar_checked', False),
+            'grammar_result': request.session.get('grammar_result', ''),
+            'pending_job': pending_job_id(request, self.job_session_key),
+            'stream_url': reverse('blog-generate-stream') if settings.GENERATION_STREAMING else '',
+            'error': request.session.pop('generate_error', ''),
         })
+
     def post(self, request):
         topic = request.POST.get('topic')
         primary_keyword = request.POST.get('primary_keyword')
@@ -112,25 +197,34 @@ class GenerateBlogView(LoginRequiredMixin, View):
         prompt_3 = request.POST.get('prompt_3')
         prompt_4 = request.POST.get('prompt_4')
         action = request.POST.get('action')
-        drafts = request.session.get('drafts', [])
+        drafts = session_draft_history(request, self.draft_session_key)
         print(f"Action: {action}, Drafts before: {drafts}")
 
+        if action in ('generate', 'refine_2', 'refine_3', 'refine_4', 'check_grammar') and pending_job_id(request, self.job_session_key):
+            return render(request, self.template_name, {
+                'topic': topic,
+                'primary_keyword': primary_keyword,
+                'additional_keywords': additional_keywords,
+                'prompt_1': prompt_1,
+                'prompt_2': prompt_2,
+                'prompt_3': prompt_3,
+                'prompt_4': prompt_4,
+                'drafts': drafts,
+                'pending_job': pending_job_id(request, self.job_session_key),
+                'error': 'Still working on the previous step. Please wait for it to finish.'
+            })
+
         if action == 'generate':
             drafts = []
-            prompt = (
-                f"{prompt_1} Ensure the article is 500 words and uses the primary keyword '{primary_keyword}' "
-                f"5-10 times (1-2% density) for SEO. Include additional keywords '{additional_keywords}' naturally."
-            )
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            draft_1 = response.text
-            drafts.append({'prompt': prompt_1, 'content': draft_1})
-            request.session['drafts'] = drafts
+            prompt = self.generate_prompt(prompt_1, primary_keyword, additional_keywords)
             request.session['topic'] = topic
             request.session['primary_keyword'] = primary_keyword
             request.session['additional_keywords'] = additional_keywords 
             request.session['prompt_1'] = prompt_1
-            request.session.modified = True
+            submit_job(request, self.job_session_key, 'llm', action, {
+                'prompt': prompt, 'user_prompt': prompt_1, 'fresh': request.POST.get('fresh') == '1', 'task': 'draft',
+            })
+            return redirect('blog-generate')
 
         elif action == 'refine_2':
             if not drafts:
@@ -153,14 +247,9 @@ class GenerateBlogView(LoginRequiredMixin, View):
                     'error': 'Please provide feedback in Prompt 2.'
                 })
             prev_draft = drafts[-1]['content']
-            prompt = f"Refine this 500-word article: '{prev_draft}' based on feedback: '{prompt_2}'. Maintain keyword density and length."
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            draft_2 = response.text
-            drafts.append({'prompt': prompt_2, 'content': draft_2})
-            request.session['drafts'] = drafts
             request.session['prompt_2'] = prompt_2
-            request.session.modified = True
+            submit_job(request, self.job_session_key, 'refine', action, self.refine_payload(prev_draft, prompt_2, 2))
+            return redirect('blog-generate')
 
         elif action == 'refine_3':
             if not drafts or len(drafts) < 2:
@@ -186,14 +275,9 @@ class GenerateBlogView(LoginRequiredMixin, View):
                     'error': 'Please provide feedback in Prompt 3.'
                 })
             prev_draft = drafts[-1]['content']
-            prompt = f"Refine this 500-word article: '{prev_draft}' based on feedback: '{prompt_3}'. Maintain keyword density and length."
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            draft_3 = response.text
-            drafts.append({'prompt': prompt_3, 'content': draft_3})
-            request.session['drafts'] = drafts
             request.session['prompt_3'] = prompt_3
-            request.session.modified = True
+            submit_job(request, self.job_session_key, 'refine', action, self.refine_payload(prev_draft, prompt_3, 3))
+            return redirect('blog-generate')
 
         elif action == 'refine_4':
             if not drafts or len(drafts) < 3:
@@ -219,14 +303,9 @@ class GenerateBlogView(LoginRequiredMixin, View):
                     'error': 'Please provide feedback in Prompt 4.'
                 }) 
             prev_draft = drafts[-1]['content']
-            prompt = f"Refine this 500-word article: '{prev_draft}' based on feedback: '{prompt_4}'. Maintain the same keyword density and word length untill explicitly mentioned by the user."
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            draft_4 = response.text
-            drafts.append({'prompt': prompt_4, 'content': draft_4})
-            request.session['drafts'] = drafts
             request.session['prompt_4'] = prompt_4
-            request.session.modified = True
+            submit_job(request, self.job_session_key, 'refine', action, self.refine_payload(prev_draft, prompt_4, 4))
+            return redirect('blog-generate')
               
         elif action == 'check_grammar':
             if not drafts or len(drafts) < 4:
@@ -257,36 +336,8 @@ class GenerateBlogView(LoginRequiredMixin, View):
                     'error': 'Grammar already checked for this draft.'
                 })
             final_draft = drafts[-1]['content']
-            url = "https://api.languagetool.org/v2/check"
-            data = {
-                'text': final_draft,
-                'language': 'en-US'
-            }
-            try:
-                response = requests.post(url, data=data)
-                result = response.json()
-                matches = result.get('matches', [])
-                if matches:
-                    fixed_text = final_draft
-                    offset_shift = 0
-                    for match in matches:
-                        start = match['offset'] + offset_shift
-                        length = match['length']
-                        replacement = match['replacements'][0]['value'] if match['replacements'] else fixed_text[start:start+length]
-                        fixed_text = fixed_text[:start] + replacement + fixed_text[start+length:]
-                        offset_shift += len(replacement) - length
-                    drafts.append({'prompt': 'AI Grammar Zap', 'content': fixed_text})
-                    grammar_result = f"Applied {len(matches)} grammar fixes."
-                else:
-                    drafts.append({'prompt': 'AI Grammar Zap', 'content': final_draft})
-                    grammar_result = "No grammar issues found."
-            except Exception as e:
-                grammar_result = f"Grammar check failed: {str(e)}"
-                drafts.append({'prompt': 'AI Grammar Zap', 'content': final_draft})
-            request.session['drafts'] = drafts 
-            request.session['grammar_checked'] = True
-            request.session['grammar_result'] = grammar_result
-            request.session.modified = True
+            submit_job(request, self.job_session_key, 'grammar', action, {'text': final_draft})
+            return redirect('blog-generate')
 
         elif action == 'publish':
             if not drafts or len(drafts) < 4:
@@ -323,7 +374,7 @@ class GenerateBlogView(LoginRequiredMixin, View):
                 primary_keyword=primary_keyword,
                 additional_keywords=additional_keywords
             ).delete()
-            request.session['drafts'] = []
+            clear_session_draft(request, self.draft_session_key)
             request.session['topic'] = ''
             request.session['primary_keyword'] = ''
             request.session['additional_keywords'] = ''
@@ -376,7 +427,7 @@ class GenerateBlogView(LoginRequiredMixin, View):
                 # Saving the record to Airtable
                 airtable.create(record)
                 # Clearing session data
-                request.session['drafts'] = []
+                clear_session_draft(request, self.draft_session_key)
                 request.session['topic'] = ''
                 request.session['primary_keyword'] = ''
                 request.session['additional_keywords'] = ''
@@ -468,7 +519,7 @@ class GenerateBlogView(LoginRequiredMixin, View):
                 # Saving the record to Airtable
                 airtable.create(record)
                 # Clearing session data
-                request.session['drafts'] = []
+                clear_session_draft(request, self.draft_session_key)
                 request.session['topic'] = ''
                 request.session['primary_keyword'] = ''
                 request.session['additional_keywords'] = ''
@@ -507,13 +558,102 @@ class GenerateBlogView(LoginRequiredMixin, View):
             'grammar_result': request.session.get('grammar_result', ''),
         })
 
+class GenerateBlogStreamView(LoginRequiredMixin, View):
+    """Streaming variant of the generate/refine actions of GenerateBlogView (server-sent events)."""
+
+    def post(self, request):
+        action = request.POST.get('action')
+        topic = request.POST.get('topic')
+        primary_keyword = request.POST.get('primary_keyword')
+        additional_keywords = request.POST.get('additional_keywords')
+        drafts = session_draft_history(request, GenerateBlogView.draft_session_key)
+
+        if pending_job_id(request, GenerateBlogView.job_session_key):
+            return sse_error('Still working on the previous step. Please wait for it to finish.', status=409)
+
+        if action == 'generate':
+            prompt_1 = request.POST.get('prompt_1')
+            if not prompt_1:
+                return sse_error('Please provide Prompt 1.')
+            prompt = GenerateBlogView.generate_prompt(prompt_1, primary_keyword, additional_keywords)
+            task = 'draft'
+
+            def commit(content):
+                draft = start_session_draft(request, GenerateBlogView.draft_session_key, 'generate')
+                add_revision(draft, prompt_1, content)
+                request.session['topic'] = topic
+                request.session['primary_keyword'] = primary_keyword
+                request.session['additional_keywords'] = additional_keywords
+                request.session['prompt_1'] = prompt_1
+
+        elif action in ('refine_2', 'refine_3', 'refine_4'):
+            step = int(action[-1])
+            feedback = request.POST.get(f'prompt_{step}')
+            if not drafts:
+                return sse_error('No draft to refine. Please generate a draft first.')
+            if len(drafts) < step - 1:
+                return sse_error(f'Complete Prompt {step - 1} first.')
+            if not feedback:
+                return sse_error(f'Please provide feedback in Prompt {step}.')
+            refine_step = GenerateBlogView.refine_step(drafts[-1]['content'], feedback, step)
+            prompt = refine_step.prompt
+            task = refine_step.task
+            finish = refine.timed_apply(refine_step)
+
+            def commit(content):
+                content = finish(content)
+                draft = get_session_draft(request, GenerateBlogView.draft_session_key)
+                add_revision(draft, feedback, content)
+                request.session[f'prompt_{step}'] = feedback
+
+        else:
+            return sse_error('This action cannot be streamed.')
+
+        return stream_draft(request, prompt, commit, fresh=action == 'generate' and request.POST.get('fresh') == '1',
+                            task=task)
+
+@login_required
+def job_status(request, pk):
+    job = get_object_or_404(GenerationJob, pk=pk, user=request.user)
+    return JsonResponse({
+        'id': str(job.id),
+        'action': job.action,
+        'status': job.status,
+        'error': job.error,
+    })
+
+@staff_member_required(login_url='login')
+def cache_metrics(request):
+    counters = metrics.get_counters(['view_cache.hits', 'view_cache.misses'])
+    report = {
+        'view_cache': {
+            'hits': counters['view_cache.hits'],
+            'misses': counters['view_cache.misses'],
+            'hit_ratio': metrics.hit_ratio(counters['view_cache.hits'], counters['view_cache.misses']),
+        },
+    }
+    report['llm'] = llm.llm_stats()
+    report['refine'] = refine.refine_stats()
+    report['seo_generation'] = seo_generation_stats()
+    report['routes'] = model_router.route_stats()
+    for counter in CacheCounter.objects.all():
+        report[counter.name] = {
+            'hits': counter.hits,
+            'misses': counter.misses,
+            'revalidations': counter.revalidations,
+            'hit_ratio': counter.hit_ratio,
+        }
+    return JsonResponse(report)
+
 def sidebar_context(request):
+    # Passing functions, not results: the template only calls them on pages that render the sidebar,
+    # and latest_posts only when the sidebar fragment is not cached
     return {
-        'latest_posts': Post.objects.all().order_by('-date_posted')[:5]
+        'latest_posts': latest_posts,
+        'sidebar_version': sidebar_version,
+        'sidebar_cache_ttl': settings.SIDEBAR_CACHE_TTL,
     }
 
-from django.contrib.admin.views.decorators import staff_member_required
-
 class ScheduledPostForm(forms.ModelForm):
     class Meta:
         model = ScheduledPost
@@ -0,0 +1,193 @@
+# blog/wp_publisher.py
+import base64
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from decouple import config
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.text import slugify
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from blog.models import WordPressPublication
+
+logger = logging.getLogger(__name__)
+
+WP_PUBLISH_WORKERS = config('WP_PUBLISH_WORKERS', default=4, cast=int)
+WP_PUBLISH_TIMEOUT = config('WP_PUBLISH_TIMEOUT', default=60, cast=float)
+WP_PUBLISH_RETRIES = config('WP_PUBLISH_RETRIES', default=3, cast=int)  # POST attempts per record, each after a slug lookup
+WP_INFLIGHT_STALE = config('WP_INFLIGHT_STALE', default=15 * 60, cast=int)  # Seconds before an in-flight claim is considered abandoned
+WP_LOOKUP_STATUSES = 'publish,draft,future,pending,private'
+
+
+def record_slug(record_id, title):
+    """Deterministic WordPress slug for an Airtable record: the title plus a short record-ID suffix."""
+    return f"{slugify(title)[:80].strip('-') or 'post'}-{record_id[-6:].lower()}"
+
+
+class WordPressPublisher:
+    """
+    Posts Airtable records to WordPress on a bounded thread pool, at most once per record.
+
+    Every record is claimed in the WordPressPublication ledger before its POST. Before any retry,
+    and before re-trying a record whose earlier attempt never reported back, the deterministic slug
+    is looked up in WordPress, so a POST that landed but timed out is adopted instead of duplicated.
+    """
+
+    def __init__(self, api_url=None, username=None, password=None, max_workers=None, timeout=None, retries=None):
+        api_url = (api_url or config('WORDPRESS_API_URL')).rstrip('/')
+        self.posts_url = api_url + "/posts"
+        username = username or config('WORDPRESS_USERNAME')
+        password = password or config('WORDPRESS_APP_PASSWORD')
+        credentials = base64.b64encode(f"{username}:{password}".encode()).decode('utf-8')
+        self.headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'Authorization': f"Basic {credentials}",
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
+            'Referer': api_url.rstrip('/wp-json/wp/v2')
+        }
+        self.max_workers = max_workers or WP_PUBLISH_WORKERS
+        self.timeout = timeout or WP_PUBLISH_TIMEOUT
+        self.retries = retries or WP_PUBLISH_RETRIES
+
+        self.session = requests.Session()
+        # Transport retries only for the idempotent slug lookups; POSTs are retried by publish_one(),
+        # which checks WordPress first so a retried POST cannot create a second post
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'])
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def find_post(self, slug):
+        """Return the id of an existing WordPress post with this slug (any status), or None."""
+        response = self.session.get(
+            self.posts_url,
+            headers=self.headers,
+            params={'slug': slug, 'status': WP_LOOKUP_STATUSES, 'context': 'edit', '_fields': 'id,slug'},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        posts = response.json()
+        return posts[0]['id'] if posts else None
+
+    def claim(self, record_id, slug):
+        """
+        Mark the record in flight in the ledger.
+        Returns:
+            WordPressPublication or None: The claimed entry, or None if it is published or another worker holds it.
+        """
+        entry, _ = WordPressPublication.objects.get_or_create(record_id=record_id, defaults={'slug': slug})
+        now = timezone.now()
+        claimable = Q(state__in=[WordPressPublication.STATE_NEW, WordPressPublication.STATE_FAILED]) | Q(
+            state=WordPressPublication.STATE_IN_FLIGHT, claimed_at__lt=now - timedelta(seconds=WP_INFLIGHT_STALE)
+        )
+        claimed = WordPressPublication.objects.filter(claimable, pk=entry.pk).update(
+            state=WordPressPublication.STATE_IN_FLIGHT, claimed_at=now, attempts=F('attempts') + 1, slug=slug
+        )
+        if not claimed:
+            return None
+        entry.refresh_from_db()
+        return entry
+
+    def _finish(self, entry, state, wp_post_id='', error=''):
+        WordPressPublication.objects.filter(pk=entry.pk).update(
+            state=state, wp_post_id=str(wp_post_id or ''), error=error, updated_at=timezone.now()
+        )
+
+    def publish_one(self, job):
+        """
+        Publish one record.
+        Args:
+            job (dict): 'record_id', 'title', 'content', 'status' (WP status) and 'meta'.
+        Returns:
+            dict: 'record_id', 'wp_post_id', 'outcome' ('created', 'adopted', 'already_published',
+                  'in_flight' or 'failed'), 'error' and 'elapsed'.
+        """
+        started = time.monotonic()
+        record_id = job['record_id']
+        slug = record_slug(record_id, job['title'])
+        result = {'record_id': record_id, 'wp_post_id': None, 'outcome': 'failed', 'error': '', 'elapsed': 0.0}
+        try:
+            entry = self.claim(record_id, slug)
+            if entry is None:
+                existing = WordPressPublication.objects.get(record_id=record_id)
+                if existing.state == WordPressPublication.STATE_PUBLISHED:
+                    result.update(outcome='already_published', wp_post_id=existing.wp_post_id)
+                else:
+                    result.update(outcome='in_flight', error="Another worker is publishing this record")
+                return result
+
+            payload = {
+                'title': job['title'],
+                'content': job['content'],
+                'status': job['status'],
+                'slug': slug,
+                'meta': job.get('meta', {}),
+            }
+            # An earlier attempt that never reported back may have created the post already
+            check_first = entry.attempts > 1
+            error = ''
+            for attempt in range(self.retries):
+                try:
+                    if check_first or attempt:
+                        existing_id = self.find_post(slug)
+                        if existing_id:
+                            self._finish(entry, WordPressPublication.STATE_PUBLISHED, existing_id)
+                            result.update(outcome='adopted', wp_post_id=existing_id)
+                            return result
+                    response = self.session.post(self.posts_url, headers=self.headers, json=payload, timeout=self.timeout)
+                    response.raise_for_status()
+                    wp_post_id = response.json().get('id')
+                    self._finish(entry, WordPressPublication.STATE_PUBLISHED, wp_post_id)
+                    result.update(outcome='created', wp_post_id=wp_post_id)
+                    return result
+                except requests.exceptions.RequestException as e:
+                    error = str(e)
+                    if e.response is not None and 400 <= e.response.status_code < 500 and e.response.status_code != 429:
+                        error = f"{error}: {e.response.text}"
+                        break  # The request itself is wrong; retrying will not help
+                    logger.warning(f"WordPress attempt {attempt + 1} for record {record_id} failed: {error}")
+                    if attempt + 1 < self.retries:
+                        time.sleep(min(2 ** attempt, 10))
+            self._finish(entry, WordPressPublication.STATE_FAILED, error=error)
+            result['error'] = error
+            return result
+        finally:
+            result['elapsed'] = time.monotonic() - started
+
+    def _publish_in_thread(self, job):
+        try:
+            return self.publish_one(job)
+        except Exception as e:
+            logger.exception(f"Publishing record {job['record_id']} crashed")
+            return {'record_id': job['record_id'], 'wp_post_id': None, 'outcome': 'failed', 'error': str(e), 'elapsed': 0.0}
+        finally:
+            connection.close()  # Worker threads get their own DB connection; don't leak it
+
+    def publish_many(self, jobs):
+        """
+        Publish several records concurrently, at most max_workers at a time.
+        Returns:
+            tuple: (results in job order, report dict with 'published', 'failed', 'skipped', 'elapsed', 'posts_per_minute').
+        """
+        started = time.monotonic()
+        if not jobs:
+            return [], {'published': 0, 'failed': 0, 'skipped': 0, 'elapsed': 0.0, 'posts_per_minute': 0.0}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)), thread_name_prefix='wp-publisher') as executor:
+            results = list(executor.map(self._publish_in_thread, jobs))
+        elapsed = time.monotonic() - started
+        published = sum(1 for r in results if r['outcome'] in ('created', 'adopted'))
+        report = {
+            'published': published,
+            'failed': sum(1 for r in results if r['outcome'] == 'failed'),
+            'skipped': sum(1 for r in results if r['outcome'] in ('already_published', 'in_flight')),
+            'elapsed': elapsed,
+            'posts_per_minute': published / elapsed * 60 if elapsed else 0.0,
+        }
+        return results, report
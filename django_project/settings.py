@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config  # Import python-decouple to load .env variables
+from decouple import Csv, config  # Import python-decouple to load .env variables
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -159,4 +159,160 @@ SCHEDULER_CONFIG = {
     "apscheduler.job_defaults.max_instances": "3",
     "apscheduler.timezone": "Asia/Kolkata",
 }
-SCHEDULER_AUTOSTART = config('SCHEDULER_AUTOSTART', default='True') == 'True'
\ No newline at end of file
+SCHEDULER_AUTOSTART = config('SCHEDULER_AUTOSTART', default='True') == 'True'
+# SEO research cache (Google Custom Search results and scraped competitor pages)
+SERP_CACHE_TTL = config('SERP_CACHE_TTL', default=60 * 60 * 24, cast=int)  # seconds
+SERP_CACHE_MAX_ENTRIES = config('SERP_CACHE_MAX_ENTRIES', default=500, cast=int)
+PAGE_CACHE_TTL = config('PAGE_CACHE_TTL', default=60 * 60 * 6, cast=int)  # seconds, re-validated with ETag/Last-Modified after this
+PAGE_CACHE_MAX_ENTRIES = config('PAGE_CACHE_MAX_ENTRIES', default=2000, cast=int)
+# Rule sets for cleaning scraped articles, and which domains they apply to
+TEXT_CLEANING_RULES = config('TEXT_CLEANING_RULES', default=str(BASE_DIR / 'blog' / 'cleaning_rules.json'))
+# Main-content extractor for scraped pages (blog/extraction.py): auto, lxml, stream or soup
+EXTRACTION_BACKEND = config('EXTRACTION_BACKEND', default='auto')
+
+# SEO article generation (blog/generate_seo_content.py, blog/outline_generation.py)
+# How generate_blog_content asks for title, meta description and body: 'combined', 'concurrent', 'sequential'
+# or 'outline' (sections written in parallel from an outline)
+SEO_GENERATION_MODE = config('SEO_GENERATION_MODE', default='combined')
+# Token budget for the competitor texts in the SEO prompts (see blog/context_packing.py); 0 sends them whole
+SEO_CONTEXT_TOKENS = config('SEO_CONTEXT_TOKENS', default=4000, cast=int)
+# Body length the outline mode plans for when the caller gives none (the other modes keep "800-1200 words")
+SEO_TARGET_WORDS = config('SEO_TARGET_WORDS', default=1000, cast=int)
+SEO_SECTION_WORKERS = config('SEO_SECTION_WORKERS', default=4, cast=int)  # Outline mode: sections written at once
+SEO_SECTION_CONTEXT_TOKENS = config('SEO_SECTION_CONTEXT_TOKENS', default=1500, cast=int)  # Competitor text per section
+
+# Celery and background generation jobs
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_TASK_SERIALIZER = 'json'
+# Chords (process_scheduled_posts fans out one task per post and collects them) need a result backend
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=CELERY_BROKER_URL)
+# Scheduled posts generated at once by one process_scheduled_posts run; the rest wait for the next chord
+SCHEDULED_POST_CONCURRENCY = config('SCHEDULED_POST_CONCURRENCY', default=4, cast=int)
+# A claimed row whose run died is picked up again after this many seconds
+SCHEDULED_POST_CLAIM_TTL = config('SCHEDULED_POST_CLAIM_TTL', default=30 * 60, cast=int)
+# Gemini client (blog/llm.py). 'fake' answers offline with canned text after LLM_FAKE_LATENCY seconds
+LLM_BACKEND = config('LLM_BACKEND', default='gemini')
+LLM_MODEL = config('LLM_MODEL', default='gemini-1.5-flash')
+LLM_RPM = config('LLM_RPM', default=60, cast=float)  # Requests per minute per process, keep under the API quota
+LLM_TPM = config('LLM_TPM', default=1000000, cast=float)  # Prompt + output tokens per minute per process
+LLM_MAX_CONCURRENCY = config('LLM_MAX_CONCURRENCY', default=4, cast=int)  # Calls in flight at once per process
+LLM_TIMEOUT = config('LLM_TIMEOUT', default=60, cast=float)  # Seconds per attempt
+LLM_RETRIES = config('LLM_RETRIES', default=2, cast=int)  # Extra attempts on 429/5xx/timeouts, within the deadline
+LLM_BREAKER_THRESHOLD = config('LLM_BREAKER_THRESHOLD', default=5, cast=int)  # Consecutive failures before failing fast
+LLM_BREAKER_RESET = config('LLM_BREAKER_RESET', default=30, cast=float)  # Seconds before a trial call is let through
+LLM_JOB_DEADLINE = config('LLM_JOB_DEADLINE', default=180, cast=float)  # Whole GenerationJob, however many calls it makes
+LLM_FAKE_LATENCY = config('LLM_FAKE_LATENCY', default=0.5, cast=float)
+
+# Model tiering (blog/model_router.py). Each task type lists the models it may use, best first;
+# a call goes to the first one meeting the route's p90 latency (seconds) and per-call cost (USD)
+# SLOs over its recent calls. The short, latency-sensitive and bulk routes try LLM_CHEAP_MODEL first
+# and fall back to LLM_MODEL; the others use LLM_MODEL alone unless set, e.g.
+# LLM_ROUTE_DRAFT=gemini-1.5-pro,gemini-1.5-flash
+LLM_ROUTING = config('LLM_ROUTING', default='True') == 'True'  # Off: every call goes to LLM_MODEL
+LLM_ROUTE_WINDOW = config('LLM_ROUTE_WINDOW', default=600, cast=float)  # Seconds of calls the SLO check looks at
+LLM_ROUTE_MIN_SAMPLES = config('LLM_ROUTE_MIN_SAMPLES', default=10, cast=int)  # Fewer recent calls count as meeting the SLO
+LLM_ROUTE_PROBE_EVERY = config('LLM_ROUTE_PROBE_EVERY', default=20, cast=int)  # A model missing its SLO gets 1 call in N
+LLM_CHEAP_MODEL = config('LLM_CHEAP_MODEL', default='gemini-1.5-flash-8b')
+LLM_MODEL_PRICES = {  # USD per million tokens: (prompt, output)
+    'gemini-1.5-flash-8b': (0.0375, 0.15),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-1.5-pro': (1.25, 5.00),
+}
+LLM_ROUTES = {
+    # First drafts (GenerateBlogView, BlogCraft)
+    'draft': {'models': config('LLM_ROUTE_DRAFT', default=LLM_MODEL, cast=Csv()),
+              'latency_slo': 60, 'cost_slo': 0.05, 'output_tokens': 1500},
+    # Refine steps that rewrite a few sections
+    'edit': {'models': config('LLM_ROUTE_EDIT', default=f'{LLM_CHEAP_MODEL},{LLM_MODEL}', cast=Csv()),
+             'latency_slo': 20, 'cost_slo': 0.01, 'output_tokens': 500},
+    # Whole-article refines and the SEO humanize pass
+    'rewrite': {'models': config('LLM_ROUTE_REWRITE', default=LLM_MODEL, cast=Csv()),
+                'latency_slo': 60, 'cost_slo': 0.05, 'output_tokens': 1500},
+    # SEO post bodies and sections
+    'seo_post': {'models': config('LLM_ROUTE_SEO_POST', default=LLM_MODEL, cast=Csv()),
+                 'latency_slo': 90, 'cost_slo': 0.05, 'output_tokens': 2000},
+    # Meta descriptions and SEO outlines: short answers
+    'seo_meta': {'models': config('LLM_ROUTE_SEO_META', default=f'{LLM_CHEAP_MODEL},{LLM_MODEL}', cast=Csv()),
+                 'latency_slo': 10, 'cost_slo': 0.005, 'output_tokens': 300},
+    # Scheduled bulk generation: nobody is waiting, cost matters most
+    'bulk': {'models': config('LLM_ROUTE_BULK', default=f'{LLM_CHEAP_MODEL},{LLM_MODEL}', cast=Csv()),
+             'latency_slo': 120, 'cost_slo': 0.002, 'output_tokens': 1000},
+}
+
+# Hedged requests: at call sites with 'hedge' on, a call still running after the site's recent
+# LLM_HEDGE_PERCENTILE latency gets a second identical request and the first answer wins
+LLM_HEDGE_PERCENTILE = config('LLM_HEDGE_PERCENTILE', default=0.9, cast=float)
+LLM_HEDGE_MIN_DELAY = config('LLM_HEDGE_MIN_DELAY', default=1.0, cast=float)  # Seconds, whatever the percentile says
+LLM_HEDGE_MIN_SAMPLES = config('LLM_HEDGE_MIN_SAMPLES', default=20, cast=int)  # Latencies seen before a site is hedged
+LLM_HEDGE_BUDGET = config('LLM_HEDGE_BUDGET', default=0.1, cast=float)  # Hedged requests as a share of all calls, at most
+# Per call site: hard deadline in seconds for the job or stream, and whether its calls are hedged
+LLM_CALL_SITES = {
+    'default': {'deadline': LLM_JOB_DEADLINE, 'hedge': False},
+    'blogcraft.generate': {'deadline': config('BLOGCRAFT_GENERATE_DEADLINE', default=120, cast=float),
+                           'hedge': config('BLOGCRAFT_GENERATE_HEDGE', default='True') == 'True'},
+    'blogcraft.refine': {'deadline': config('BLOGCRAFT_REFINE_DEADLINE', default=90, cast=float),
+                         'hedge': config('BLOGCRAFT_REFINE_HEDGE', default='True') == 'True'},
+    'seo.generate': {'deadline': config('SEO_GENERATE_DEADLINE', default=240, cast=float),
+                     'hedge': config('SEO_GENERATE_HEDGE', default='True') == 'True'},
+    'seo.refine': {'deadline': config('SEO_REFINE_DEADLINE', default=120, cast=float),
+                   'hedge': config('SEO_REFINE_HEDGE', default='True') == 'True'},
+    'seo.humanize': {'deadline': config('SEO_HUMANIZE_DEADLINE', default=120, cast=float),
+                     'hedge': config('SEO_HUMANIZE_HEDGE', default='True') == 'True'},
+}
+# Response cache for identical prompts (LLMCacheEntry rows); "regenerate fresh" actions skip it
+LLM_CACHE_ENABLED = config('LLM_CACHE_ENABLED', default='True') == 'True'
+LLM_CACHE_TTL = config('LLM_CACHE_TTL', default=60 * 60 * 24 * 7, cast=int)  # seconds
+LLM_CACHE_MAX_ENTRIES = config('LLM_CACHE_MAX_ENTRIES', default=2000, cast=int)
+# Grammar checks: 'languagetool' (the public API or a self-hosted server at LANGUAGETOOL_URL) or 'local' rules
+GRAMMAR_BACKEND = config('GRAMMAR_BACKEND', default='languagetool')
+LANGUAGETOOL_URL = config('LANGUAGETOOL_URL', default='https://api.languagetool.org')
+GRAMMAR_LANGUAGE = config('GRAMMAR_LANGUAGE', default='en-US')
+GRAMMAR_TIMEOUT = config('GRAMMAR_TIMEOUT', default=20, cast=float)  # seconds per request
+GRAMMAR_CACHE_TTL = config('GRAMMAR_CACHE_TTL', default=60 * 60 * 24, cast=int)  # seconds
+GRAMMAR_RPM = config('GRAMMAR_RPM', default=20, cast=float)  # LanguageTool requests per minute; 0 for a self-hosted server
+GRAMMAR_MAX_WORKERS = config('GRAMMAR_MAX_WORKERS', default=4, cast=int)  # Chunks checked at once
+GRAMMAR_CHUNK_CHARS = config('GRAMMAR_CHUNK_CHARS', default=6000, cast=int)  # Well under the public API's 20KB request limit
+GRAMMAR_MIN_CHUNK_CHARS = config('GRAMMAR_MIN_CHUNK_CHARS', default=300, cast=int)  # Shorter paragraphs join the next
+# Refine steps: 'incremental' sends only the sections the feedback targets plus an outline, 'full' the whole draft
+REFINE_MODE = config('REFINE_MODE', default='incremental')
+REFINE_MAX_SHARE = config('REFINE_MAX_SHARE', default=0.6, cast=float)  # Targets covering more of the draft get a full rewrite
+# When False the job runs inside the request (no worker needed, e.g. local development)
+GENERATION_ASYNC = config('GENERATION_ASYNC', default='True') == 'True'
+# A job still queued or running this many seconds past its call site's deadline is given up on
+# (the worker died or the message was lost) and marked failed, so the view stops waiting for it
+GENERATION_JOB_GRACE = config('GENERATION_JOB_GRACE', default=300, cast=int)
+# Stream generate/refine drafts to the browser token by token instead of queueing a job
+GENERATION_STREAMING = config('GENERATION_STREAMING', default='True') == 'True'
+
+# Generator drafts (stored as Draft/DraftRevision rows; the session only keeps the draft id)
+DRAFT_STORE_DELTAS = config('DRAFT_STORE_DELTAS', default='True') == 'True'  # Store refinements as word diffs when smaller
+DRAFT_SNAPSHOT_INTERVAL = config('DRAFT_SNAPSHOT_INTERVAL', default=10, cast=int)  # Keep the full text every N revisions
+
+# Sidebar "Latest Posts" cache; also cleared whenever a Post is saved or deleted
+SIDEBAR_CACHE_TTL = config('SIDEBAR_CACHE_TTL', default=300, cast=int)  # seconds
+
+# Post feed pagination: 'keyset' pages with (date_posted, id) cursors, 'offset' uses ?page=N
+POST_FEED_PAGINATION = config('POST_FEED_PAGINATION', default='keyset')
+# Total shown with keyset pages: 'exact' (COUNT(*)), 'approximate' (Postgres planner estimate) or 'none'
+POST_FEED_COUNT = config('POST_FEED_COUNT', default='approximate')
+
+# Cache backend: Redis when REDIS_URL is set (shared by all processes), otherwise per-process local memory
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'blogify',
+        }
+    }
+
+# Whole-page cache for anonymous visitors (post list, user posts, post detail, about)
+VIEW_CACHE_ENABLED = config('VIEW_CACHE_ENABLED', default='True') == 'True'
+VIEW_CACHE_TTL = config('VIEW_CACHE_TTL', default=60 * 10, cast=int)  # seconds; pages are also invalidated on change